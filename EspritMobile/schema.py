@@ -0,0 +1,69 @@
+"""
+Schéma OpenAPI servi comme un fichier statique.
+
+Le schéma est généré une fois, au build (``manage.py build_openapi_schema``),
+dans OPENAPI_SCHEMA_FILE puis servi tel quel avec un ETag : les workers
+n'exécutent plus le générateur de drf_yasg. L'interface Swagger le charge via
+SWAGGER_SETTINGS['SPEC_URL']. Sans fichier, le schéma est généré au premier
+appel puis écrit sur disque.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+
+
+def api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="EspritMobile backend APIs",
+        default_version="v1",
+        description="This is the documentation for the backend API",
+        terms_of_service="http://mywbsite.com/policies/",
+        contact=openapi.Contact(email="victorykasende@gmail.com"),
+        license=openapi.License(name="BSD Licence"),
+    )
+
+
+def build_schema(path=None):
+    """
+    Génère le schéma de toutes les routes de l'API et l'écrit dans path (OPENAPI_SCHEMA_FILE par défaut).
+    """
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    path = Path(path or settings.OPENAPI_SCHEMA_FILE)
+    schema = OpenAPISchemaGenerator(api_info()).get_schema(request=None, public=True)
+    data = OpenAPICodecJson(validators=[]).encode(schema)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Nom temporaire unique : plusieurs workers peuvent générer le schéma au même moment
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as fh:
+        fh.write(data)
+    try:
+        os.chmod(fh.name, 0o644)
+        os.replace(fh.name, path)
+    except OSError:
+        os.unlink(fh.name)
+        raise
+    return data
+
+
+def openapi_schema(request):
+    path = Path(settings.OPENAPI_SCHEMA_FILE)
+    if not path.exists():
+        build_schema(path)
+
+    stat = path.stat()
+    etag = '"{}"'.format(hashlib.md5(f"{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest())
+    if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(path, "rb"), content_type="application/json")
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, no-cache"
+    return response
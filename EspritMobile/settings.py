@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from django.core.management.utils import get_random_secret_key
+from importlib.util import find_spec
+import django
 import sys
 import dj_database_url
 import os
@@ -53,8 +55,21 @@ INSTALLED_APPS = [
     'drf_yasg'
 ]
 
+# Rôle du processus : "api" (API seule), "admin" (admin et documentation) ou "all".
+# Un worker "api" n'installe ni l'admin, ni jazzmin, ni ckeditor : ni leurs URL, ni leurs
+# checks, ni leurs templates (voir gunicorn.conf.py). Seul jazzmin n'est alors pas importé :
+# ckeditor l'est par models.py (RichTextField), drf_yasg par les vues (swagger_auto_schema)
+# et django.contrib.admin par DRF (schemas.coreapi -> admindocs).
+PROCESS_ROLE = os.getenv("PROCESS_ROLE", "all")
+SERVE_API = PROCESS_ROLE in ("all", "api")
+SERVE_ADMIN = PROCESS_ROLE in ("all", "admin")
+if not SERVE_ADMIN:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ('jazzmin', 'ckeditor', 'django.contrib.admin')]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'InspiraApp.middleware.CompressionMiddleware',
+    'InspiraApp.middleware.ReplicaRoutingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +99,28 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'EspritMobile.wsgi.application'
+ASGI_APPLICATION = 'EspritMobile.asgi.application'
+
+# Vues asynchrones natives (InspiraApp/async_views.py), à activer sous un serveur ASGI :
+# gunicorn EspritMobile.asgi:application -k uvicorn.workers.UvicornWorker
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+
+# Diffusion temps réel des compteurs (InspiraApp/push.py)
+PUSH_BROKER = os.getenv("PUSH_BROKER", "InspiraApp.push.LocalBroker")
+PUSH_INTERVAL = 1.0
+PUSH_KEEPALIVE = 15
+PUSH_MAX_SUBSCRIPTION_KEYS = 100
+
+# Nombre maximal d'objets par appel à l'endpoint de détails groupés
+BATCH_DETAIL_MAX_ITEMS = 50
+BATCH_RELATION_MAX_OPERATIONS = 100
+
+# Cache par processus des détails de citations et de pensées (InspiraApp/hotcache.py)
+HOT_OBJECT_CACHE_ENTRIES = 512
+HOT_OBJECT_CACHE_BYTES = 8 * 1024 * 1024
+HOT_OBJECT_CACHE_TTL = 60
+# Durée de vie des compteurs de likes/favoris dans le cache partagé (InspiraApp/counters.py)
+RELATION_COUNT_TIMEOUT = 300
 
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
@@ -99,10 +136,62 @@ if DEVELOPMENT_MODE is True:
 elif len(sys.argv) > 0 and sys.argv[1] != 'collectstatic':
     if os.getenv("DATABASE_URL", None) is None:
         raise Exception("DATABASE_URL environment variable not defined")
+    # Connexions persistantes, vérifiées avant réutilisation
+    DATABASE_CONN_MAX_AGE = int(os.getenv("DATABASE_CONN_MAX_AGE", "600"))
     DATABASES = {
-        "default": dj_database_url.parse(os.environ.get("DATABASE_URL")),
+        "default": dj_database_url.parse(
+            os.environ.get("DATABASE_URL"),
+            conn_max_age=DATABASE_CONN_MAX_AGE,
+            conn_health_checks=True,
+        ),
+    }
+
+    # Réplicas en lecture : DATABASE_REPLICA_URLS="postgres://...,postgres://..."
+    DATABASE_REPLICAS = []
+    for index, replica_url in enumerate(filter(None, os.getenv("DATABASE_REPLICA_URLS", "").split(","))):
+        alias = f"replica_{index}"
+        DATABASES[alias] = dj_database_url.parse(
+            replica_url.strip(),
+            conn_max_age=DATABASE_CONN_MAX_AGE,
+            conn_health_checks=True,
+            test_options={"MIRROR": "default"},
+        )
+        DATABASE_REPLICAS.append(alias)
+
+    # Pool de connexions intégré au backend psycopg (Django >= 5.1 et psycopg 3).
+    # Incompatible avec les connexions persistantes, qui sont alors désactivées.
+    if os.getenv("DATABASE_POOL", "False") == "True" and django.VERSION >= (5, 1) and find_spec("psycopg") is not None:
+        for database in DATABASES.values():
+            if database["ENGINE"] == "django.db.backends.postgresql":
+                database["CONN_MAX_AGE"] = 0
+                database.setdefault("OPTIONS", {})["pool"] = {
+                    "min_size": int(os.getenv("DATABASE_POOL_MIN_SIZE", "2")),
+                    "max_size": int(os.getenv("DATABASE_POOL_MAX_SIZE", "10")),
+                }
+
+# Cache partagé par tous les workers : compteurs de likes/favoris, versions du
+# cache chaud, épinglage sur la primaire, réponses compressées, seaux de
+# limitation de débit. Sans REDIS_URL (développement), chaque processus a son
+# cache en mémoire ; hors DEVELOPMENT_MODE, le check InspiraApp.W001 le signale.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
     }
 
+DATABASE_ROUTERS = ['InspiraApp.routers.PrimaryReplicaRouter']
+# Durée pendant laquelle l'auteur d'une écriture lit sur la primaire. L'épinglage par
+# utilisateur passe par le cache : il doit être partagé entre workers (Redis, Memcached...).
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "5"))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -141,6 +230,65 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Bundle de contenu hors-ligne (voir InspiraApp/bundles.py)
+CONTENT_BUNDLE_ROOT = MEDIA_ROOT / "bundles"
+CONTENT_BUNDLE_AUTO_REBUILD = os.getenv("CONTENT_BUNDLE_AUTO_REBUILD", "True") == "True"
+# Délai avant la reconstruction en tâche de fond : les modifications rapprochées sont regroupées (secondes)
+CONTENT_BUNDLE_REBUILD_DELAY = 30
+# Délai avant suppression d'une ancienne version (secondes)
+CONTENT_BUNDLE_GRACE_PERIOD = 10 * 60
+
+# Images stockées par hash de contenu, une seule fois (voir InspiraApp/storage.py)
+CONTENT_ADDRESSED_MEDIA = os.getenv("CONTENT_ADDRESSED_MEDIA", "True") == "True"
+BLOB_GC_GRACE_HOURS = 24
+
+# Au-delà de ce nombre de lignes estimé, les listes admin non filtrées (PostgreSQL)
+# affichent l'estimation du planificateur au lieu d'un COUNT(*) (voir InspiraApp/admin.py)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000
+
+# Exports analytiques (voir InspiraApp/exports.py)
+ANALYTICS_EXPORT_ROOT = Path(os.getenv("ANALYTICS_EXPORT_ROOT", BASE_DIR / "exports"))
+ANALYTICS_EXPORT_ROWS_PER_FILE = 1_000_000
+ANALYTICS_EXPORT_CHUNK_SIZE = 5000
+# Secondes exclues de la fin de chaque export (transactions longues, retard des réplicas)
+ANALYTICS_EXPORT_LAG = 5 * 60
+
+# Schéma OpenAPI généré au build (manage.py build_openapi_schema) et servi tel quel
+OPENAPI_SCHEMA_FILE = Path(os.getenv("OPENAPI_SCHEMA_FILE", BASE_DIR / "openapi.json"))
+SWAGGER_SETTINGS = {
+    'SPEC_URL': 'openapi-schema',
+}
+
+# Citations tirées au hasard qui ne sont pas reproposées à un utilisateur (voir InspiraApp/selection.py)
+RANDOM_QUOTE_HISTORY = 20
+
+# Codes à usage unique (InspiraApp/credentials.py)
+OTP_LENGTH = 7
+OTP_TTL = 10 * 60
+OTP_MAX_ATTEMPTS = 5
+
+# Fil d'activité (InspiraApp/activity.py)
+ACTIVITY_PAGE_SIZE = 30
+ACTIVITY_MAX_PAGE_SIZE = 100
+
+# Tâches différées (InspiraApp/jobs.py, manage.py runworker)
+JOBS_EAGER = os.getenv("JOBS_EAGER", "False") == "True"
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", "4"))
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 30
+JOB_RETRY_MAX_DELAY = 3600
+JOB_LOCK_TIMEOUT = 600
+JOB_RETENTION_DAYS = 7
+JOB_PERIODIC = {
+    "rebuild_category_statistics": 60 * 60,
+    "purge_expired_codes": 60 * 60,
+}
+
+# Rendu des paragraphes (voir InspiraApp/rendering.py)
+READING_WORDS_PER_MINUTE = 200
+THOUGHT_EXCERPT_WORDS = 40
+
 AUTH_USER_MODEL = 'InspiraApp.User'
 
 # Default primary key field type
@@ -151,9 +299,42 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Nombre de proxys de confiance devant l'application (répartiteur de charge...) :
+    # l'IP du client est lue à cette profondeur de X-Forwarded-For, REMOTE_ADDR avec 0
+    'NUM_PROXIES': int(os.getenv("NUM_PROXIES", "0")),
+    # Seaux à jetons des endpoints d'authentification (voir InspiraApp/throttling.py)
+    'DEFAULT_THROTTLE_RATES': {
+        'login.ip': '30/min',
+        'login.email': '10/hour',
+        'register.ip': '10/hour',
+        'password_reset.ip': '10/hour',
+        'password_reset.email': '3/hour',
+        'password_change.ip': '20/hour',
+        'password_change.user': '5/hour',
+    },
 }
 
+# Format compact MessagePack (Accept: application/msgpack) si le module est installé
+if find_spec("msgpack") is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('InspiraApp.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('InspiraApp.renderers.MessagePackParser')
+
+# Compression des réponses (voir InspiraApp/middleware.py)
+COMPRESSION_MIN_SIZE = 512
+COMPRESSION_ENCODINGS = ("br", "zstd", "gzip")
+COMPRESSION_CACHE_ALIAS = "default"
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=50),
@@ -14,33 +14,43 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="EspritMobile backend APIs",
-        default_version="v1",
-        description="This is the documentation for the backend API",
-        terms_of_service="http://mywbsite.com/policies/",
-        contact=openapi.Contact(email="victorykasende@gmail.com"),
-        license=openapi.License(name="BSD Licence"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,)
-)
+from EspritMobile.schema import openapi_schema
+
 urlpatterns = [
-    path("", schema_view.with_ui('swagger', cache_timeout=0), name="schema-swagger-ui"),
-    path('admin/', admin.site.urls),
-    path('api/v1/', include('InspiraApp.urls')),
+    path("openapi.json", openapi_schema, name="openapi-schema"),
 ]
 
+# Les workers "api" (PROCESS_ROLE) n'importent ni l'admin ni l'interface Swagger
+if settings.SERVE_ADMIN:
+    from django.contrib import admin
+    from rest_framework import permissions
+    from drf_yasg.views import get_schema_view
+
+    from EspritMobile.schema import api_info
+
+    schema_view = get_schema_view(
+        api_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,)
+    )
+    urlpatterns += [
+        path("", schema_view.with_ui('swagger', cache_timeout=0), name="schema-swagger-ui"),
+        path('admin/', admin.site.urls),
+    ]
+
+if settings.SERVE_API:
+    # Sous ASGI, les endpoints les plus sollicités sont servis par des vues asynchrones natives
+    if settings.ASYNC_VIEWS:
+        urlpatterns += [path('api/v1/', include('InspiraApp.async_urls'))]
+
+    urlpatterns += [
+        path('api/v1/', include('InspiraApp.urls')),
+    ]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
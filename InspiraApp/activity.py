@@ -0,0 +1,87 @@
+"""
+Fil d'activité par utilisateur : likes et favoris, citations et pensées mêlées.
+
+Chaque like ou favori ajouté ou retiré ajoute une ligne Activity dans la même
+transaction ; la table n'est jamais modifiée ensuite. L'index
+(user, -created_at) sert le fil dans l'ordre sans tri, et la pagination par
+curseur (created_at de la dernière ligne vue) donne un coût constant par page,
+quelle que soit sa profondeur : pas de COUNT ni d'OFFSET.
+
+Les objets visés sont chargés en une requête par type de contenu, déjà
+sérialisés avec les sérialiseurs de liste (``?fields=`` et ``?expand=``
+s'appliquent à eux). Un objet supprimé ou désactivé est renvoyé à null.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+import InspiraApp.models as inspira_models
+import InspiraApp.serializers as inspira_serializers
+
+VERBS = {
+    inspira_models.Like: (inspira_models.ActivityVerb.LIKE, inspira_models.ActivityVerb.UNLIKE),
+    inspira_models.Favorite: (inspira_models.ActivityVerb.FAVORITE, inspira_models.ActivityVerb.UNFAVORITE),
+}
+TARGET_SERIALIZERS = {
+    inspira_models.RelationTarget.CITATION: inspira_serializers.CitationListSerializer,
+    inspira_models.RelationTarget.THOUGHT: inspira_serializers.ThoughtListSerializer,
+}
+
+
+class ActivityPagination(CursorPagination):
+    ordering = "-created_at"
+    page_size = getattr(settings, "ACTIVITY_PAGE_SIZE", 30)
+    page_size_query_param = "page_size"
+    max_page_size = getattr(settings, "ACTIVITY_MAX_PAGE_SIZE", 100)
+
+
+def serialize_targets(activities, context):
+    """
+    Représentations {(target_type, object_id): données} des objets visés, en une requête par type.
+    """
+    object_ids = defaultdict(set)
+    for activity in activities:
+        object_ids[activity.target_type].add(activity.object_id)
+
+    targets = {}
+    for target_type, ids in object_ids.items():
+        serializer_class = TARGET_SERIALIZERS.get(target_type)
+        if serializer_class is None:
+            continue
+        queryset = inspira_models.RELATION_TARGET_MODELS[target_type].objects.filter(pk__in=ids, active=True).order_by()
+        objects = list(serializer_class(context=context).optimize_queryset(queryset))
+        data = serializer_class(objects, many=True, context=context).data
+        targets.update(((target_type, obj.pk), item) for obj, item in zip(objects, data))
+    return targets
+
+
+def _activity(sender, instance, removed):
+    return inspira_models.Activity(
+        user_id=instance.user_id,
+        verb=VERBS[sender][removed],
+        target_type=instance.target_type,
+        object_id=instance.object_id,
+    )
+
+
+def record_many(sender, instances, removed):
+    """
+    Enregistre en une requête l'activité d'une écriture groupée (InspiraApp/relations.py) ;
+    les signaux envoyés ensuite pour ces objets n'en ajoutent pas.
+    """
+    inspira_models.Activity.objects.bulk_create([_activity(sender, instance, removed) for instance in instances])
+    for instance in instances:
+        instance._activity_recorded = True
+
+
+def relation_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and not getattr(instance, "_activity_recorded", False):
+        _activity(sender, instance, removed=False).save()
+
+
+def relation_deleted(sender, instance, origin=None, **kwargs):
+    # Suppression en cascade (utilisateur supprimé) : son historique part avec lui
+    if getattr(origin, "model", type(origin)) is not sender or getattr(instance, "_activity_recorded", False):
+        return
+    _activity(sender, instance, removed=True).save()
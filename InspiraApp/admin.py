@@ -1,14 +1,200 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.text import slugify
+from django.utils.timezone import now
 
-from InspiraApp.models import Profile, User, Category, Citation, Thought, Like, Favorite, Paragraph, About
+from InspiraApp.models import Profile, User, Category, Citation, Thought, Like, Favorite, Activity, Paragraph, About, CategoryStatistics, StoredBlob, DailyQuote, Job, JobStatus, prefetch_targets
 
-admin.site.register(Profile)
-admin.site.register(User)
-admin.site.register(Category)
-admin.site.register(Citation)
-admin.site.register(Thought)
-admin.site.register(Like)
-admin.site.register(Favorite)
-admin.site.register(Paragraph)
-admin.site.register(About)
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Sur PostgreSQL, une liste non filtrée d'une grande table utilise l'estimation
+    du planificateur (pg_class.reltuples) au lieu d'un COUNT(*) complet.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is not None and not query.where:
+            connection = connections[queryset.db]
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+                    row = cursor.fetchone()
+                if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                    return row[0]
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Admin pour les grandes tables : comptage estimé, pas de second COUNT(*) pour
+    le total non filtré, et recherche par préfixe sensible à la casse
+    (LIKE 'terme%'), qui peut utiliser les index existants. Les lignes sont
+    triées par clé primaire, dans l'ordre de création, sans tri en mémoire.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-pk",)
+    search_help_text = "Matches the beginning of each field, case-sensitive."
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term or not self.search_fields:
+            return queryset, False
+        condition = Q()
+        for field in self.search_fields:
+            term = slugify(search_term) if field.endswith("slug") else search_term
+            condition |= Q(**{f"{field}__startswith": term})
+        return queryset.filter(condition), False
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin):
+    list_display = ("email", "username", "is_active", "is_staff", "date_joined")
+    list_filter = ("is_active", "is_staff")
+    search_fields = ("email", "username")
+
+
+@admin.register(Profile)
+class ProfileAdmin(LargeTableAdmin):
+    list_display = ("user", "location", "created_at")
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+    search_fields = ("user__email",)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "active", "created_at")
+    list_filter = ("active",)
+    search_fields = ("name", "slug")
+
+
+class ContentAdmin(LargeTableAdmin):
+    list_display = ("title", "author", "category", "user", "active", "created_at")
+    list_filter = ("active",)
+    list_select_related = ("user", "category")
+    autocomplete_fields = ("user", "category")
+    search_fields = ("slug",)
+
+
+@admin.register(Citation)
+class CitationAdmin(ContentAdmin):
+    pass
+
+
+@admin.register(Thought)
+class ThoughtAdmin(ContentAdmin):
+    pass
+
+
+@admin.register(Paragraph)
+class ParagraphAdmin(LargeTableAdmin):
+    list_display = ("thought_title", "active", "created_at")
+    list_filter = ("active",)
+    list_select_related = ("thought",)
+    raw_id_fields = ("thought",)
+    search_fields = ("thought__slug",)
+
+    @admin.display(description="Thought", ordering="thought__title")
+    def thought_title(self, obj):
+        return obj.thought.title
+
+
+class RelationChangeList(ChangeList):
+
+    def get_results(self, request):
+        super().get_results(request)
+        # Évalue la page (le cache du queryset est réutilisé par le gabarit) et charge les cibles
+        prefetch_targets(self.result_list)
+
+
+class RelationAdmin(LargeTableAdmin):
+    """
+    Likes et favoris : les objets ciblés sont préchargés en une requête par type de contenu.
+    """
+    list_display = ("user", "target_type", "object_id", "target", "created_at")
+    list_filter = ("target_type",)
+    list_select_related = ("user",)
+    autocomplete_fields = ("user",)
+    search_fields = ("user__email",)
+
+    def get_changelist(self, request, **kwargs):
+        return RelationChangeList
+
+    @admin.display(description="Target")
+    def target(self, obj):
+        # Le titre plutôt que __str__, qui irait chercher l'email de l'auteur ligne par ligne
+        target = obj.content_object
+        return getattr(target, "title", target) if target is not None else "-"
+
+
+@admin.register(Like)
+class LikeAdmin(RelationAdmin):
+    pass
+
+
+@admin.register(Favorite)
+class FavoriteAdmin(RelationAdmin):
+    pass
+
+
+@admin.register(Activity)
+class ActivityAdmin(RelationAdmin):
+    list_display = ("user", "verb", "target_type", "object_id", "target", "created_at")
+    list_filter = ("verb", "target_type")
+
+
+@admin.register(CategoryStatistics)
+class CategoryStatisticsAdmin(admin.ModelAdmin):
+    list_display = ("category", "citation_count", "thought_count", "like_count", "favorite_count", "updated_at")
+    list_select_related = ("category",)
+
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(LargeTableAdmin):
+    list_display = ("name", "size", "created_at", "last_used_at")
+    search_fields = ("name",)
+
+
+@admin.register(DailyQuote)
+class DailyQuoteAdmin(admin.ModelAdmin):
+    list_display = ("date", "category", "citation")
+    list_select_related = ("category", "citation")
+    raw_id_fields = ("citation",)
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ("name", "status", "attempts", "max_attempts", "run_at", "locked_by", "updated_at")
+    list_filter = ("status", "name")
+    search_fields = ("name",)
+    readonly_fields = ("attempts", "locked_by", "locked_at", "last_error", "unique_key", "created_at", "updated_at")
+    actions = ("requeue",)
+
+    @admin.action(description="Requeue selected jobs")
+    def requeue(self, request, queryset):
+        count = skipped = 0
+        for pk in queryset.exclude(status=JobStatus.RUNNING).values_list("pk", flat=True):
+            try:
+                with transaction.atomic():
+                    count += Job.objects.filter(pk=pk).update(
+                        status=JobStatus.QUEUED, attempts=0, run_at=now(), locked_at=None
+                    )
+            except IntegrityError:
+                # Tâche périodique déjà en file ou en cours
+                skipped += 1
+        message = f"{count} jobs requeued."
+        if skipped:
+            message += f" {skipped} skipped: a job with the same key is already queued or running."
+        self.message_user(request, message)
+
+
+admin.site.register(About)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class InspiraappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'InspiraApp'
+
+    def ready(self):
+        import InspiraApp.checks  # noqa: F401
+        import InspiraApp.signals  # noqa: F401
+        import InspiraApp.tasks  # noqa: F401
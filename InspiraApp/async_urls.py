@@ -0,0 +1,27 @@
+from django.urls import path
+import InspiraApp.async_views as async_views
+import InspiraApp.views as inspira_views
+
+# Versions asynchrones des endpoints les plus sollicités, montées devant InspiraApp.urls
+# quand ASYNC_VIEWS est activé. Les URL et les noms sont identiques.
+urlpatterns = [
+    path('inspiration/categories/', async_views.AsyncCategoryListView.as_view(), name='category-list'),
+    path('inspiration/categories/<slug:slug>/', async_views.AsyncCategoryDetailView.as_view(), name='category-detail'),
+    path('inspiration/citations/', async_views.AsyncCitationListView.as_view(), name='citation-list'),
+    # Avant le détail, qui capturerait "daily" et "random" comme slug
+    path('inspiration/citations/daily/', inspira_views.DailyCitationView.as_view(), name='citation-daily'),
+    path('inspiration/citations/random/', inspira_views.RandomCitationView.as_view(), name='citation-random'),
+    path('inspiration/citations/<slug:slug>/', async_views.AsyncCitationDetailView.as_view(), name='citation-detail'),
+    path('inspiration/thoughts/', async_views.AsyncThoughtListView.as_view(), name='thought-list'),
+    path('inspiration/thoughts/<slug:slug>/', async_views.AsyncThoughtDetailView.as_view(), name='thought-detail'),
+
+    path('inspiration/citation/<int:object_id>/likes/', async_views.AsyncLikeCitationView.as_view(), name='like-citation'),
+    path('inspiration/citation/<int:object_id>/favorites/', async_views.AsyncFavoriteCitationView.as_view(), name='favorite-citation'),
+    path('inspiration/thoughts/<int:object_id>/likes/', async_views.AsyncLikeThoughtView.as_view(), name='like-thought'),
+    path('inspiration/thoughts/<int:object_id>/favorites/', async_views.AsyncFavoriteThoughtView.as_view(), name='favorite-thought'),
+    path('inspiration/favorites/thoughts/', async_views.AsyncFavoriteThoughtListView.as_view(), name='favorite-thoughts-list'),
+    path('inspiration/favorites/citations/', async_views.AsyncFavoriteCitationListView.as_view(), name='favorite-citations-list'),
+
+    # Flux SSE des compteurs : une connexion sans fin ne doit jamais occuper un worker WSGI
+    path('inspiration/stream/', async_views.CountStreamView.as_view(), name='count-stream'),
+]
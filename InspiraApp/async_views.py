@@ -0,0 +1,348 @@
+"""
+Vues asynchrones natives pour les endpoints les plus sollicités.
+
+Elles exposent les mêmes URL et les mêmes réponses que leurs équivalents DRF
+(InspiraApp/views.py) mais s'exécutent sur la boucle d'événements d'un serveur
+ASGI avec l'ORM asynchrone de Django. Elles sont activées par ASYNC_VIEWS
+(voir EspritMobile/urls.py). Le format de réponse est négocié sur l'en-tête
+Accept parmi les renderers de REST_FRAMEWORK (JSON, MessagePack).
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAcceptable, NotAuthenticated, NotFound
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+import InspiraApp.models as inspira_models
+import InspiraApp.serializers as inspira_serializers
+from InspiraApp import hotcache, push
+
+_jwt = JWTAuthentication()
+_negotiation = DefaultContentNegotiation()
+
+
+def get_renderers():
+    """
+    Renderers de REST_FRAMEWORK, sauf l'API navigable qui a besoin d'une vue DRF.
+    """
+    return [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES if not issubclass(renderer, BrowsableAPIRenderer)]
+
+
+def render_response(renderer, data, status_code=status.HTTP_200_OK):
+    content_type = renderer.media_type if renderer.charset is None else f"{renderer.media_type}; charset={renderer.charset}"
+    return HttpResponse(renderer.render(data, renderer.media_type), status=status_code, content_type=content_type)
+
+
+async def authenticate(request):
+    """
+    Équivalent asynchrone de JWTAuthentication : le token est validé sans I/O,
+    seul le chargement de l'utilisateur interroge la base.
+    """
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise NotAuthenticated()
+
+    validated_token = _jwt.get_validated_token(raw_token)
+    try:
+        user = await inspira_models.User.objects.aget(
+            **{jwt_settings.USER_ID_FIELD: validated_token[jwt_settings.USER_ID_CLAIM]}
+        )
+    except (KeyError, inspira_models.User.DoesNotExist):
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    return user
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAPIView(View):
+    """
+    Vue asynchrone de base : gestion des erreurs au format DRF et authentification JWT optionnelle.
+    """
+    authentication_required = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        renderers = get_renderers()
+        # Même négociation que les vues DRF : 406 rendu avec le premier renderer
+        try:
+            self.renderer, _ = _negotiation.select_renderer(Request(request), renderers)
+        except NotAcceptable as exc:
+            self.renderer = renderers[0]
+            return self.response({"detail": exc.detail}, exc.status_code)
+        try:
+            if self.authentication_required:
+                request.user = await authenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except (NotAuthenticated, AuthenticationFailed) as exc:
+            response = self.response({"detail": exc.detail}, exc.status_code)
+            response["WWW-Authenticate"] = _jwt.authenticate_header(request)
+            return response
+        except APIException as exc:
+            return self.response(exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}, exc.status_code)
+
+    def response(self, data, status_code=status.HTTP_200_OK):
+        return render_response(self.renderer, data, status_code)
+
+    def serializer_kwargs(self, request):
+        return {
+            "context": {"request": request},
+            "fields": request.GET.get("fields"),
+            "expand": request.GET.get("expand"),
+        }
+
+    async def optimized(self, serializer_class, queryset, request):
+        serializer = serializer_class(**self.serializer_kwargs(request))
+        return await sync_to_async(serializer.optimize_queryset)(queryset)
+
+    async def serialize(self, serializer_class, instance, request, many=False):
+        kwargs = self.serializer_kwargs(request)
+        # Les relations sont préchargées : la sérialisation ne fait plus d'I/O
+        return serializer_class(instance, many=many, **kwargs).data
+
+
+class AsyncListView(AsyncAPIView):
+    queryset = None
+    serializer_class = None
+
+    async def get_queryset(self, request, **kwargs):
+        return self.queryset.all()
+
+    async def get(self, request, *args, **kwargs):
+        queryset = await self.optimized(self.serializer_class, await self.get_queryset(request, **kwargs), request)
+        items = [item async for item in queryset]
+        return self.response(await self.serialize(self.serializer_class, items, request, many=True))
+
+
+class AsyncDetailView(AsyncAPIView):
+    queryset = None
+    serializer_class = None
+    # Représentation par défaut servie depuis InspiraApp/hotcache.py
+    hot_cache = False
+
+    async def get(self, request, *args, **kwargs):
+        use_cache = self.hot_cache and "fields" not in request.GET and "expand" not in request.GET
+        kind = self.queryset.model._meta.model_name
+        if use_cache:
+            data = await sync_to_async(hotcache.get_payload)(kind, kwargs["slug"], request)
+            if data is not None:
+                return self.response(data)
+            token = await sync_to_async(hotcache.load_token)(kind)
+
+        queryset = await self.optimized(self.serializer_class, self.queryset.all(), request)
+        try:
+            item = await queryset.aget(slug=kwargs["slug"])
+        except queryset.model.DoesNotExist:
+            raise NotFound()
+        data = await self.serialize(self.serializer_class, item, request)
+        if use_cache:
+            await sync_to_async(hotcache.store_payload)(kind, kwargs["slug"], item, data, token)
+        return self.response(data)
+
+
+class AsyncCategoryListView(AsyncListView):
+    queryset = inspira_models.Category.objects.all()
+    serializer_class = inspira_serializers.CategoryListSerializer
+
+
+class AsyncCategoryDetailView(AsyncDetailView):
+    queryset = inspira_models.Category.objects.all()
+    serializer_class = inspira_serializers.CategoryDetailSerializer
+
+
+class AsyncCitationListView(AsyncListView):
+    queryset = inspira_models.Citation.objects.filter(active=True)
+    serializer_class = inspira_serializers.CitationListSerializer
+
+
+class AsyncCitationDetailView(AsyncDetailView):
+    queryset = inspira_models.Citation.objects.filter(active=True)
+    serializer_class = inspira_serializers.CitationDetailSerializer
+    hot_cache = True
+
+
+class AsyncThoughtListView(AsyncListView):
+    queryset = inspira_models.Thought.objects.filter(active=True)
+    serializer_class = inspira_serializers.ThoughtListSerializer
+
+
+class AsyncThoughtDetailView(AsyncDetailView):
+    queryset = inspira_models.Thought.objects.filter(active=True)
+    serializer_class = inspira_serializers.ThoughtDetailSerializer
+    hot_cache = True
+
+
+class AsyncLikeFavoriteView(AsyncAPIView):
+    """
+    Équivalent asynchrone de GenericLikeFavoriteView.
+    """
+    model = None
+    relation_model = None
+    relation_type = ""
+    authentication_required = True
+
+    async def post(self, request, *args, **kwargs):
+        obj_id = kwargs.get("object_id")
+        if not await self.model.objects.filter(id=obj_id).aexists():
+            raise NotFound()
+
+        try:
+            # La contrainte d'unicité remplace la vérification préalable
+            await sync_to_async(self.create_relation)(request.user, obj_id)
+        except IntegrityError:
+            return self.response(
+                {"message": f"You have already {self.relation_type}d this item."},
+                status.HTTP_400_BAD_REQUEST,
+            )
+        return self.response({"message": f"You have {self.relation_type}d this item."}, status.HTTP_201_CREATED)
+
+    def create_relation(self, user, obj_id):
+        # Savepoint : un doublon n'interrompt pas une transaction englobante
+        with transaction.atomic():
+            self.relation_model.objects.create(
+                user=user, target_type=inspira_models.relation_target(self.model), object_id=obj_id
+            )
+
+    async def delete(self, request, *args, **kwargs):
+        obj_id = kwargs.get("object_id")
+        if not await self.model.objects.filter(id=obj_id).aexists():
+            raise NotFound()
+
+        relation = await self.relation_model.objects.filter(
+            user=request.user, target_type=inspira_models.relation_target(self.model), object_id=obj_id
+        ).afirst()
+        if relation is None:
+            return self.response(
+                {
+                    "detail": f"No {self.relation_type} found for this item with ID {obj_id}. "
+                              f"Make sure you have already {self.relation_type}d this item."
+                },
+                status.HTTP_404_NOT_FOUND,
+            )
+        # delete() unitaire pour conserver les signaux post_delete
+        await relation.adelete()
+        return self.response({"message": f"You have removed your {self.relation_type} for this item."})
+
+
+class AsyncLikeCitationView(AsyncLikeFavoriteView):
+    model = inspira_models.Citation
+    relation_model = inspira_models.Like
+    relation_type = "like"
+
+
+class AsyncFavoriteCitationView(AsyncLikeFavoriteView):
+    model = inspira_models.Citation
+    relation_model = inspira_models.Favorite
+    relation_type = "favorite"
+
+
+class AsyncLikeThoughtView(AsyncLikeFavoriteView):
+    model = inspira_models.Thought
+    relation_model = inspira_models.Like
+    relation_type = "like"
+
+
+class AsyncFavoriteThoughtView(AsyncLikeFavoriteView):
+    model = inspira_models.Thought
+    relation_model = inspira_models.Favorite
+    relation_type = "favorite"
+
+
+class AsyncFavoriteListView(AsyncListView):
+    """
+    Liste des favoris de l'utilisateur connecté pour un type de contenu.
+    """
+    authentication_required = True
+
+    async def get_queryset(self, request, **kwargs):
+        model = self.serializer_class.Meta.model
+        favorite_ids = inspira_models.Favorite.objects.filter(
+            user=request.user, target_type=inspira_models.relation_target(model)
+        ).values("object_id")
+        return model.objects.filter(id__in=favorite_ids)
+
+
+class AsyncFavoriteCitationListView(AsyncFavoriteListView):
+    serializer_class = inspira_serializers.CitationListSerializer
+
+
+class AsyncFavoriteThoughtListView(AsyncFavoriteListView):
+    serializer_class = inspira_serializers.ThoughtListSerializer
+
+
+class CountStreamView(AsyncAPIView):
+    """
+    Flux Server-Sent Events des compteurs de likes et de favoris, servi
+    uniquement par les workers ASGI (monté avec ASYNC_VIEWS).
+
+    Le client s'abonne aux objets affichés (?citations=1,2&thoughts=3), reçoit
+    d'abord leurs compteurs actuels puis un évènement ``counts`` à chaque
+    changement, au plus un par objet et par PUSH_INTERVAL.
+    """
+
+    def parse_keys(self, request):
+        keys = {}
+        for kind in push.CONTENT_MODELS:
+            values = request.GET.get(f"{kind}s", "")
+            # Comparés à Like.object_id : un identifiant hors de la colonne ne peut avoir aucun compteur
+            ids = {inspira_models.parse_id(value.strip(), inspira_models.Like, "object_id") for value in values.split(",")}
+            ids.discard(None)
+            if ids:
+                keys[kind] = ids
+        return keys
+
+    async def get(self, request, *args, **kwargs):
+        # Sous WSGI, le flux sans fin occuperait un worker synchrone pour toujours
+        if not isinstance(request, ASGIRequest):
+            return self.response(
+                {"detail": "Event streams are only served by ASGI workers."}, status.HTTP_501_NOT_IMPLEMENTED
+            )
+        keys = self.parse_keys(request)
+        total = sum(len(ids) for ids in keys.values())
+        if not total or total > getattr(settings, "PUSH_MAX_SUBSCRIPTION_KEYS", 100):
+            return self.response(
+                {"detail": "Provide between 1 and %d citation or thought ids." % getattr(settings, "PUSH_MAX_SUBSCRIPTION_KEYS", 100)},
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        response = StreamingHttpResponse(self.events(keys), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def events(self, keys):
+        broker = push.get_broker()
+        subscription = broker.subscribe(push.push_key(kind, object_id) for kind, ids in keys.items() for object_id in ids)
+        keepalive = getattr(settings, "PUSH_KEEPALIVE", 15)
+        try:
+            # État initial, pour ne pas dépendre d'un premier changement
+            for kind, ids in keys.items():
+                counts = await sync_to_async(push.fetch_counts)(kind, ids)
+                for message in counts.values():
+                    yield self.format_event(message)
+            while True:
+                try:
+                    message = await subscription.get(timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield self.format_event(message)
+        finally:
+            broker.unsubscribe(subscription)
+
+    def format_event(self, message):
+        return f"event: counts\ndata: {json.dumps(message, separators=(',', ':'))}\n\n"
@@ -0,0 +1,240 @@
+"""
+Bundles de contenu hors-ligne pour le démarrage de l'application mobile.
+
+Le bundle regroupe les catégories, citations et pensées actives (avec leurs
+paragraphes) ainsi que la page "À propos" dans un seul document JSON versionné,
+précompressé sur disque (gzip, et brotli si le module est installé).
+
+Chaque section est sérialisée dans son propre fichier afin qu'une modification
+de contenu ne reconstruise que la section concernée.
+
+Une modification de contenu (ou des statistiques de catégorie) met en file la
+tâche "rebuild_content_bundle" de la section concernée, exécutée hors de la
+requête par ``manage.py runworker`` après CONTENT_BUNDLE_REBUILD_DELAY secondes
+: les modifications rapprochées sont regroupées dans une seule reconstruction.
+
+Une reconstruction (lecture des sections, écriture, publication du manifeste)
+se fait sous un verrou de fichier (flock) partagé par tous les processus de la
+machine. Chaque fichier est écrit dans un fichier temporaire puis renommé, et
+une ancienne version n'est supprimée qu'après CONTENT_BUNDLE_GRACE_PERIOD
+secondes, le temps que les téléchargements en cours se terminent.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou limité au processus
+    fcntl = None
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils.timezone import now
+
+import InspiraApp.models as inspira_models
+import InspiraApp.serializers as inspira_serializers
+from InspiraApp import compression, jobs
+
+
+SECTIONS = ("categories", "citations", "thoughts", "about")
+
+# Section à reconstruire pour chaque modèle modifié
+MODEL_SECTIONS = {
+    inspira_models.Category: "categories",
+    inspira_models.Citation: "citations",
+    inspira_models.Thought: "thoughts",
+    inspira_models.Paragraph: "thoughts",
+    inspira_models.About: "about",
+}
+
+MANIFEST_NAME = "manifest.json"
+LOCK_NAME = ".lock"
+REBUILD_JOB = "rebuild_content_bundle"
+
+_lock = threading.Lock()
+
+
+def bundle_root():
+    return Path(getattr(settings, "CONTENT_BUNDLE_ROOT", Path(settings.MEDIA_ROOT) / "bundles"))
+
+
+@contextmanager
+def _exclusive(root):
+    """
+    Verrou exclusif sur le bundle, entre threads comme entre processus.
+    """
+    with _lock, open(root / LOCK_NAME, "a") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _write_atomic(path, data):
+    # Nom temporaire unique : deux processus n'écrivent jamais dans le même fichier
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as fh:
+        fh.write(data)
+    try:
+        # mkstemp crée le fichier en 0600 : mêmes droits qu'un open() classique
+        os.chmod(fh.name, 0o644)
+        os.replace(fh.name, path)
+    except OSError:
+        os.unlink(fh.name)
+        raise
+
+
+def _remove_stale(root, keep):
+    """
+    Supprime les versions du bundle (et les fichiers temporaires abandonnés)
+    plus anciennes que le délai de grâce, sauf celles de la version courante.
+    """
+    deadline = time.time() - getattr(settings, "CONTENT_BUNDLE_GRACE_PERIOD", 10 * 60)
+    for path in list(root.glob("bundle-*")) + list(root.glob(".*.tmp")) + list(root.glob("sections/.*.tmp")):
+        if path.name in keep:
+            continue
+        try:
+            if path.stat().st_mtime < deadline:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def serialize_section(name):
+    """
+    Sérialise une section du bundle et renvoie son contenu JSON (bytes).
+    """
+    if name == "categories":
+        # Statistiques lues par jointure plutôt qu'une requête par catégorie
+        queryset = inspira_serializers.CategoryListSerializer().optimize_queryset(
+            inspira_models.Category.objects.filter(active=True)
+        )
+        data = inspira_serializers.CategoryListSerializer(queryset, many=True).data
+    elif name == "citations":
+        queryset = inspira_models.Citation.objects.filter(active=True)
+        data = inspira_serializers.CitationBundleSerializer(queryset, many=True).data
+    elif name == "thoughts":
+        paragraphs = inspira_models.Paragraph.objects.filter(active=True).order_by("created_at", "pk")
+        queryset = inspira_models.Thought.objects.filter(active=True).prefetch_related(
+            Prefetch("paragraphs", queryset=paragraphs)
+        )
+        data = inspira_serializers.ThoughtBundleSerializer(queryset, many=True).data
+    elif name == "about":
+        about = inspira_models.About.objects.first()
+        data = inspira_serializers.AboutSerializer(about).data if about else None
+    else:
+        raise ValueError(f"Unknown bundle section: {name}")
+    return _dumps(data)
+
+
+def load_manifest():
+    path = bundle_root() / MANIFEST_NAME
+    try:
+        with open(path, "rb") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def rebuild_bundle(sections=None):
+    """
+    Reconstruit le bundle. Seules les sections données sont resérialisées,
+    les autres sont relues depuis le disque. Renvoie le manifeste.
+    """
+    root = bundle_root()
+    sections_dir = root / "sections"
+    sections_dir.mkdir(parents=True, exist_ok=True)
+    dirty = set(SECTIONS if sections is None else sections)
+
+    # Sans verrou commun, deux processus publieraient chacun un manifeste tiré de leurs propres sections
+    with _exclusive(root):
+        parts = {}
+        for name in SECTIONS:
+            section_path = sections_dir / f"{name}.json"
+            if name not in dirty and section_path.exists():
+                parts[name] = section_path.read_bytes()
+            else:
+                parts[name] = serialize_section(name)
+                _write_atomic(section_path, parts[name])
+
+        # La version ne dépend que du contenu : un rebuild sans changement garde le même ETag
+        digest = hashlib.sha256()
+        for name in SECTIONS:
+            digest.update(name.encode())
+            digest.update(parts[name])
+        version = digest.hexdigest()[:32]
+
+        encodings = ["identity", "gzip"] + (["br"] if "br" in compression.CODECS else [])
+        manifest = load_manifest()
+        if manifest and manifest.get("version") == version and sorted(manifest["files"]) == sorted(encodings):
+            return manifest
+
+        body = b"".join(
+            [b'{"version":', _dumps(version)]
+            + [b"," + _dumps(name) + b":" + parts[name] for name in SECTIONS]
+            + [b"}"]
+        )
+        files = {"identity": f"bundle-{version}.json"}
+        _write_atomic(root / files["identity"], body)
+        files["gzip"] = f"bundle-{version}.json.gz"
+        _write_atomic(root / files["gzip"], compression.compress(body, "gzip", cached=True))
+        if "br" in encodings:
+            files["br"] = f"bundle-{version}.json.br"
+            _write_atomic(root / files["br"], compression.compress(body, "br", cached=True))
+
+        manifest = {
+            "version": version,
+            "generated_at": now().isoformat(),
+            "size": len(body),
+            "files": files,
+        }
+        _write_atomic(root / MANIFEST_NAME, _dumps(manifest))
+
+        # Une version récente peut être celle qu'un autre processus vient de publier
+        _remove_stale(root, keep=set(files.values()))
+        return manifest
+
+
+def negotiate_encoding(accept_encoding, files):
+    """
+    Choisit le meilleur encodage précompressé accepté par le client.
+    """
+    return compression.negotiate(accept_encoding, files, preference=("br", "gzip")) or "identity"
+
+
+def schedule_rebuild(section):
+    """
+    Met en file la reconstruction d'une section après le commit en cours.
+    """
+    if not getattr(settings, "CONTENT_BUNDLE_AUTO_REBUILD", True):
+        return
+    transaction.on_commit(lambda: enqueue_rebuild(section))
+
+
+def enqueue_rebuild(section):
+    """
+    Met en file la reconstruction d'une section, sauf si une reconstruction pas encore commencée la couvre.
+    """
+    pending = inspira_models.Job.objects.filter(name=REBUILD_JOB, status=inspira_models.JobStatus.QUEUED, payload__section=section)
+    if not pending.exists():
+        jobs.enqueue(REBUILD_JOB, {"section": section}, delay=getattr(settings, "CONTENT_BUNDLE_REBUILD_DELAY", 30))
+
+
+def content_changed(sender, instance, **kwargs):
+    section = MODEL_SECTIONS.get(sender)
+    if section:
+        schedule_rebuild(section)
@@ -0,0 +1,29 @@
+"""
+Vérifications de configuration (``manage.py check``, et au démarrage du serveur).
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Caches propres à chaque processus : chaque worker aurait ses compteurs et ses versions
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if getattr(settings, "DEVELOPMENT_MODE", False) or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            "The default cache is local to each process.",
+            hint=(
+                "Like/favorite counts (InspiraApp/counters.py), hot object versions (InspiraApp/hotcache.py), "
+                "throttle buckets (InspiraApp/throttling.py) and replica pinning need a cache shared by all "
+                "workers: set REDIS_URL."
+            ),
+            id="InspiraApp.W001",
+        )
+    ]
@@ -0,0 +1,81 @@
+"""
+Codecs de compression HTTP utilisés par le middleware et le benchmark.
+
+gzip est toujours disponible ; brotli et zstd ne sont proposés que si les
+modules ``brotli`` et ``zstandard`` sont installés.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard est optionnel
+    zstandard = None
+
+
+def _gzip(data, level):
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+# encodage -> (fonction, niveau rapide pour les réponses dynamiques, niveau maximal pour les variantes en cache)
+CODECS = {"gzip": (_gzip, 6, 9)}
+if brotli is not None:
+    CODECS["br"] = (_brotli, 5, 11)
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd, 3, 19)
+
+
+def compress(data, encoding, cached=False):
+    func, fast_level, best_level = CODECS[encoding]
+    return func(data, best_level if cached else fast_level)
+
+
+def parse_accept_encoding(header):
+    """
+    Renvoie un dictionnaire {encodage: qualité} à partir de l'en-tête Accept-Encoding.
+    """
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header, available, preference=("br", "zstd", "gzip")):
+    """
+    Choisit l'encodage préféré par le client parmi ceux disponibles.
+    Les ex aequo sont départagés par l'ordre de ``preference``. Renvoie None
+    si aucun encodage n'est acceptable.
+    """
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in preference:
+        if coding not in available:
+            continue
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
@@ -0,0 +1,79 @@
+"""
+Compteurs de likes et de favoris par objet, tenus dans le cache partagé
+(CACHES["default"], Redis en production : incréments atomiques, vus par tous
+les workers ; le check InspiraApp.W001 signale un cache propre au processus).
+
+Un compteur absent est lu en base (deux requêtes groupées pour tous les objets
+demandés) puis conservé RELATION_COUNT_TIMEOUT secondes ; les signaux
+Like/Favorite l'incrémentent ou le décrémentent ensuite après commit. Un
+incrément perdu pendant un chargement concurrent n'est faux que jusqu'à
+l'expiration de la clé.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+import InspiraApp.models as inspira_models
+from InspiraApp import push
+
+COUNT_KEY = "relation-count:{}:{}:{}"
+FIELDS = {inspira_models.Like: "like_count", inspira_models.Favorite: "favorite_count"}
+
+
+def count_key(kind, field, object_id):
+    return COUNT_KEY.format(kind, field, object_id)
+
+
+def _timeout():
+    return getattr(settings, "RELATION_COUNT_TIMEOUT", 300)
+
+
+def get_counts(kind, object_ids, cached=None):
+    """
+    Compteurs {object_id: {"like_count": n, "favorite_count": n}} des objets d'un type.
+    cached : valeurs déjà lues dans le cache par l'appelant (évite un aller-retour).
+    """
+    keys = {(object_id, field): count_key(kind, field, object_id) for object_id in object_ids for field in FIELDS.values()}
+    if cached is None:
+        cached = cache.get_many(keys.values())
+    missing = sorted({object_id for (object_id, field), key in keys.items() if key not in cached})
+
+    counts = {object_id: {field: cached.get(keys[object_id, field]) for field in FIELDS.values()} for object_id in object_ids}
+    if missing:
+        fetched = push.fetch_counts(kind, missing)
+        values = {}
+        for object_id in missing:
+            for field in FIELDS.values():
+                counts[object_id][field] = values[keys[object_id, field]] = fetched[object_id][field]
+        cache.set_many(values, _timeout())
+    return counts
+
+
+def seed(kind, object_id, counts):
+    """
+    Enregistre des compteurs venant d'être lus en base, sans écraser ceux déjà en cache.
+    """
+    for field in FIELDS.values():
+        if field in counts:
+            cache.add(count_key(kind, field, object_id), counts[field], _timeout())
+
+
+def _apply_delta(sender, instance, delta):
+    model = inspira_models.RELATION_TARGET_MODELS.get(instance.target_type)
+    if model is None:
+        return
+    key = count_key(model._meta.model_name, FIELDS[sender], instance.object_id)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Clé absente : elle sera chargée en base à la prochaine lecture
+        pass
+
+
+def relation_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: _apply_delta(sender, instance, 1))
+
+
+def relation_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: _apply_delta(sender, instance, -1))
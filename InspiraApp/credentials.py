@@ -0,0 +1,85 @@
+"""
+Codes à usage unique (réinitialisation du mot de passe), hors de la table User.
+
+Un code est stocké haché (HMAC-SHA256 avec SECRET_KEY, lié à l'utilisateur et
+à l'usage) dans OneTimeCode, une ligne par (utilisateur, usage) : émettre un
+nouveau code remplace le précédent. La vérification compare les empreintes en
+temps constant, supprime le code une fois utilisé et l'invalide après
+OTP_MAX_ATTEMPTS essais manqués. Les codes expirés sont supprimés par lots par
+la tâche périodique "purge_expired_codes" (index sur expires_at).
+
+Le code en clair n'existe qu'au moment de l'envoi : il est émis par la tâche
+d'envoi de l'email (InspiraApp/tasks.py), jamais écrit dans la file de tâches.
+"""
+import hashlib
+import hmac
+import secrets
+import string
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils.timezone import now
+
+import InspiraApp.models as inspira_models
+
+PASSWORD_RESET = "password_reset"
+
+
+def _digest(user_id, purpose, code):
+    message = f"{purpose}:{user_id}:{code}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def generate_code(length=None):
+    length = length or getattr(settings, "OTP_LENGTH", 7)
+    return "".join(secrets.choice(string.digits) for _ in range(length))
+
+
+def issue(user_id, purpose, ttl=None):
+    """
+    Émet un nouveau code pour cet usage, remplace le précédent et le renvoie en clair.
+    """
+    code = generate_code()
+    ttl = ttl or getattr(settings, "OTP_TTL", 10 * 60)
+    inspira_models.OneTimeCode.objects.update_or_create(
+        user_id=user_id,
+        purpose=purpose,
+        defaults={
+            "code_hash": _digest(user_id, purpose, code),
+            "attempts": 0,
+            "expires_at": now() + timedelta(seconds=ttl),
+        },
+    )
+    return code
+
+
+def verify(user_id, purpose, code):
+    """
+    Vérifie et consomme un code ; False s'il est faux, expiré ou déjà utilisé.
+    """
+    credential = inspira_models.OneTimeCode.objects.filter(
+        user_id=user_id, purpose=purpose, expires_at__gt=now()
+    ).only("pk", "code_hash", "attempts").first()
+    if credential is None:
+        return False
+
+    codes = inspira_models.OneTimeCode.objects.filter(pk=credential.pk, code_hash=credential.code_hash)
+    if not hmac.compare_digest(credential.code_hash, _digest(user_id, purpose, str(code))):
+        if credential.attempts + 1 >= getattr(settings, "OTP_MAX_ATTEMPTS", 5):
+            codes.delete()
+        else:
+            codes.update(attempts=F("attempts") + 1)
+        return False
+
+    # Usage unique : de deux vérifications simultanées, une seule supprime la ligne
+    deleted, _ = codes.delete()
+    return deleted > 0
+
+
+def purge_expired():
+    """
+    Supprime les codes expirés ; renvoie leur nombre.
+    """
+    deleted, _ = inspira_models.OneTimeCode.objects.filter(expires_at__lte=now()).delete()
+    return deleted
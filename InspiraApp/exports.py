@@ -0,0 +1,236 @@
+"""
+Export en flux des likes, favoris, citations et pensées pour l'analytique.
+
+Les lignes sont lues par un curseur côté serveur (QuerySet.iterator, en tuples
+via values_list, dans une transaction) et écrites au fil de l'eau : la mémoire
+utilisée dépend de la taille d'un lot, pas de celle de la table. L'ordre
+(updated_at, id) et le filigrane suivent l'index <modèle>_updated_idx. Chaque export est découpé en fichiers
+de ANALYTICS_EXPORT_ROWS_PER_FILE lignes au plus :
+
+    <ANALYTICS_EXPORT_ROOT>/<dataset>/dt=<AAAA-MM-JJ>/<horodatage>-part-00000.csv.gz
+
+Formats : CSV et NDJSON (compressés gzip, zstd ou non compressés), et Parquet
+si ``pyarrow`` est installé. En mode incrémental, seules les lignes modifiées
+(updated_at) depuis le dernier export réussi sont exportées ; le filigrane de
+chaque dataset est conservé dans ``watermarks.json``. Il reste en retrait de
+ANALYTICS_EXPORT_LAG sur l'heure de l'export, car updated_at est fixé avant le
+commit : une transaction encore en cours peut valider une ligne plus ancienne.
+Les suppressions ne sont pas exportées.
+"""
+import csv
+import gzip
+import io
+import json
+import os
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+import InspiraApp.models as inspira_models
+
+try:
+    import zstandard
+except ImportError:  # zstandard est optionnel
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow est optionnel
+    pyarrow = None
+
+WATERMARK_FIELD = "updated_at"
+WATERMARKS_NAME = "watermarks.json"
+
+RELATION_COLUMNS = (
+    ("id", "id"),
+    ("user_id", "user_id"),
+    ("target_type", "target_type"),
+    ("object_id", "object_id"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+)
+
+CONTENT_COLUMNS = (
+    ("id", "id"),
+    ("user_id", "user_id"),
+    ("category_id", "category_id"),
+    ("title", "title"),
+    ("slug", "slug"),
+    ("author", "author"),
+    ("active", "active"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+)
+
+# dataset -> (modèle, colonnes (nom exporté, lookup ORM)) ; target_type : valeur de RelationTarget
+DATASETS = {
+    "likes": (inspira_models.Like, RELATION_COLUMNS),
+    "favorites": (inspira_models.Favorite, RELATION_COLUMNS),
+    "citations": (inspira_models.Citation, CONTENT_COLUMNS),
+    "thoughts": (inspira_models.Thought, CONTENT_COLUMNS),
+}
+
+FORMATS = ("csv", "ndjson", "parquet") if pyarrow is not None else ("csv", "ndjson")
+CODECS = ("gzip", "zstd", "none") if zstandard is not None else ("gzip", "none")
+
+
+def export_root():
+    return Path(getattr(settings, "ANALYTICS_EXPORT_ROOT", Path(settings.BASE_DIR) / "exports"))
+
+
+def load_watermarks(root=None):
+    path = (root or export_root()) / WATERMARKS_NAME
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return {name: parse_datetime(value) for name, value in json.load(fh).items()}
+    except FileNotFoundError:
+        return {}
+
+
+def save_watermark(name, value, root=None):
+    root = root or export_root()
+    watermarks = {key: stamp.isoformat() for key, stamp in load_watermarks(root).items()}
+    watermarks[name] = value.isoformat()
+    path = root / WATERMARKS_NAME
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(watermarks, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _open_compressed(path, codec):
+    if codec == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+def _column_field(model, lookup):
+    field = None
+    for part in lookup.split("__"):
+        field = model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    while field.is_relation:
+        field = field.target_field
+    return field
+
+
+def _arrow_type(field):
+    internal_type = field.get_internal_type()
+    if internal_type == "BooleanField":
+        return pyarrow.bool_()
+    if internal_type == "DateTimeField":
+        return pyarrow.timestamp("us", tz="UTC")
+    if internal_type.endswith(("AutoField", "IntegerField")):
+        return pyarrow.int64()
+    return pyarrow.string()
+
+
+class PartWriter:
+    """
+    Écrit un fichier de l'export sous un nom temporaire, renommé à la fermeture.
+    """
+
+    def __init__(self, path, model, columns, file_format, codec):
+        self.path = path
+        self.tmp_path = path.with_name(f".{path.name}.tmp")
+        self.names = [name for name, lookup in columns]
+        self.format = file_format
+        if file_format == "parquet":
+            self.schema = pyarrow.schema([
+                (name, _arrow_type(_column_field(model, lookup))) for name, lookup in columns
+            ])
+            compression = "zstd" if codec == "zstd" else "snappy"
+            self.stream = pyarrow.parquet.ParquetWriter(str(self.tmp_path), self.schema, compression=compression)
+        else:
+            self.stream = _open_compressed(self.tmp_path, codec)
+            if file_format == "csv":
+                self._write_csv([self.names])
+
+    def _write_csv(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        self.stream.write(buffer.getvalue().encode("utf-8"))
+
+    def write(self, rows):
+        if self.format == "csv":
+            self._write_csv(rows)
+        elif self.format == "ndjson":
+            lines = [
+                # default=str : dates au même format (microsecondes comprises) qu'en CSV
+                json.dumps(dict(zip(self.names, row)), default=str, ensure_ascii=False, separators=(",", ":"))
+                for row in rows
+            ]
+            self.stream.write(("\n".join(lines) + "\n").encode("utf-8"))
+        else:
+            columns = list(zip(*rows))
+            self.stream.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+                schema=self.schema,
+            ))
+
+    def close(self):
+        self.stream.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.stream.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def export_dataset(name, file_format="csv", codec="gzip", since=None, until=None, using="default",
+                   root=None, rows_per_file=None, chunk_size=None, started_at=None):
+    """
+    Exporte les lignes du dataset modifiées dans ]since, until] et renvoie (nombre de lignes, fichiers écrits).
+    """
+    model, columns = DATASETS[name]
+    root = root or export_root()
+    started_at = started_at or now()
+    rows_per_file = rows_per_file or getattr(settings, "ANALYTICS_EXPORT_ROWS_PER_FILE", 1_000_000)
+    chunk_size = chunk_size or getattr(settings, "ANALYTICS_EXPORT_CHUNK_SIZE", 5000)
+
+    queryset = model.objects.using(using).order_by(WATERMARK_FIELD, "pk")
+    if since is not None:
+        queryset = queryset.filter(**{f"{WATERMARK_FIELD}__gt": since})
+    if until is not None:
+        queryset = queryset.filter(**{f"{WATERMARK_FIELD}__lte": until})
+    rows = queryset.values_list(*(lookup for _, lookup in columns)).iterator(chunk_size=chunk_size)
+
+    directory = root / name / f"dt={started_at:%Y-%m-%d}"
+    directory.mkdir(parents=True, exist_ok=True)
+    extension = file_format if file_format == "parquet" or codec == "none" else f"{file_format}.{'gz' if codec == 'gzip' else 'zst'}"
+
+    total, files, writer, written = 0, [], None, 0
+    try:
+        # Dans une transaction, PostgreSQL ouvre un curseur ordinaire ; en autocommit,
+        # Django déclare un curseur WITH HOLD, entièrement matérialisé avant la première ligne
+        with transaction.atomic(using=using):
+            while True:
+                batch = list(islice(rows, min(chunk_size, rows_per_file - written)))
+                if not batch:
+                    break
+                if writer is None:
+                    path = directory / f"{started_at:%H%M%S}-part-{len(files):05d}.{extension}"
+                    writer = PartWriter(path, model, columns, file_format, codec)
+                writer.write(batch)
+                total += len(batch)
+                written += len(batch)
+                if written >= rows_per_file:
+                    writer.close()
+                    files.append(writer.path)
+                    writer, written = None, 0
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.close()
+        files.append(writer.path)
+    return total, files
@@ -0,0 +1,197 @@
+"""
+Cache en mémoire, par processus, des détails de citations et de pensées.
+
+Quelques objets très partagés concentrent l'essentiel des lectures par slug.
+Chaque processus garde donc les réponses de détail déjà sérialisées dans un
+LRU borné en nombre d'entrées et en octets, avec une durée de vie courte,
+partagé par les threads du worker.
+
+Invalidation : les signaux de modification publient l'objet sur un bus local
+(``bus``). Le cache du processus s'y abonne et retire l'objet immédiatement ;
+un autre abonné change la version de l'objet dans le cache partagé
+(CACHES["default"], Redis en production), que les autres processus comparent
+à chaque lecture. Cette vérification est faite dans
+le même aller-retour que la lecture des compteurs (InspiraApp/counters.py),
+fusionnés dans la réponse : un like ne périme pas l'entrée.
+
+Le slug ne donne pas la version avant le chargement de l'objet : chaque
+changement modifie donc aussi une génération par type, lue avant la requête
+(``load_token``) et relue à l'enregistrement. Si elle a bougé entre-temps,
+l'objet chargé est peut-être déjà périmé et n'est pas mis en cache.
+
+Les URL d'images sont gardées relatives et rendues absolues à chaque requête,
+pour l'hôte qui la sert.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+import InspiraApp.models as inspira_models
+from InspiraApp import counters
+
+VERSION_KEY = "hot-object-version:{}:{}"
+GENERATION_KEY = "hot-object-generation:{}"
+VERSION_TIMEOUT = 60 * 60 * 24
+
+KINDS = ("citation", "thought")
+URL_FIELDS = ("image",)
+
+
+class LocalPubSub:
+    """
+    Diffusion synchrone, dans le processus courant, d'un message aux abonnés d'un sujet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(list)
+
+    def subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers[topic].append(callback)
+
+    def publish(self, topic, message):
+        with self._lock:
+            callbacks = list(self._subscribers.get(topic, ()))
+        for callback in callbacks:
+            callback(message)
+
+
+class HotObjectCache:
+    """
+    LRU thread-safe de réponses sérialisées indexées par slug, borné en entrées et en octets.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # slug -> (expiration, version, pk, data, taille)
+        self._entries = OrderedDict()
+        self._size = 0
+
+    def get(self, slug):
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(slug)
+                return None
+            self._entries.move_to_end(slug)
+            return entry
+
+    def set(self, slug, pk, data, version):
+        size = len(json.dumps(data, cls=DjangoJSONEncoder))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if slug in self._entries:
+                self._remove(slug)
+            self._entries[slug] = (time.monotonic() + self.ttl, version, pk, data, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, pk):
+        with self._lock:
+            # Un objet renommé peut encore être en cache sous son ancien slug
+            for slug in [slug for slug, entry in self._entries.items() if entry[2] == pk]:
+                self._remove(slug)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, slug):
+        self._size -= self._entries.pop(slug)[4]
+
+
+bus = LocalPubSub()
+caches = {
+    kind: HotObjectCache(
+        max_entries=getattr(settings, "HOT_OBJECT_CACHE_ENTRIES", 512),
+        max_bytes=getattr(settings, "HOT_OBJECT_CACHE_BYTES", 8 * 1024 * 1024),
+        ttl=getattr(settings, "HOT_OBJECT_CACHE_TTL", 60),
+    )
+    for kind in KINDS
+}
+
+
+def _bump_version(kind):
+    def callback(pk):
+        # Génération d'abord : un chargement qui lit la nouvelle version voit aussi la nouvelle génération
+        cache.set(GENERATION_KEY.format(kind), uuid.uuid4().hex, VERSION_TIMEOUT)
+        cache.set(VERSION_KEY.format(kind, pk), uuid.uuid4().hex, VERSION_TIMEOUT)
+    return callback
+
+
+for _kind in KINDS:
+    bus.subscribe(_kind, caches[_kind].invalidate)
+    bus.subscribe(_kind, _bump_version(_kind))
+
+
+def get_payload(kind, slug, request):
+    """
+    Réponse de détail en cache, compteurs à jour, ou None si absente ou périmée.
+    """
+    entry = caches[kind].get(slug)
+    if entry is None:
+        return None
+    _, version, pk, data, _ = entry
+
+    version_key = VERSION_KEY.format(kind, pk)
+    count_keys = [counters.count_key(kind, field, pk) for field in counters.FIELDS.values()]
+    cached = cache.get_many([version_key, *count_keys])
+    if cached.get(version_key) != version:
+        caches[kind].invalidate(pk)
+        return None
+
+    payload = dict(data)
+    payload.update(counters.get_counts(kind, [pk], cached=cached)[pk])
+    for field in URL_FIELDS:
+        if payload.get(field):
+            payload[field] = request.build_absolute_uri(payload[field])
+    return payload
+
+
+def load_token(kind):
+    """
+    Génération du type, à lire avant de charger l'objet et à passer à store_payload.
+    """
+    return cache.get(GENERATION_KEY.format(kind))
+
+
+def store_payload(kind, slug, instance, data, token):
+    """
+    Met en cache une réponse de détail qui vient d'être sérialisée, si aucun
+    objet du type n'a changé depuis ``token``.
+    """
+    counters.seed(kind, instance.pk, data)
+    generation_key, version_key = GENERATION_KEY.format(kind), VERSION_KEY.format(kind, instance.pk)
+    current = cache.get_many([generation_key, version_key])
+    if current.get(generation_key) != token:
+        return
+    data = dict(data)
+    for field in URL_FIELDS:
+        value = getattr(instance, field)
+        data[field] = value.url if value else None
+    caches[kind].set(slug, instance.pk, data, current.get(version_key))
+
+
+def content_changed(sender, instance, **kwargs):
+    if sender is inspira_models.Paragraph:
+        kind, pks = "thought", {instance.thought_id, getattr(instance, "_previous_thought_id", None)} - {None}
+    else:
+        kind, pks = sender._meta.model_name, {instance.pk}
+    # Enregistré après les signaux de rendu : les totaux de la pensée sont déjà à jour
+    transaction.on_commit(lambda: [bus.publish(kind, pk) for pk in pks])
@@ -0,0 +1,229 @@
+"""
+File de tâches différées stockée en base, sans broker externe.
+
+Une tâche est une fonction enregistrée par ``@task`` (voir InspiraApp/tasks.py)
+et mise en file par ``enqueue(nom, paramètres)`` : une ligne Job, écrite dans
+la même transaction que les données qui la motivent. ``manage.py runworker``
+prend les tâches prêtes par lots (SELECT ... FOR UPDATE SKIP LOCKED sur
+PostgreSQL, mise à jour conditionnelle du statut partout) et les exécute dans
+un pool de threads, éventuellement dans plusieurs processus.
+
+Une tâche en échec est reprogrammée avec un délai exponentiel ; après
+max_attempts essais elle passe au statut "dead" et reste en base avec la
+dernière trace d'erreur (relance possible depuis l'admin). Une tâche restée
+"running" dont le worker ne s'est pas manifesté depuis JOB_LOCK_TIMEOUT
+(worker arrêté brutalement) est remise en file. Les tâches périodiques de
+JOB_PERIODIC sont programmées par les workers eux-mêmes.
+
+Avec JOBS_EAGER, ``enqueue`` exécute la tâche dans le processus courant après
+le commit (développement, tests).
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+import InspiraApp.models as inspira_models
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=None):
+    """
+    Enregistre une fonction comme tâche ; ses paramètres sont passés par mot-clé depuis le payload JSON.
+    """
+    def decorator(func):
+        func.job_name = name
+        func.max_attempts = max_attempts
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, run_at=None, delay=None, max_attempts=None, unique_key=None):
+    """
+    Met une tâche en file ; elle sera exécutée au plus tôt à run_at (ou dans delay secondes).
+    Avec unique_key, IntegrityError si une tâche de même clé est déjà en file ou en cours.
+    """
+    func = _registry.get(name)
+    if func is None:
+        raise ValueError(f"Unknown job: {name}")
+    if run_at is None:
+        run_at = now() + timedelta(seconds=delay or 0)
+    job = inspira_models.Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at,
+        max_attempts=max_attempts or func.max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 5),
+        unique_key=unique_key,
+    )
+    if getattr(settings, "JOBS_EAGER", False):
+        transaction.on_commit(lambda: run_eagerly(job.pk))
+    return job
+
+
+def run_eagerly(pk):
+    for job in claim("eager", 1, pks=[pk]):
+        execute(job)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, "JOB_RETRY_DELAY", 30)
+    return min(base * 2 ** (attempts - 1), getattr(settings, "JOB_RETRY_MAX_DELAY", 3600))
+
+
+def claim(worker_id, limit, pks=None):
+    """
+    Passe au plus limit tâches prêtes au statut "running" pour ce worker et les renvoie.
+    """
+    started = now()
+    with transaction.atomic():
+        ready = inspira_models.Job.objects.filter(status=inspira_models.JobStatus.QUEUED, run_at__lte=started)
+        if pks is not None:
+            ready = ready.filter(pk__in=pks)
+        candidates = list(
+            ready.select_for_update(skip_locked=True).order_by("run_at").values_list("pk", flat=True)[:limit]
+        )
+        if not candidates:
+            return []
+        # La condition sur le statut départage les workers sur les bases sans SKIP LOCKED
+        inspira_models.Job.objects.filter(pk__in=candidates, status=inspira_models.JobStatus.QUEUED).update(
+            status=inspira_models.JobStatus.RUNNING, locked_by=worker_id, locked_at=started, attempts=F("attempts") + 1,
+        )
+    return list(inspira_models.Job.objects.filter(pk__in=candidates, locked_by=worker_id, locked_at=started))
+
+
+def execute(job):
+    """
+    Exécute une tâche prise par claim() et enregistre son résultat.
+    """
+    jobs = inspira_models.Job.objects.filter(pk=job.pk, status=inspira_models.JobStatus.RUNNING, locked_by=job.locked_by)
+    try:
+        func = _registry.get(job.name)
+        if func is None:
+            raise LookupError(f"Unknown job: {job.name}")
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s #%s failed permanently after %s attempts.", job.name, job.pk, job.attempts)
+            jobs.update(status=inspira_models.JobStatus.DEAD, locked_at=None, last_error=error, updated_at=now())
+        else:
+            logger.warning("Job %s #%s failed (attempt %s), retrying.", job.name, job.pk, job.attempts)
+            jobs.update(
+                status=inspira_models.JobStatus.QUEUED, locked_at=None, last_error=error, updated_at=now(),
+                run_at=now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+    else:
+        jobs.update(status=inspira_models.JobStatus.DONE, locked_at=None, last_error="", updated_at=now())
+    finally:
+        close_old_connections()
+
+
+def requeue_stale(timeout=None):
+    """
+    Remet en file (ou en "dead" si les essais sont épuisés) les tâches d'un worker disparu.
+    """
+    timeout = timeout or getattr(settings, "JOB_LOCK_TIMEOUT", 600)
+    stale = inspira_models.Job.objects.filter(
+        status=inspira_models.JobStatus.RUNNING, locked_at__lt=now() - timedelta(seconds=timeout)
+    )
+    error = "Worker stopped before the job finished."
+    dead = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=inspira_models.JobStatus.DEAD, locked_at=None, last_error=error, updated_at=now()
+    )
+    requeued = stale.update(
+        status=inspira_models.JobStatus.QUEUED, locked_at=None, last_error=error, run_at=now(), updated_at=now()
+    )
+    return requeued, dead
+
+
+def schedule_periodic():
+    """
+    Programme chaque tâche de JOB_PERIODIC ({nom: intervalle en secondes}) qui n'est ni en file ni en cours.
+    """
+    for name, interval in getattr(settings, "JOB_PERIODIC", {}).items():
+        jobs = inspira_models.Job.objects.filter(name=name)
+        if jobs.filter(status__in=(inspira_models.JobStatus.QUEUED, inspira_models.JobStatus.RUNNING)).exists():
+            continue
+        last_run = jobs.order_by("-updated_at").values_list("updated_at", flat=True).first()
+        try:
+            # Plusieurs processus font leur entretien en même temps : la contrainte
+            # unique_active_job_key ne laisse passer que le premier
+            with transaction.atomic():
+                enqueue(name, run_at=max(now(), last_run + timedelta(seconds=interval)) if last_run else now(), unique_key=name)
+        except IntegrityError:
+            continue
+
+
+def purge_finished(days=None):
+    """
+    Supprime les tâches terminées avec succès depuis plus de JOB_RETENTION_DAYS jours.
+    """
+    days = days or getattr(settings, "JOB_RETENTION_DAYS", 7)
+    deleted, _ = inspira_models.Job.objects.filter(
+        status=inspira_models.JobStatus.DONE, updated_at__lt=now() - timedelta(days=days)
+    ).delete()
+    return deleted
+
+
+class Worker:
+    """
+    Boucle d'un processus worker : prend des lots de tâches et les exécute dans un pool de threads.
+    """
+    # Entretien (tâches orphelines, périodiques, purge) au plus une fois par intervalle
+    maintenance_interval = 60
+
+    def __init__(self, threads=4, poll_interval=1.0, name=None):
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+    def maintenance(self):
+        # Les tâches encore en cours de ce worker ne doivent pas passer pour orphelines
+        inspira_models.Job.objects.filter(status=inspira_models.JobStatus.RUNNING, locked_by=self.name).update(locked_at=now())
+        requeue_stale()
+        schedule_periodic()
+        purge_finished()
+
+    def run(self, once=False):
+        """
+        Exécute les tâches jusqu'à stop() ; avec once, s'arrête quand aucune tâche n'est prête.
+        """
+        running = set()
+        last_maintenance = None
+        with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="job") as pool:
+            try:
+                while not self.stop_event.is_set():
+                    if last_maintenance is None or (now() - last_maintenance).total_seconds() >= self.maintenance_interval:
+                        self.maintenance()
+                        last_maintenance = now()
+
+                    jobs = claim(self.name, self.threads - len(running)) if len(running) < self.threads else []
+                    running.update(pool.submit(execute, job) for job in jobs)
+                    if not jobs:
+                        if once and not running:
+                            break
+                        if running:
+                            # Attend qu'un thread se libère, au plus jusqu'à la prochaine interrogation
+                            wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                        else:
+                            self.stop_event.wait(self.poll_interval)
+                    running = {future for future in running if not future.done()}
+            finally:
+                # La sortie du bloc with attend la fin des tâches en cours
+                close_old_connections()
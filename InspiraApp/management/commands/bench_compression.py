@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+
+import InspiraApp.models as inspira_models
+import InspiraApp.serializers as inspira_serializers
+from InspiraApp import compression
+from InspiraApp.renderers import MessagePackRenderer, msgpack
+
+
+class Command(BaseCommand):
+    help = "Mesure les octets économisés et le coût CPU de la compression des listes de citations et de pensées."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Nombre d'éléments générés en mémoire au lieu de lire la base.")
+        parser.add_argument("--iterations", type=int, default=20)
+
+    def synthetic(self, model, count):
+        created = now()
+        return [
+            model(
+                id=index,
+                title=f"Titre {index}",
+                slug=f"titre-{index}",
+                author="Auteur inconnu",
+                description="Une phrase inspirante pour bien commencer la journée. " * 6,
+                image=f"{model._meta.model_name}/image-{index % 50}.jpg",
+                active=True,
+                created_at=created,
+                updated_at=created,
+            )
+            for index in range(count)
+        ]
+
+    def payloads(self, count):
+        sources = (
+            ("citations", inspira_models.Citation, inspira_serializers.CitationListSerializer),
+            ("thoughts", inspira_models.Thought, inspira_serializers.ThoughtListSerializer),
+        )
+        for name, model, serializer_class in sources:
+            instances = self.synthetic(model, count) if count else model.objects.filter(active=True)
+            yield name, serializer_class(instances, many=True).data
+
+    def timed(self, func, iterations):
+        start = time.process_time()
+        for _ in range(iterations):
+            result = func()
+        return result, (time.process_time() - start) * 1000 / iterations
+
+    def handle(self, *args, **options):
+        iterations = max(options["iterations"], 1)
+        for name, data in self.payloads(options["synthetic"]):
+            body, render_ms = self.timed(lambda: JSONRenderer().render(data), iterations)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {len(data)} items, JSON {len(body)} bytes ({render_ms:.2f} ms CPU)"))
+            if msgpack is not None:
+                packed, pack_ms = self.timed(lambda: MessagePackRenderer().render(data), iterations)
+                self.stdout.write(f"  msgpack        {len(packed):>10} bytes  saved {self.saved(body, packed):>6}  {pack_ms:8.2f} ms CPU")
+
+            for encoding in compression.CODECS:
+                for cached in (False, True):
+                    compressed, cpu_ms = self.timed(lambda: compression.compress(body, encoding, cached=cached), iterations)
+                    label = f"{encoding} ({'best' if cached else 'fast'})"
+                    self.stdout.write(f"  {label:<14} {len(compressed):>10} bytes  saved {self.saved(body, compressed):>6}  {cpu_ms:8.2f} ms CPU")
+
+    def saved(self, original, compressed):
+        if not original:
+            return "-"
+        return f"{100 * (1 - len(compressed) / len(original)):.1f}%"
@@ -0,0 +1,80 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le débit et la latence d'un endpoint à plusieurs niveaux de concurrence. "
+        "À lancer contre le serveur WSGI (gunicorn) puis contre le serveur ASGI "
+        "(gunicorn -k uvicorn.workers.UvicornWorker, ASYNC_VIEWS=True) pour comparer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="URL complète, ex. http://127.0.0.1:8000/api/v1/inspiration/citations/")
+        parser.add_argument("--concurrency", default="1,10,50,100,200",
+                            help="Niveaux de concurrence séparés par des virgules.")
+        parser.add_argument("--requests", type=int, default=500, help="Requêtes par niveau.")
+        parser.add_argument("--header", action="append", default=[],
+                            help="En-tête supplémentaire 'Nom: valeur' (option répétable).")
+        parser.add_argument("--timeout", type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Only plain http:// URLs are supported.")
+
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        headers = [f"Host: {url.netloc}", "Connection: close", *options["header"]]
+        request = ("\r\n".join([f"GET {path} HTTP/1.1", *headers]) + "\r\n\r\n").encode()
+        target = (url.hostname, url.port or 80)
+
+        self.stdout.write(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for level in [int(value) for value in options["concurrency"].split(",") if value.strip()]:
+            result = asyncio.run(self.run_level(target, request, level, options["requests"], options["timeout"]))
+            self.stdout.write(
+                f"{level:>11} {result['throughput']:>9.1f} {result['p50']:>9.1f} {result['p99']:>9.1f} {result['errors']:>7}"
+            )
+
+    async def fetch(self, target, request, timeout):
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*target), timeout)
+        try:
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), timeout)
+        finally:
+            writer.close()
+        status_line = response.split(b"\r\n", 1)[0].split()
+        if len(status_line) < 2 or not status_line[1].startswith(b"2"):
+            raise ValueError(status_line)
+        return (time.perf_counter() - start) * 1000
+
+    async def run_level(self, target, request, concurrency, total, timeout):
+        latencies, errors = [], 0
+        remaining = iter(range(total))
+
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                try:
+                    latencies.append(await self.fetch(target, request, timeout))
+                except (OSError, ValueError, asyncio.TimeoutError):
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            "p50": statistics.median(latencies) if latencies else 0.0,
+            "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0,
+            "errors": errors,
+        }
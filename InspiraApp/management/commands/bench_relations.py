@@ -0,0 +1,113 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+import InspiraApp.models as inspira_models
+
+# Les lignes synthétiques visent des object_id inexistants, au-delà de ce décalage
+SYNTHETIC_OFFSET = 1_000_000_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure les requêtes chaudes sur Like (vérification, comptage, liste par utilisateur, suppression) "
+        "et, sur PostgreSQL, le nombre de partitions lues. À lancer avant et après partition_relations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Insère d'abord ce nombre de likes synthétiques (PostgreSQL uniquement).")
+        parser.add_argument("--cleanup", action="store_true", help="Supprime les likes synthétiques puis quitte.")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        target_type = inspira_models.RelationTarget.CITATION
+        synthetic = inspira_models.Like.objects.filter(object_id__gte=SYNTHETIC_OFFSET)
+
+        if options["cleanup"]:
+            count = synthetic._raw_delete(synthetic.db)
+            self.stdout.write(self.style.SUCCESS(f"{count} synthetic likes deleted."))
+            return
+        if options["seed"]:
+            self.seed(options["seed"], target_type)
+
+        like = synthetic.first() or inspira_models.Like.objects.filter(target_type=target_type).first()
+        if like is None:
+            raise CommandError("No like to benchmark: use --seed on PostgreSQL or create some likes.")
+
+        queries = {
+            "exists": lambda: inspira_models.Like.objects.filter(
+                user_id=like.user_id, target_type=target_type, object_id=like.object_id).exists(),
+            "count": lambda: inspira_models.Like.objects.filter(
+                target_type=target_type, object_id=like.object_id).count(),
+            "user list": lambda: list(inspira_models.Like.objects.filter(
+                user_id=like.user_id, target_type=target_type).values_list("object_id", flat=True)[:50]),
+            "delete": lambda: self.rolled_back_delete(like),
+        }
+        self.stdout.write(f"{'query':>10} {'p50 ms':>9} {'p99 ms':>9} {'partitions':>11}")
+        for name, query in queries.items():
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{name:>10} {statistics.median(timings):>9.2f} "
+                f"{timings[min(len(timings) - 1, int(len(timings) * 0.99))]:>9.2f} {self.partitions(query):>11}"
+            )
+
+    def seed(self, rows, target_type):
+        if connection.vendor != "postgresql":
+            raise CommandError("--seed requires PostgreSQL.")
+        user_ids = list(inspira_models.User.objects.values_list("pk", flat=True)[:1000])
+        if not user_ids:
+            raise CommandError("--seed needs at least one user.")
+        qn = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            # object_id distinct par ligne : la contrainte d'unicité est toujours respectée
+            cursor.execute(
+                f"INSERT INTO {qn(inspira_models.Like._meta.db_table)} (user_id, target_type, object_id, created_at, updated_at)"
+                " SELECT (%s::varchar[])[1 + i %% %s], %s, %s + i, now(), now() FROM generate_series(1, %s) AS i",
+                [user_ids, len(user_ids), target_type.value, SYNTHETIC_OFFSET, rows],
+            )
+            cursor.execute(f"ANALYZE {qn(inspira_models.Like._meta.db_table)}")
+        self.stdout.write(f"{rows} synthetic likes inserted.")
+
+    def rolled_back_delete(self, like):
+        with transaction.atomic():
+            inspira_models.Like.objects.filter(pk=like.pk).first().delete()
+            transaction.set_rollback(True)
+
+    def partitions(self, query):
+        """
+        Nombre de tables distinctes lues par la dernière requête de query sur la table des likes, d'après EXPLAIN.
+        """
+        if connection.vendor != "postgresql":
+            return "-"
+        with transaction.atomic():
+            with connection.execute_wrapper(self.capture):
+                self.captured = []
+                query()
+            transaction.set_rollback(True)
+        table = inspira_models.Like._meta.db_table
+        # Les signaux de suppression lancent d'autres requêtes : seule compte celle sur les likes
+        sql, params = [(sql, params) for sql, params in self.captured if table in sql][-1]
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return len(set(self.relations(plan[0]["Plan"])))
+
+    def capture(self, execute, sql, params, many, context):
+        self.captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    def relations(self, node):
+        if "Relation Name" in node:
+            yield node["Relation Name"]
+        for child in node.get("Plans", ()):
+            yield from self.relations(child)
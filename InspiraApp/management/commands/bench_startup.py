@@ -0,0 +1,63 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Ce que fait un worker avant de servir sa première requête
+BOOT_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le démarrage d'un worker (django.setup() et chargement de l'URLconf) dans un "
+        "processus neuf, et détaille le temps d'import propre à chaque paquet (python -X importtime)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--role", choices=("all", "api", "admin"), help="PROCESS_ROLE du worker mesuré.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15, help="Nombre de paquets affichés.")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        if options["role"]:
+            env["PROCESS_ROLE"] = options["role"]
+
+        timings = []
+        for _ in range(options["repeat"]):
+            start = time.perf_counter()
+            self.run_boot(env)
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(
+            f"boot: median {statistics.median(timings):.0f} ms, min {min(timings):.0f} ms "
+            f"({options['repeat']} runs, role {env.get('PROCESS_ROLE', 'all')})"
+        )
+
+        packages = {}
+        for line in self.run_boot(env, importtime=True).splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith("import time:") or "imported package" in line:
+                continue
+            own, _, name = line[len("import time:"):].split("|")
+            # Temps propre de chaque module, cumulé par paquet de premier niveau
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(own)
+
+        total = sum(packages.values())
+        self.stdout.write(f"imports: {total / 1000:.0f} ms")
+        self.stdout.write(f"{'package':<32} {'ms':>8} {'share':>7}")
+        for package, micros in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options["top"]]:
+            self.stdout.write(f"{package:<32} {micros / 1000:>8.1f} {micros / total:>7.1%}")
+
+    def run_boot(self, env, importtime=False):
+        command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", BOOT_SCRIPT]
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "Worker boot failed.")
+        return result.stderr
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from InspiraApp import bundles
+
+
+class Command(BaseCommand):
+    help = "Construit le bundle de contenu hors-ligne servi à l'ouverture de l'application."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--section",
+            action="append",
+            choices=bundles.SECTIONS,
+            help="Ne reconstruire que cette section (option répétable). Par défaut : toutes.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            manifest = bundles.rebuild_bundle(options["section"])
+        except OSError as exc:
+            raise CommandError(f"Unable to write content bundle: {exc}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Bundle {manifest['version']} ({manifest['size']} bytes) : "
+            + ", ".join(sorted(manifest["files"]))
+        ))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from EspritMobile.schema import build_schema
+
+
+class Command(BaseCommand):
+    help = "Génère le schéma OpenAPI servi en fichier statique par /openapi.json. À lancer au build."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Fichier de sortie. Par défaut : OPENAPI_SCHEMA_FILE.")
+
+    def handle(self, *args, **options):
+        if not settings.SERVE_API:
+            raise CommandError("The schema must be built with PROCESS_ROLE=all or api.")
+        path = options["output"] or settings.OPENAPI_SCHEMA_FILE
+        try:
+            data = build_schema(path)
+        except OSError as exc:
+            raise CommandError(f"Unable to write OpenAPI schema: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"OpenAPI schema written to {path} ({len(data)} bytes)."))
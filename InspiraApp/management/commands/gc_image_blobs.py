@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+import InspiraApp.models as inspira_models
+from InspiraApp.storage import content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = "Supprime les images stockées par contenu qui ne sont plus référencées par aucun objet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=int, default=getattr(settings, "BLOB_GC_GRACE_HOURS", 24),
+                            help="Ne supprime que les blobs plus anciens que ce délai (envois en cours).")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(hours=options["grace_hours"])
+        orphans = inspira_models.StoredBlob.objects.filter(references__isnull=True, last_used_at__lt=cutoff)
+        freed = count = 0
+        for blob in orphans.iterator():
+            if not options["dry_run"] and not self.delete_orphan(blob, cutoff):
+                continue
+            count += 1
+            freed += blob.size
+
+        action = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{action} {count} blobs ({freed} bytes)."))
+
+    def delete_orphan(self, blob, cutoff):
+        """
+        Supprime la ligne puis le fichier d'un blob, seulement s'il est toujours
+        orphelin et n'a pas été renvoyé depuis ``cutoff``.
+        """
+        with transaction.atomic():
+            # Ligne verrouillée : aucune référence ni aucun envoi du même contenu
+            # (ContentAddressedStorage._save) ne peut s'y rattacher avant le commit
+            locked = inspira_models.StoredBlob.objects.select_for_update().filter(pk=blob.pk).first()
+            if locked is None or locked.last_used_at >= cutoff:
+                return False
+            if inspira_models.BlobReference.objects.filter(blob_id=blob.pk).exists():
+                return False
+            locked.delete()
+            # Fichier supprimé avant le commit : en cas d'erreur, la ligne est rétablie
+            content_addressed_storage.delete_blob(blob.name)
+        return True
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+import InspiraApp.models as inspira_models
+from InspiraApp import partitioning
+
+MODELS = {"likes": inspira_models.Like, "favorites": inspira_models.Favorite}
+
+
+class Command(BaseCommand):
+    help = (
+        "Convertit en ligne les tables Like et Favorite en tables partitionnées "
+        "(type de contenu, puis hachage de object_id). PostgreSQL uniquement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", action="append", choices=sorted(MODELS),
+                            help="Table à partitionner (option répétable). Par défaut : les deux.")
+        parser.add_argument("--hash-partitions", type=int, default=16,
+                            help="Nombre de sous-partitions par type de contenu.")
+        parser.add_argument("--batch-size", type=int, default=50000)
+        parser.add_argument("--dry-run", action="store_true", help="Affiche le SQL de création sans rien exécuter.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Table partitioning requires PostgreSQL.")
+        if options["hash_partitions"] < 1:
+            raise CommandError("--hash-partitions must be at least 1.")
+
+        for name in options["table"] or sorted(MODELS):
+            model = MODELS[name]
+            if partitioning.is_partitioned(model):
+                self.stdout.write(f"{name}: already partitioned.")
+                continue
+
+            statements = partitioning.create_statements(model, options["hash_partitions"])
+            if options["dry_run"]:
+                self.stdout.write(";\n".join(statements) + ";")
+                continue
+
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+            # Copie par lots, chaque lot dans sa propre transaction ; les écritures continuent
+            copied_id, until_id, copied = 0, partitioning.max_id(model), 0
+            while copied_id < until_id:
+                upper = min(copied_id + options["batch_size"], until_id)
+                copied += partitioning.copy_batch(model, copied_id, upper)
+                copied_id = upper
+                self.stdout.write(f"{name}: {copied} rows copied (id <= {copied_id})")
+
+            # Rattrapage sans verrou : la bascule n'aura plus que les toutes dernières écritures à recopier
+            inserted, deleted = partitioning.replay(model, options["batch_size"])
+            self.stdout.write(f"{name}: {inserted} changed rows replayed, {deleted} replaced or removed")
+
+            swapped_in, swapped_out = partitioning.swap(model)
+            inserted, deleted = inserted + swapped_in, deleted + swapped_out
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: partitioned ({copied + inserted - deleted} rows). "
+                f"Previous table kept as {model._meta.db_table}_unpartitioned."
+            ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from InspiraApp.statistics import rebuild_category_statistics
+
+
+class Command(BaseCommand):
+    help = "Reconstruit entièrement la table des statistiques par catégorie."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--category", type=int, action="append",
+                            help="Identifiant d'une catégorie à recalculer (option répétable). Par défaut : toutes.")
+
+    def handle(self, *args, **options):
+        count = rebuild_category_statistics(options["category"])
+        self.stdout.write(self.style.SUCCESS(f"{count} category statistics rebuilt."))
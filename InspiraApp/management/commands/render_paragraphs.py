@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from InspiraApp import bundles
+from InspiraApp.rendering import RENDER_VERSION, render_paragraphs
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule le rendu des paragraphes (HTML assaini, texte, temps de lecture) rendus avec une "
+        "version antérieure des règles, puis les totaux des pensées concernées."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recalcule tous les paragraphes, quelle que soit leur version.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        paragraphs, thoughts = render_paragraphs(everything=options["all"], batch_size=options["batch_size"])
+        if paragraphs:
+            # Le bundle hors-ligne contient le HTML assaini
+            bundles.schedule_rebuild("thoughts")
+        self.stdout.write(self.style.SUCCESS(
+            f"{paragraphs} paragraphs rendered (version {RENDER_VERSION}), {thoughts} thoughts updated."
+        ))
@@ -0,0 +1,56 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from InspiraApp.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches différées de la table Job (InspiraApp/jobs.py) dans un pool de threads, "
+        "éventuellement dans plusieurs processus. S'arrête proprement sur SIGTERM ou SIGINT."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=getattr(settings, "JOB_WORKER_THREADS", 4),
+                            help="Tâches exécutées simultanément par processus.")
+        parser.add_argument("--processes", type=int, default=1)
+        parser.add_argument("--poll-interval", type=float, default=getattr(settings, "JOB_POLL_INTERVAL", 1.0),
+                            help="Attente, en secondes, quand aucune tâche n'est prête.")
+        parser.add_argument("--once", action="store_true",
+                            help="S'arrête dès qu'aucune tâche n'est prête (cron, tests).")
+
+    def handle(self, *args, **options):
+        if options["processes"] <= 1:
+            self.run_worker(options)
+            return
+
+        # Aucune connexion ne doit être partagée avec les processus enfants
+        connections.close_all()
+        children = [
+            multiprocessing.Process(target=self.run_worker, args=(options,), name=f"runworker-{index}")
+            for index in range(options["processes"])
+        ]
+        for child in children:
+            child.start()
+
+        def stop_children(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()
+
+        signal.signal(signal.SIGTERM, stop_children)
+        signal.signal(signal.SIGINT, stop_children)
+        for child in children:
+            child.join()
+
+    def run_worker(self, options):
+        worker = Worker(threads=options["threads"], poll_interval=options["poll_interval"])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(f"Worker {worker.name} started ({options['threads']} threads).")
+        worker.run(once=options["once"])
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker.name} stopped."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from django.utils.timezone import localdate
+
+import InspiraApp.models as inspira_models
+from InspiraApp import selection
+
+
+class Command(BaseCommand):
+    help = "Tire la citation du jour, globale et pour chaque catégorie active. À lancer à minuit."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=parse_date, help="Jour à précalculer (AAAA-MM-JJ). Par défaut : aujourd'hui.")
+
+    def handle(self, *args, **options):
+        today = options["date"] or localdate()
+        category_ids = [None, *inspira_models.Category.objects.filter(active=True).values_list("pk", flat=True)]
+        selected = sum(selection.daily_citation_id(category_id, today) is not None for category_id in category_ids)
+        self.stdout.write(self.style.SUCCESS(f"{selected} daily quotes selected for {today}."))
@@ -0,0 +1,160 @@
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from InspiraApp import compression, routers
+
+re_strong_etag = _lazy_re_compile(r'^"')
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/msgpack",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+class CompressionMiddleware:
+    """
+    Compresse les réponses avec l'encodage négocié (br, zstd ou gzip).
+
+    Les réponses plus petites que COMPRESSION_MIN_SIZE ne sont pas compressées.
+    Les réponses publiquement cachables sont compressées au niveau maximal une
+    seule fois puis servies depuis le cache, indexées par le hash du contenu.
+
+    Sous ASGI, la vue reste sur la boucle d'événements ; seule la compression
+    (CPU et cache) passe dans un thread, pour les réponses à compresser.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 512)
+        self.encodings = tuple(
+            coding for coding in getattr(settings, "COMPRESSION_ENCODINGS", ("br", "zstd", "gzip"))
+            if coding in compression.CODECS
+        )
+        self.cache_alias = getattr(settings, "COMPRESSION_CACHE_ALIAS", "default")
+        self.cache_timeout = getattr(settings, "COMPRESSION_CACHE_TIMEOUT", 60 * 60)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if not self.encodings or not self.is_compressible(response):
+            return response
+        return await sync_to_async(self.process_response, thread_sensitive=False)(request, response)
+
+    def is_compressible(self, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return False
+        if response.status_code != 200 or len(response.content) < self.min_size:
+            return False
+        content_type = response.get("Content-Type", "").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def is_cacheable(self, request, response):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        cache_control = response.get("Cache-Control", "").lower()
+        if "private" in cache_control or "no-store" in cache_control:
+            return False
+        return response.has_header("ETag") or "public" in cache_control
+
+    def process_response(self, request, response):
+        if not self.encodings or not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = compression.negotiate(request.headers.get("Accept-Encoding", ""), self.encodings)
+        if encoding is None:
+            return response
+
+        content = response.content
+        if self.is_cacheable(request, response):
+            digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+            key = f"compression:{encoding}:{digest}"
+            cache = caches[self.cache_alias]
+            compressed = cache.get(key)
+            if compressed is None:
+                compressed = compression.compress(content, encoding, cached=True)
+                cache.set(key, compressed, self.cache_timeout)
+        else:
+            compressed = compression.compress(content, encoding)
+
+        if len(compressed) >= len(content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # La représentation compressée n'est plus identique octet par octet
+        etag = response.get("ETag")
+        if etag and re_strong_etag.search(etag):
+            response["ETag"] = "W/" + etag
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Envoie les lectures des requêtes sûres vers les réplicas (voir InspiraApp/routers.py)
+    et épingle sur la primaire l'auteur d'une écriture réussie.
+
+    L'état de routage est une ContextVar : il suit la requête dans les
+    coroutines comme dans les threads de sync_to_async.
+    """
+    safe_methods = ("GET", "HEAD", "OPTIONS")
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = routers.begin_request(request, request.method in self.safe_methods)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        user = self.pinned_user(request, response)
+        if user is not None:
+            routers.pin_user(user)
+        return response
+
+    async def __acall__(self, request):
+        token = routers.begin_request(request, request.method in self.safe_methods)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        user = self.pinned_user(request, response)
+        if user is not None:
+            await sync_to_async(routers.pin_user, thread_sensitive=False)(user)
+        return response
+
+    def pinned_user(self, request, response):
+        """
+        Pose le cookie d'épinglage après une écriture réussie ; renvoie l'utilisateur à épingler.
+        """
+        if request.method in self.safe_methods or response.status_code >= 400 or not routers.replica_aliases():
+            return None
+        pin_seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5)
+        response.set_cookie(routers.PIN_COOKIE, "1", max_age=pin_seconds, httponly=True, samesite="Lax")
+        return routers.authenticated_user(request)
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-19 16:41
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def backfill_statistics(apps, schema_editor):
+    # Même calcul que statistics.rebuild_category_statistics(), sur les modèles historiques
+    Category = apps.get_model("InspiraApp", "Category")
+    CategoryStatistics = apps.get_model("InspiraApp", "CategoryStatistics")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    totals = {
+        pk: {"citation_count": 0, "thought_count": 0, "like_count": 0, "favorite_count": 0}
+        for pk in Category.objects.values_list("pk", flat=True)
+    }
+    for model_name, counter in (("Citation", "citation_count"), ("Thought", "thought_count")):
+        model = apps.get_model("InspiraApp", model_name)
+        categories = dict(model.objects.filter(active=True).exclude(category=None).values_list("pk", "category_id"))
+        for category_id in categories.values():
+            totals[category_id][counter] += 1
+        content_type = ContentType.objects.filter(app_label="InspiraApp", model=model._meta.model_name).first()
+        if content_type is None:
+            continue
+        for relation_name, field in (("Like", "like_count"), ("Favorite", "favorite_count")):
+            relations = apps.get_model("InspiraApp", relation_name).objects.filter(content_type=content_type)
+            for object_id, total in relations.values("object_id").annotate(total=Count("pk")).values_list("object_id", "total"):
+                if object_id in categories:
+                    totals[categories[object_id]][field] += total
+    CategoryStatistics.objects.bulk_create(
+        [CategoryStatistics(category_id=pk, **values) for pk, values in totals.items()], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0002_user_otp_user_otp_created_at_user_reset_token_and_more'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStatistics',
+            fields=[
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='InspiraApp.category')),
+                ('citation_count', models.PositiveIntegerField(default=0)),
+                ('thought_count', models.PositiveIntegerField(default=0)),
+                ('like_count', models.PositiveIntegerField(default=0)),
+                ('favorite_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Category statistics',
+                'verbose_name_plural': 'Category statistics',
+            },
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2 on 2026-10-19 16:47
+
+import InspiraApp.storage
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('InspiraApp', '0003_categorystatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Stored blob',
+                'verbose_name_plural': 'Stored blobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=InspiraApp.storage.get_image_storage, upload_to='category/'),
+        ),
+        migrations.AlterField(
+            model_name='citation',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=InspiraApp.storage.get_image_storage, upload_to='citation/'),
+        ),
+        migrations.AlterField(
+            model_name='thought',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=InspiraApp.storage.get_image_storage, upload_to='thought/'),
+        ),
+        migrations.CreateModel(
+            name='BlobReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=64)),
+                ('field_name', models.CharField(max_length=64)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='references', to='InspiraApp.storedblob')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Blob reference',
+                'verbose_name_plural': 'Blob references',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='blobreference',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id', 'field_name'), name='unique_blob_reference'),
+        ),
+    ]
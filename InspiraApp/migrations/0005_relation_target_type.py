@@ -0,0 +1,102 @@
+# Generated by Django 4.2 on 2026-10-19 17:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Valeurs de InspiraApp.models.RelationTarget
+TARGETS = {1: "citation", 2: "thought"}
+
+
+def content_type_to_target(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    for model_name in ("Like", "Favorite"):
+        model = apps.get_model("InspiraApp", model_name)
+        for target_type, target_model in TARGETS.items():
+            content_type = ContentType.objects.filter(app_label="InspiraApp", model=target_model).first()
+            if content_type is not None:
+                model.objects.filter(content_type=content_type).update(target_type=target_type)
+        # Relations vers un autre type de contenu : aucune n'est créée par l'API
+        model.objects.filter(target_type__isnull=True).delete()
+
+
+def target_to_content_type(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    for model_name in ("Like", "Favorite"):
+        model = apps.get_model("InspiraApp", model_name)
+        for target_type, target_model in TARGETS.items():
+            content_type, _ = ContentType.objects.get_or_create(app_label="InspiraApp", model=target_model)
+            model.objects.filter(target_type=target_type).update(content_type=content_type)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('InspiraApp', '0004_content_addressed_images'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='target_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'citation'), (2, 'thought')], null=True),
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='target_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'citation'), (2, 'thought')], null=True),
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='content_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AlterField(
+            model_name='like',
+            name='content_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.RunPython(content_type_to_target, target_to_content_type),
+        migrations.RemoveConstraint(
+            model_name='favorite',
+            name='unique_favorite',
+        ),
+        migrations.RemoveConstraint(
+            model_name='like',
+            name='unique_like',
+        ),
+        migrations.RemoveField(
+            model_name='favorite',
+            name='content_type',
+        ),
+        migrations.RemoveField(
+            model_name='like',
+            name='content_type',
+        ),
+        migrations.AlterField(
+            model_name='favorite',
+            name='target_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'citation'), (2, 'thought')]),
+        ),
+        migrations.AlterField(
+            model_name='like',
+            name='target_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'citation'), (2, 'thought')]),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'target_type', 'object_id'), name='unique_favorite'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'target_type', 'object_id'), name='unique_like'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['target_type', 'object_id'], name='favorite_target_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['target_type', 'object_id'], name='like_target_idx'),
+        ),
+    ]
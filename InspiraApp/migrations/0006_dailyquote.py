@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-19 16:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0005_relation_target_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_quotes', to='InspiraApp.category')),
+                ('citation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='InspiraApp.citation')),
+            ],
+            options={
+                'verbose_name': 'Daily quote',
+                'verbose_name_plural': 'Daily quotes',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyquote',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('date', 'category'), name='unique_daily_quote_category'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyquote',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('date',), name='unique_daily_quote'),
+        ),
+    ]
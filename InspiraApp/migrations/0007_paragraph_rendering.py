@@ -0,0 +1,80 @@
+# Generated by Django 4.2 on 2026-10-19 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def render_existing(apps, schema_editor):
+    # Fonctions pures du module de rendu, appliquées aux modèles historiques
+    from InspiraApp.rendering import RENDER_VERSION, count_words, reading_time, render_html
+
+    Paragraph = apps.get_model("InspiraApp", "Paragraph")
+    Thought = apps.get_model("InspiraApp", "Thought")
+    excerpt_words = getattr(settings, "THOUGHT_EXCERPT_WORDS", 40)
+    totals = {}
+    for paragraph in Paragraph.objects.order_by("created_at", "pk").iterator():
+        paragraph.content_html, paragraph.content_text = render_html(paragraph.content)
+        paragraph.word_count = count_words(paragraph.content_text)
+        paragraph.reading_time = reading_time(paragraph.word_count)
+        paragraph.render_version = RENDER_VERSION
+        paragraph.save(update_fields=["content_html", "content_text", "word_count", "reading_time", "render_version"])
+        if paragraph.active:
+            texts, words = totals.setdefault(paragraph.thought_id, ([], [0]))
+            texts.append(paragraph.content_text)
+            words[0] += paragraph.word_count
+    for thought_id, (texts, words) in totals.items():
+        Thought.objects.filter(pk=thought_id).update(
+            word_count=words[0], reading_time=reading_time(words[0]), excerpt=Truncator(" ".join(texts)).words(excerpt_words),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0006_dailyquote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paragraph',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='paragraph',
+            name='content_text',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='paragraph',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='En secondes.'),
+        ),
+        migrations.AddField(
+            model_name='paragraph',
+            name='render_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='paragraph',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thought',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='thought',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='En secondes.'),
+        ),
+        migrations.AddField(
+            model_name='thought',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0007_paragraph_rendering'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'verbose_name': 'Favorite', 'verbose_name_plural': 'Favorites'},
+        ),
+        migrations.AlterModelOptions(
+            name='like',
+            options={'verbose_name': 'Like', 'verbose_name_plural': 'Likes'},
+        ),
+        migrations.AddIndex(
+            model_name='about',
+            index=models.Index(fields=['-created_at'], name='about_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['-created_at'], name='category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-created_at'], name='citation_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['category', '-created_at'], name='citation_category_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paragraph',
+            index=models.Index(condition=models.Q(('active', True)), fields=['thought', 'created_at'], name='paragraph_thought_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-created_at'], name='thought_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(fields=['category', '-created_at'], name='thought_category_created_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-19 19:24
+
+import InspiraApp.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+BATCH_SIZE = 1000
+
+
+def record_existing(apps, schema_editor):
+    # Le fil démarre avec les likes et favoris existants, à leur date de création
+    Activity = apps.get_model("InspiraApp", "Activity")
+    relations = (
+        (apps.get_model("InspiraApp", "Like"), 1),
+        (apps.get_model("InspiraApp", "Favorite"), 3),
+    )
+    for relation_model, verb in relations:
+        batch = []
+        for relation in relation_model.objects.order_by("pk").iterator(chunk_size=BATCH_SIZE):
+            batch.append(Activity(
+                user_id=relation.user_id, verb=verb, target_type=relation.target_type,
+                object_id=relation.object_id, created_at=relation.created_at,
+            ))
+            if len(batch) >= BATCH_SIZE:
+                Activity.objects.bulk_create(batch)
+                batch = []
+        Activity.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0009_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.PositiveSmallIntegerField(choices=[(1, 'like'), (2, 'unlike'), (3, 'favorite'), (4, 'unfavorite')])),
+                ('target_type', models.PositiveSmallIntegerField(choices=[(1, 'citation'), (2, 'thought')])),
+                ('object_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Activity',
+                'verbose_name_plural': 'Activities',
+                'ordering': ['-created_at'],
+            },
+            bases=(InspiraApp.models.TargetMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['user', '-created_at'], name='activity_user_created_idx'),
+        ),
+        migrations.RunPython(record_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2 on 2026-10-19 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0010_activity'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='otp',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='otp_created_at',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='reset_token',
+        ),
+        migrations.CreateModel(
+            name='OneTimeCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(max_length=32)),
+                ('code_hash', models.CharField(max_length=64)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='one_time_codes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'One-time code',
+                'verbose_name_plural': 'One-time codes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='onetimecode',
+            index=models.Index(fields=['expires_at'], name='one_time_code_expires_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='onetimecode',
+            constraint=models.UniqueConstraint(fields=('user', 'purpose'), name='unique_one_time_code'),
+        ),
+    ]
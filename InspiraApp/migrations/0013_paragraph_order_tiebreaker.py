@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0011_one_time_codes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='paragraph',
+            name='paragraph_thought_active_idx',
+        ),
+        migrations.AddIndex(
+            model_name='paragraph',
+            index=models.Index(condition=models.Q(('active', True)), fields=['thought', 'created_at', 'id'], name='paragraph_thought_order_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-19 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0014_job_unique_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citation',
+            index=models.Index(fields=['updated_at', 'id'], name='citation_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['updated_at', 'id'], name='favorite_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['updated_at', 'id'], name='like_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='thought',
+            index=models.Index(fields=['updated_at', 'id'], name='thought_updated_idx'),
+        ),
+    ]
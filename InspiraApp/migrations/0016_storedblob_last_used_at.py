@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-19 19:10
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created_at(apps, schema_editor):
+    StoredBlob = apps.get_model("InspiraApp", "StoredBlob")
+    StoredBlob.objects.update(last_used_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('InspiraApp', '0015_export_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedblob',
+            name='last_used_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
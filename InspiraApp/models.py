@@ -1,16 +1,17 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.backends.base.operations import BaseDatabaseOperations
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save, pre_delete, post_delete
 from django.utils.html import mark_safe
 from django.utils.text import slugify
-from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from shortuuid.django_fields import ShortUUIDField
 from ckeditor.fields import RichTextField
 from django.core.exceptions import ValidationError
 import shortuuid
 from django.utils.timezone import now
-from datetime import timedelta
+from InspiraApp.storage import get_image_storage
 
 class User(AbstractUser):
     id = ShortUUIDField(primary_key=True, default=shortuuid.uuid)
@@ -23,9 +24,6 @@ class User(AbstractUser):
     is_superuser = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
     last_login = models.DateTimeField(auto_now=True)
-    otp = models.CharField(max_length=7, blank=True, null=True)
-    otp_created_at = models.DateTimeField(blank=True, null=True)
-    reset_token = models.CharField(max_length=255, blank=True, null=True)
 
 
     USERNAME_FIELD = "email"
@@ -33,12 +31,33 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
-    
-    def is_otp_valid(self):
-        if self.otp_created_at:
-            return now() < self.otp_created_at + timedelta(minutes=10)
-        return False
-    
+
+
+class OneTimeCode(models.Model):
+    """
+    Code à usage unique d'un utilisateur, stocké haché (voir InspiraApp/credentials.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="one_time_codes")
+    purpose = models.CharField(max_length=32)
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.purpose} ({self.user_id})"
+
+    class Meta:
+        verbose_name = "One-time code"
+        verbose_name_plural = "One-time codes"
+        constraints = [
+            models.UniqueConstraint(fields=["user", "purpose"], name="unique_one_time_code"),
+        ]
+        # Purge périodique des codes expirés
+        indexes = [
+            models.Index(fields=["expires_at"], name="one_time_code_expires_idx"),
+        ]
+
 
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -74,7 +93,10 @@ def create_profile(sender, instance, created, *args, **kwargs):
 
 post_save.connect(create_profile, sender=User)
 
-def save_profile(sender, instance, *args, **kwargs):
+def save_profile(sender, instance, update_fields=None, *args, **kwargs):
+    # Écriture partielle de l'utilisateur (mot de passe...) : rien à enregistrer dans le profil
+    if update_fields is not None:
+        return
     instance.profile.save()
 
 post_save.connect(save_profile, sender=User)
@@ -83,7 +105,7 @@ class Category(models.Model):
     name = models.CharField(max_length=150)
     slug = models.SlugField(max_length=150, unique=True)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to="category/", blank=True, null=True)
+    image = models.ImageField(upload_to="category/", storage=get_image_storage, blank=True, null=True)
     active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -99,6 +121,9 @@ class Category(models.Model):
         verbose_name = "Category"
         verbose_name_plural = "Categories"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="category_created_idx"),
+        ]
 
     
 class Citation(models.Model):
@@ -108,7 +133,7 @@ class Citation(models.Model):
     slug = models.SlugField(max_length=150, unique=True)
     author = models.CharField(max_length=150)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to="citation/", blank=True, null=True)
+    image = models.ImageField(upload_to="citation/", storage=get_image_storage, blank=True, null=True)
     active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -124,20 +149,71 @@ class Citation(models.Model):
         verbose_name = "Citation"
         verbose_name_plural = "Citations"
         ordering = ["-created_at"]
+        # Listes des citations actives (index partiel) et d'une catégorie, dans l'ordre par défaut
+        indexes = [
+            models.Index(fields=["-created_at"], condition=models.Q(active=True), name="citation_active_created_idx"),
+            models.Index(fields=["category", "-created_at"], name="citation_category_created_idx"),
+            # Export incrémental par filigrane (InspiraApp/exports.py)
+            models.Index(fields=["updated_at", "id"], name="citation_updated_idx"),
+        ]
 
     def like_count(self):
-        return Like.objects.filter(
-            content_type=ContentType.objects.get_for_model(self), object_id=self.id).count()
+        return Like.objects.filter(target_type=RelationTarget.CITATION, object_id=self.id).count()
 
     def favorite_count(self):
-        return Favorite.objects.filter(
-            content_type=ContentType.objects.get_for_model(self), object_id=self.id).count()
-
-class Favorite(models.Model):
+        return Favorite.objects.filter(target_type=RelationTarget.CITATION, object_id=self.id).count()
+
+class RelationTarget(models.IntegerChoices):
+    """
+    Type d'objet visé par un like ou un favori. Remplace la clé étrangère vers
+    ContentType : un petit entier, sans jointure ni requête de résolution.
+    """
+    CITATION = 1, "citation"
+    THOUGHT = 2, "thought"
+
+
+class TargetMixin:
+    """
+    Accès à l'objet visé par (target_type, object_id) : Like, Favorite, Activity.
+    """
+
+    @property
+    def content_object(self):
+        """
+        Objet ciblé, chargé au premier accès (voir prefetch_targets pour une liste).
+        """
+        if not hasattr(self, "_content_object"):
+            model = RELATION_TARGET_MODELS.get(self.target_type)
+            self._content_object = model.objects.filter(pk=self.object_id).first() if model else None
+        return self._content_object
+
+
+class RelationMixin(TargetMixin):
+    """
+    Comportement commun de Like et Favorite.
+    """
+
+    def delete(self, using=None, keep_parents=False):
+        # Supprime en filtrant aussi sur (target_type, object_id) : sur les tables
+        # partitionnées (voir InspiraApp/partitioning.py), seule la partition concernée
+        # est ouverte, là où Collector supprime par clé primaire seule. Aucun modèle ne
+        # référence Like ni Favorite : il n'y a pas de cascade à gérer.
+        using = using or router.db_for_write(self.__class__, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            pre_delete.send(sender=self.__class__, instance=self, using=using, origin=self)
+            count = self.__class__._base_manager.using(using).filter(
+                pk=self.pk, target_type=self.target_type, object_id=self.object_id
+            )._raw_delete(using)
+            # Déjà supprimé par une requête concurrente : compteurs et activité ne bougent pas
+            if count:
+                post_delete.send(sender=self.__class__, instance=self, using=using, origin=self)
+        self.pk = None
+        return count, {self._meta.label: count}
+
+class Favorite(RelationMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)  # Permet de pointer vers un modèle
-    object_id = object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey("content_type", "object_id")  # L'objet cible
+    target_type = models.PositiveSmallIntegerField(choices=RelationTarget.choices)  # Type de l'objet cible
+    object_id = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -147,17 +223,20 @@ class Favorite(models.Model):
     class Meta:
         verbose_name = "Favorite"
         verbose_name_plural = "Favorites"
-        ordering = ["-created_at"]
         constraints = [
-            models.UniqueConstraint(fields=["user", "content_type", "object_id"], name="unique_favorite")
+            models.UniqueConstraint(fields=["user", "target_type", "object_id"], name="unique_favorite")
+        ]
+        indexes = [
+            models.Index(fields=["target_type", "object_id"], name="favorite_target_idx"),
+            # Export incrémental par filigrane (InspiraApp/exports.py)
+            models.Index(fields=["updated_at", "id"], name="favorite_updated_idx"),
         ]
 
 
-class Like(models.Model):
+class Like(RelationMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    target_type = models.PositiveSmallIntegerField(choices=RelationTarget.choices)
     object_id = models.PositiveIntegerField()
-    content_object = GenericForeignKey("content_type", "object_id")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -168,9 +247,43 @@ class Like(models.Model):
     class Meta:
         verbose_name = "Like"
         verbose_name_plural = "Likes"
-        ordering = ["-created_at"]
         constraints = [
-            models.UniqueConstraint(fields=["user", "content_type", "object_id"], name="unique_like")
+            models.UniqueConstraint(fields=["user", "target_type", "object_id"], name="unique_like")
+        ]
+        indexes = [
+            models.Index(fields=["target_type", "object_id"], name="like_target_idx"),
+            # Export incrémental par filigrane (InspiraApp/exports.py)
+            models.Index(fields=["updated_at", "id"], name="like_updated_idx"),
+        ]
+
+
+class ActivityVerb(models.IntegerChoices):
+    LIKE = 1, "like"
+    UNLIKE = 2, "unlike"
+    FAVORITE = 3, "favorite"
+    UNFAVORITE = 4, "unfavorite"
+
+
+class Activity(TargetMixin, models.Model):
+    """
+    Historique des likes et favoris d'un utilisateur, en ajout seul (voir InspiraApp/activity.py).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="activities")
+    verb = models.PositiveSmallIntegerField(choices=ActivityVerb.choices)
+    target_type = models.PositiveSmallIntegerField(choices=RelationTarget.choices)
+    object_id = models.PositiveIntegerField()
+    created_at = models.DateTimeField(default=now, editable=False)
+
+    def __str__(self):
+        return f"{self.get_verb_display()} {self.get_target_type_display()} {self.object_id}"
+
+    class Meta:
+        verbose_name = "Activity"
+        verbose_name_plural = "Activities"
+        ordering = ["-created_at"]
+        # Fil d'un utilisateur, parcouru par curseur sur created_at
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="activity_user_created_idx"),
         ]
 
 
@@ -181,8 +294,12 @@ class Thought(models.Model):
     slug = models.SlugField(max_length=150, unique=True)
     author = models.CharField(max_length=150)
     description = models.TextField(blank=True)
-    image = models.ImageField(upload_to="thought/", blank=True, null=True)
+    image = models.ImageField(upload_to="thought/", storage=get_image_storage, blank=True, null=True)
     active = models.BooleanField(default=False)
+    # Totaux des paragraphes actifs, calculés par InspiraApp.rendering
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=0, editable=False, help_text="En secondes.")
+    excerpt = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -198,18 +315,81 @@ class Thought(models.Model):
         verbose_name = "thought"
         verbose_name_plural = "thoughts"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], condition=models.Q(active=True), name="thought_active_created_idx"),
+            models.Index(fields=["category", "-created_at"], name="thought_category_created_idx"),
+            # Export incrémental par filigrane (InspiraApp/exports.py)
+            models.Index(fields=["updated_at", "id"], name="thought_updated_idx"),
+        ]
 
     def like_count(self):
-        return Like.objects.filter(
-            content_type=ContentType.objects.get_for_model(self), object_id=self.id).count()
+        return Like.objects.filter(target_type=RelationTarget.THOUGHT, object_id=self.id).count()
 
     def favorite_count(self):
-        return Favorite.objects.filter(
-            content_type=ContentType.objects.get_for_model(self), object_id=self.id).count()
+        return Favorite.objects.filter(target_type=RelationTarget.THOUGHT, object_id=self.id).count()
+
+# Modèle visé par chaque valeur de RelationTarget, et l'inverse
+RELATION_TARGET_MODELS = {RelationTarget.CITATION: Citation, RelationTarget.THOUGHT: Thought}
+RELATION_TARGETS = {model: target for target, model in RELATION_TARGET_MODELS.items()}
+
+def relation_target(model):
+    """
+    Valeur de RelationTarget pour un modèle (Citation, Thought) ; KeyError pour tout autre modèle.
+    """
+    return RELATION_TARGETS[model]
+
+def max_id(model, field_name=None):
+    """
+    Plus grande valeur que peut contenir une colonne entière (la clé primaire par défaut).
+    """
+    field = model._meta.get_field(field_name) if field_name else model._meta.pk
+    return BaseDatabaseOperations.integer_field_ranges[field.get_internal_type()][1]
+
+def parse_id(value, model, field_name=None):
+    """
+    Identifiant écrit en chiffres ASCII dans une chaîne ; None si ce n'en est pas un
+    ou s'il dépasse la colonne (la base refuserait la requête).
+    """
+    if not (value.isascii() and value.isdigit()):
+        return None
+    object_id = int(value)
+    return object_id if object_id <= max_id(model, field_name) else None
+
+def prefetch_targets(relations):
+    """
+    Charge les objets ciblés d'une liste de likes ou favoris, en une requête par type.
+    """
+    relations = list(relations)
+    object_ids = {}
+    for relation in relations:
+        object_ids.setdefault(relation.target_type, set()).add(relation.object_id)
+    targets = {
+        target_type: RELATION_TARGET_MODELS[target_type].objects.in_bulk(ids)
+        for target_type, ids in object_ids.items() if target_type in RELATION_TARGET_MODELS
+    }
+    for relation in relations:
+        relation._content_object = targets.get(relation.target_type, {}).get(relation.object_id)
+    return relations
+
+def relation_count(relation_model, model, outer_ref="pk"):
+    """
+    Sous-requête comptant les likes ou favoris (relation_model) de l'objet référencé par outer_ref.
+    """
+    relations = relation_model.objects.filter(
+        target_type=relation_target(model),
+        object_id=models.OuterRef(outer_ref),
+    ).order_by().values("object_id").annotate(total=models.Count("pk")).values("total")
+    return Coalesce(models.Subquery(relations, output_field=models.IntegerField()), 0)
 
 class Paragraph(models.Model):
     thought = models.ForeignKey(Thought, on_delete=models.CASCADE, related_name="paragraphs")
     content = RichTextField()
+    # Rendu calculé à l'enregistrement par InspiraApp.rendering
+    content_html = models.TextField(blank=True, editable=False)
+    content_text = models.TextField(blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=0, editable=False, help_text="En secondes.")
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
     active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -221,6 +401,10 @@ class Paragraph(models.Model):
         verbose_name = "Paragraph"
         verbose_name_plural = "Paragraphs"
         ordering = ["-created_at"]
+        # Paragraphes publiés d'une pensée, dans l'ordre de lecture (pk départage les ex aequo)
+        indexes = [
+            models.Index(fields=["thought", "created_at", "id"], condition=models.Q(active=True), name="paragraph_thought_order_idx"),
+        ]
 
 class About(models.Model):
     title = models.CharField(max_length=150)
@@ -236,3 +420,133 @@ class About(models.Model):
         verbose_name = "About"
         verbose_name_plural = "Abouts"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at"], name="about_created_idx"),
+        ]
+
+
+class CategoryStatistics(models.Model):
+    """
+    Compteurs matérialisés par catégorie, tenus à jour par InspiraApp/statistics.py.
+    """
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, primary_key=True, related_name="statistics")
+    citation_count = models.PositiveIntegerField(default=0)
+    thought_count = models.PositiveIntegerField(default=0)
+    like_count = models.PositiveIntegerField(default=0)
+    favorite_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Statistiques de {self.category_id}"
+
+    class Meta:
+        verbose_name = "Category statistics"
+        verbose_name_plural = "Category statistics"
+
+
+class StoredBlob(models.Model):
+    """
+    Fichier image stocké une seule fois, nommé d'après le hash de son contenu (voir InspiraApp/storage.py).
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Dernier envoi de ce contenu : le délai de grâce de gc_image_blobs part de cette date
+    last_used_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = "Stored blob"
+        verbose_name_plural = "Stored blobs"
+        ordering = ["-created_at"]
+
+
+class BlobReference(models.Model):
+    """
+    Référence d'un champ image d'un objet vers un blob : un blob sans référence peut être supprimé.
+    """
+    blob = models.ForeignKey(StoredBlob, on_delete=models.CASCADE, related_name="references")
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.CharField(max_length=64)
+    field_name = models.CharField(max_length=64)
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_id}.{self.field_name} -> {self.blob_id}"
+
+    class Meta:
+        verbose_name = "Blob reference"
+        verbose_name_plural = "Blob references"
+        constraints = [
+            models.UniqueConstraint(fields=["content_type", "object_id", "field_name"], name="unique_blob_reference")
+        ]
+
+
+class DailyQuote(models.Model):
+    """
+    Citation du jour, tirée une fois par jour et par catégorie (sans catégorie : toutes catégories).
+    Voir InspiraApp/selection.py.
+    """
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="daily_quotes", blank=True, null=True)
+    citation = models.ForeignKey(Citation, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.date} : {self.citation_id}"
+
+    class Meta:
+        verbose_name = "Daily quote"
+        verbose_name_plural = "Daily quotes"
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["date", "category"], condition=models.Q(category__isnull=False), name="unique_daily_quote_category"),
+            models.UniqueConstraint(fields=["date"], condition=models.Q(category__isnull=True), name="unique_daily_quote"),
+        ]
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "queued"
+    RUNNING = "running", "running"
+    DONE = "done", "done"
+    DEAD = "dead", "dead"
+
+
+class Job(models.Model):
+    """
+    Tâche différée exécutée par ``manage.py runworker`` (voir InspiraApp/jobs.py).
+    Une tâche en échec après max_attempts essais reste en base avec le statut "dead".
+    """
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    # Au plus une tâche en file ou en cours par clé (tâches périodiques)
+    unique_key = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        ordering = ["-created_at"]
+        # Tâches prêtes à être prises, et tâches dont le worker a disparu
+        indexes = [
+            models.Index(fields=["run_at"], condition=models.Q(status="queued"), name="job_queued_idx"),
+            models.Index(fields=["locked_at"], condition=models.Q(status="running"), name="job_running_idx"),
+            models.Index(fields=["name", "-updated_at"], name="job_name_updated_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["unique_key"], condition=models.Q(status__in=["queued", "running"]), name="unique_active_job_key"
+            ),
+        ]
@@ -0,0 +1,187 @@
+"""
+Partitionnement PostgreSQL des tables Like et Favorite.
+
+Chaque table devient une table partitionnée par liste sur ``target_type``
+(une partition par valeur de RelationTarget : citations, pensées, plus une
+partition par défaut), elle-même sous-partitionnée par hachage de ``object_id``.
+Toutes les requêtes chaudes filtrent sur (target_type, object_id) : vérification
+et suppression d'un like, comptages, listes de favoris (target_type seul). Le
+planificateur n'ouvre donc qu'une partition, y compris pour les sous-requêtes
+de comptage où l'élagage se fait à l'exécution.
+
+Le partitionnement par date de création a été écarté : aucune de ces requêtes
+ne filtre sur created_at, il ne permettrait aucun élagage.
+
+La migration se fait en ligne avec ``manage.py partition_relations`` :
+création de la table partitionnée et d'un déclencheur qui journalise l'id de
+chaque ligne insérée, modifiée ou supprimée dans ``<table>_changes``, copie par
+lots, rejeu du journal sans verrou, puis bascule dans une transaction courte :
+seules les lignes journalisées depuis le dernier rejeu sont recopiées avant le
+renommage. L'ancienne table est conservée sous le nom ``<table>_unpartitioned``
+pour un retour arrière.
+L'état des migrations Django n'est pas modifié : colonnes et noms de
+contraintes restent identiques.
+"""
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+import InspiraApp.models as inspira_models
+
+UNIQUE_CONSTRAINTS = {
+    inspira_models.Like: "unique_like",
+    inspira_models.Favorite: "unique_favorite",
+}
+
+
+def _names(model):
+    table = model._meta.db_table
+    return table, f"{table}_partitioned", f"{table}_unpartitioned"
+
+
+def _log_names(model):
+    """
+    Journal des lignes modifiées pendant la copie, et sa fonction de déclencheur.
+    """
+    table = model._meta.db_table
+    return f"{table}_changes", f"{table}_log_change"
+
+
+def _columns(model):
+    return ", ".join(connection.ops.quote_name(field.column) for field in model._meta.concrete_fields)
+
+
+def is_partitioned(model):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [connection.ops.quote_name(model._meta.db_table)],
+        )
+        return cursor.fetchone() is not None
+
+
+def create_statements(model, hash_partitions):
+    """
+    Création de la table partitionnée vide, de ses partitions, contraintes et index.
+    """
+    qn = connection.ops.quote_name
+    table, new_table, _ = _names(model)
+    unique = UNIQUE_CONSTRAINTS[model]
+    user_table = model._meta.get_field("user").related_model._meta.db_table
+
+    statements = [
+        f"CREATE TABLE {qn(new_table)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS)"
+        " PARTITION BY LIST (target_type)",
+        # Une contrainte d'unicité d'une table partitionnée doit inclure les clés de partitionnement
+        f"ALTER TABLE {qn(new_table)} ADD PRIMARY KEY (id, target_type, object_id)",
+        f"ALTER TABLE {qn(new_table)} ADD CONSTRAINT {qn(unique + '_p')} UNIQUE (user_id, target_type, object_id)",
+        f"ALTER TABLE {qn(new_table)} ADD CONSTRAINT {qn(table + '_user_p_fk')} FOREIGN KEY (user_id)"
+        f" REFERENCES {qn(user_table)} (id) DEFERRABLE INITIALLY DEFERRED",
+        # Listes de favoris d'un utilisateur par type
+        f"CREATE INDEX {qn(table + '_user_target_p')} ON {qn(new_table)} (user_id, target_type, created_at)",
+    ]
+    statements.extend(
+        f"CREATE INDEX {qn(index.name + '_p')} ON {qn(new_table)} ({', '.join(qn(model._meta.get_field(name).column) for name in index.fields)})"
+        for index in model._meta.indexes
+    )
+    for target_type in inspira_models.RelationTarget:
+        partition = f"{table}_{target_type.label}"
+        statements.append(
+            f"CREATE TABLE {qn(partition)} PARTITION OF {qn(new_table)} FOR VALUES IN ({target_type.value})"
+            " PARTITION BY HASH (object_id)"
+        )
+        statements.extend(
+            f"CREATE TABLE {qn(f'{partition}_h{remainder}')} PARTITION OF {qn(partition)}"
+            f" FOR VALUES WITH (MODULUS {hash_partitions}, REMAINDER {remainder})"
+            for remainder in range(hash_partitions)
+        )
+    statements.append(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(new_table)} DEFAULT")
+
+    # Créé avant la copie : CREATE TRIGGER attend la fin des écritures en cours, toutes
+    # les suivantes sont journalisées
+    log_table, log_function = _log_names(model)
+    statements += [
+        f"CREATE TABLE {qn(log_table)} (seq bigserial PRIMARY KEY, id bigint NOT NULL)",
+        f"CREATE FUNCTION {qn(log_function)}() RETURNS trigger LANGUAGE plpgsql AS $$"
+        f" BEGIN INSERT INTO {qn(log_table)} (id) VALUES (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END);"
+        " RETURN NULL; END $$",
+        f"CREATE TRIGGER {qn(log_function)} AFTER INSERT OR UPDATE OR DELETE ON {qn(table)}"
+        f" FOR EACH ROW EXECUTE FUNCTION {qn(log_function)}()",
+    ]
+    return statements
+
+
+def copy_batch(model, after_id, until_id):
+    qn = connection.ops.quote_name
+    table, new_table, _ = _names(model)
+    columns = _columns(model)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {qn(new_table)} ({columns}) SELECT {columns} FROM {qn(table)} WHERE id > %s AND id <= %s",
+            [after_id, until_id],
+        )
+        return cursor.rowcount
+
+
+def max_id(model, table=None):
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table or model._meta.db_table)}")
+        return cursor.fetchone()[0]
+
+
+def replay(model, batch_size=10000):
+    """
+    Recopie dans la table partitionnée les lignes journalisées (état actuel de l'ancienne
+    table, ou suppression), par lots d'une transaction ; renvoie (insérées, supprimées).
+    Une ligne modifiée pendant un lot est journalisée à nouveau et reprise au suivant.
+    """
+    qn = connection.ops.quote_name
+    table, new_table, _ = _names(model)
+    log_table, _ = _log_names(model)
+    columns = _columns(model)
+    inserted = deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {qn(log_table)} WHERE seq IN (SELECT seq FROM {qn(log_table)} ORDER BY seq LIMIT %s) RETURNING id",
+                [batch_size],
+            )
+            ids = sorted({row[0] for row in cursor.fetchall()})
+            if not ids:
+                return inserted, deleted
+            cursor.execute(f"DELETE FROM {qn(new_table)} WHERE id = ANY(%s)", [ids])
+            deleted += cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {qn(new_table)} ({columns}) SELECT {columns} FROM {qn(table)} WHERE id = ANY(%s)", [ids]
+            )
+            inserted += cursor.rowcount
+
+
+def swap(model):
+    """
+    Rejoue le reste du journal puis substitue la table partitionnée à l'ancienne.
+    Les lectures restent possibles pendant la bascule, les écritures attendent sa fin :
+    elle ne dure que le temps de recopier les lignes modifiées depuis le dernier rejeu.
+    """
+    qn = connection.ops.quote_name
+    table, new_table, old_table = _names(model)
+    log_table, log_function = _log_names(model)
+    unique = UNIQUE_CONSTRAINTS[model]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN SHARE ROW EXCLUSIVE MODE")
+        # Les écritures sont bloquées : le journal ne grandit plus
+        inserted, deleted = replay(model)
+        cursor.execute(f"DROP TRIGGER {qn(log_function)} ON {qn(table)}")
+        cursor.execute(f"DROP FUNCTION {qn(log_function)}()")
+        cursor.execute(f"DROP TABLE {qn(log_table)}")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}")
+        cursor.execute(f"ALTER TABLE {qn(old_table)} RENAME CONSTRAINT {qn(unique)} TO {qn(unique + '_unpartitioned')}")
+        cursor.execute(f"ALTER TABLE {qn(new_table)} RENAME TO {qn(table)}")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME CONSTRAINT {qn(unique + '_p')} TO {qn(unique)}")
+        # Les index déclarés dans Meta.indexes gardent leur nom, connu de l'état des migrations
+        for index in model._meta.indexes:
+            cursor.execute(f"ALTER INDEX {qn(index.name)} RENAME TO {qn(index.name + '_unpartitioned')}")
+            cursor.execute(f"ALTER INDEX {qn(index.name + '_p')} RENAME TO {qn(index.name)}")
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+    return inserted, deleted
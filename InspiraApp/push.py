@@ -0,0 +1,181 @@
+"""
+Diffusion en temps réel des compteurs de likes et de favoris.
+
+Les signaux Like/Favorite marquent l'objet modifié ; un thread de fond
+regroupe les changements et publie au plus une mise à jour par objet et par
+intervalle (PUSH_INTERVAL). Les mises à jour passent par un broker :
+``LocalBroker`` diffuse en mémoire aux abonnés du même processus, et peut être
+remplacé via PUSH_BROKER par une implémentation partagée entre processus
+(même interface ``publish`` / ``subscribe`` / ``unsubscribe``).
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+import InspiraApp.models as inspira_models
+
+CONTENT_MODELS = {
+    "citation": inspira_models.Citation,
+    "thought": inspira_models.Thought,
+}
+
+
+def push_key(kind, object_id):
+    return f"{kind}:{object_id}"
+
+
+class Subscription:
+    """
+    Abonnement d'un client : file asyncio alimentée depuis n'importe quel thread.
+    """
+
+    def __init__(self, keys, loop, max_size=256):
+        self.keys = frozenset(keys)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def _put(self, message):
+        if self.queue.full():
+            # Client trop lent : on abandonne la plus ancienne mise à jour
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self._put, message)
+
+    async def get(self, timeout=None):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class LocalBroker:
+    """
+    Broker en mémoire : diffuse aux abonnés du processus courant.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, keys):
+        subscription = Subscription(keys, asyncio.get_running_loop())
+        with self._lock:
+            for key in subscription.keys:
+                self._subscribers[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for key in subscription.keys:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def has_subscribers(self, key):
+        return key in self._subscribers
+
+    def publish(self, key, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+
+def fetch_counts(kind, object_ids):
+    """
+    Compteurs de likes et favoris pour plusieurs objets d'un même type, en deux requêtes groupées.
+    """
+    target_type = inspira_models.relation_target(CONTENT_MODELS[kind])
+    counts = {object_id: {"type": kind, "id": object_id, "like_count": 0, "favorite_count": 0} for object_id in object_ids}
+    for relation_model, field in ((inspira_models.Like, "like_count"), (inspira_models.Favorite, "favorite_count")):
+        rows = relation_model.objects.filter(
+            target_type=target_type, object_id__in=object_ids
+        ).order_by().values("object_id").annotate(total=Count("pk"))
+        for row in rows:
+            counts[row["object_id"]][field] = row["total"]
+    return counts
+
+
+class CountCoalescer:
+    """
+    Regroupe les changements de compteurs et les publie au plus une fois par intervalle.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._dirty = defaultdict(set)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def mark(self, kind, object_id):
+        with self._lock:
+            self._dirty[kind].add(object_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="push-coalescer", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.flush()
+            # Les changements reçus pendant l'intervalle sont publiés au tour suivant
+            time.sleep(self.interval)
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, defaultdict(set)
+        if not dirty:
+            return
+        broker = get_broker()
+        has_subscribers = getattr(broker, "has_subscribers", lambda key: True)
+        try:
+            for kind, object_ids in dirty.items():
+                # Inutile de recompter les objets que personne n'affiche
+                object_ids = [object_id for object_id in object_ids if has_subscribers(push_key(kind, object_id))]
+                if not object_ids:
+                    continue
+                for object_id, counts in fetch_counts(kind, object_ids).items():
+                    broker.publish(push_key(kind, object_id), counts)
+        finally:
+            close_old_connections()
+
+
+_broker = None
+_coalescer = None
+_init_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _init_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, "PUSH_BROKER", "InspiraApp.push.LocalBroker"))()
+    return _broker
+
+
+def get_coalescer():
+    global _coalescer
+    if _coalescer is None:
+        with _init_lock:
+            if _coalescer is None:
+                _coalescer = CountCoalescer(getattr(settings, "PUSH_INTERVAL", 1.0))
+    return _coalescer
+
+
+def relation_changed(sender, instance, **kwargs):
+    model = inspira_models.RELATION_TARGET_MODELS.get(instance.target_type)
+    kind = model._meta.model_name if model is not None else None
+    if kind in CONTENT_MODELS:
+        object_id = instance.object_id
+        transaction.on_commit(lambda: get_coalescer().mark(kind, object_id))
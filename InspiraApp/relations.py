@@ -0,0 +1,144 @@
+"""
+Application groupée de likes et favoris (rejeu des actions hors-ligne).
+
+Les opérations sont ramenées à l'état final voulu par relation (la dernière
+opération sur un même objet l'emporte), puis écrites dans une seule
+transaction : une lecture verrouillée des relations existantes, une insertion
+groupée et une suppression groupée par (type de relation, type d'objet).
+
+Les écritures groupées n'envoient pas les signaux des modèles : ils sont
+envoyés ici pour chaque ligne créée ou supprimée, comme par save() et
+RelationMixin.delete(), afin que statistiques, compteurs et diffusion temps
+réel (InspiraApp/signals.py) restent à jour. Le fil d'activité est écrit à
+part, en une insertion groupée par lot.
+"""
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+import InspiraApp.models as inspira_models
+from InspiraApp import activity, counters
+
+ACTIONS = {
+    "like": (inspira_models.Like, True),
+    "unlike": (inspira_models.Like, False),
+    "favorite": (inspira_models.Favorite, True),
+    "unfavorite": (inspira_models.Favorite, False),
+}
+TARGET_TYPES = {label: value for value, label in inspira_models.RelationTarget.choices}
+
+
+class ConcurrentUpdate(Exception):
+    """
+    Une autre requête a modifié les mêmes relations pendant le lot ; il est annulé.
+    """
+
+
+def parse_operation(operation):
+    """
+    (modèle de relation, type d'objet, id, état voulu) d'une opération ; ValueError si elle est invalide.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError("Each operation must be an object.")
+    if operation.get("action") not in ACTIONS:
+        raise ValueError("action must be one of: %s." % ", ".join(ACTIONS))
+    if operation.get("type") not in TARGET_TYPES:
+        raise ValueError("type must be one of: %s." % ", ".join(TARGET_TYPES))
+    relation_model, state = ACTIONS[operation["action"]]
+    object_id = operation.get("id")
+    # Borné par la colonne object_id : au-delà, la base refuserait la requête
+    max_id = inspira_models.max_id(relation_model, "object_id")
+    if isinstance(object_id, bool) or not isinstance(object_id, int) or not 0 < object_id <= max_id:
+        raise ValueError("id must be a positive integer no greater than %d." % max_id)
+    return relation_model, TARGET_TYPES[operation["type"]], object_id, state
+
+
+def _write(user, relation_model, target_type, states):
+    """
+    Amène les relations de l'utilisateur à l'état voulu {object_id: bool} pour un type d'objet.
+    """
+    using = router.db_for_write(relation_model)
+    relations = relation_model._base_manager.using(using).filter(user=user, target_type=target_type)
+    # Verrouillées jusqu'au commit : un lot concurrent du même utilisateur attend puis relit l'état à jour
+    current = {relation.object_id: relation for relation in relations.filter(object_id__in=list(states)).select_for_update()}
+
+    created = [
+        relation_model(user=user, target_type=target_type, object_id=object_id)
+        for object_id, state in states.items() if state and object_id not in current
+    ]
+    if created:
+        relation_model._base_manager.using(using).bulk_create(created)
+        activity.record_many(relation_model, created, removed=False)
+        for relation in created:
+            post_save.send(sender=relation_model, instance=relation, created=True, update_fields=None, raw=False, using=using)
+
+    deleted = [relation for object_id, relation in current.items() if not states[object_id]]
+    if deleted:
+        # Filtré sur (target_type, object_id) : une seule partition ouverte (voir RelationMixin.delete)
+        queryset = relations.filter(object_id__in=[relation.object_id for relation in deleted])
+        for relation in deleted:
+            pre_delete.send(sender=relation_model, instance=relation, using=using, origin=queryset)
+        if queryset._raw_delete(using) != len(deleted):
+            # Lignes supprimées entre la lecture et la suppression (base sans verrou de ligne) :
+            # les signaux décompteraient deux fois la même suppression
+            raise ConcurrentUpdate()
+        activity.record_many(relation_model, deleted, removed=True)
+        for relation in deleted:
+            post_delete.send(sender=relation_model, instance=relation, using=using, origin=queryset)
+
+
+def apply_operations(user, operations):
+    """
+    Applique une liste ordonnée d'opérations {"action", "type", "id"} pour un utilisateur.
+    Renvoie (résultat par opération, compteurs finaux {type: {id: compteurs}}).
+    """
+    parsed = []
+    for operation in operations:
+        try:
+            parsed.append(parse_operation(operation))
+        except ValueError as error:
+            parsed.append(error)
+
+    requested = defaultdict(set)
+    for item in parsed:
+        if not isinstance(item, ValueError):
+            requested[item[1]].add(item[2])
+    existing = {
+        target_type: set(
+            inspira_models.RELATION_TARGET_MODELS[target_type].objects.filter(pk__in=object_ids).values_list("pk", flat=True)
+        )
+        for target_type, object_ids in requested.items()
+    }
+
+    # État final par relation : la dernière opération l'emporte
+    desired = defaultdict(dict)
+    for item in parsed:
+        if not isinstance(item, ValueError) and item[2] in existing[item[1]]:
+            relation_model, target_type, object_id, state = item
+            desired[relation_model, target_type][object_id] = state
+
+    with transaction.atomic():
+        for (relation_model, target_type), states in desired.items():
+            _write(user, relation_model, target_type, states)
+
+    results = []
+    for item in parsed:
+        if isinstance(item, ValueError):
+            results.append({"status": 400, "detail": str(item)})
+            continue
+        relation_model, target_type, object_id, _ = item
+        if object_id not in existing[target_type]:
+            label = inspira_models.RelationTarget(target_type).label
+            results.append({"status": 404, "detail": f"{label.capitalize()} not found."})
+        else:
+            results.append({"status": 200, "active": desired[relation_model, target_type][object_id]})
+
+    # Lus après le commit : les compteurs en cache ont reçu les incréments
+    counts = {
+        inspira_models.RelationTarget(target_type).label: counters.get_counts(
+            inspira_models.RELATION_TARGET_MODELS[target_type]._meta.model_name, sorted(object_ids)
+        )
+        for target_type, object_ids in existing.items() if object_ids
+    }
+    return results, counts
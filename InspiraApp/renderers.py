@@ -0,0 +1,41 @@
+"""
+Format compact MessagePack pour l'API, sélectionné via ``Accept: application/msgpack``.
+
+Le module ``msgpack`` est optionnel : les classes ne sont enregistrées dans
+REST_FRAMEWORK que s'il est installé.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+try:
+    import msgpack
+except ImportError:  # msgpack est optionnel
+    msgpack = None
+
+
+_encoder = encoders.JSONEncoder()
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        # Les dates, décimaux, UUID, etc. sont convertis comme en JSON
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
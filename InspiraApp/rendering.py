@@ -0,0 +1,219 @@
+"""
+Rendu des paragraphes (RichTextField CKEditor) pour les clients mobiles.
+
+Le rendu est calculé à l'enregistrement d'un paragraphe et stocké avec lui :
+HTML assaini (liste blanche de balises et d'attributs, contenu des scripts et
+styles supprimé, liens limités aux schémas sûrs), texte brut, nombre de mots
+et temps de lecture. Les totaux de la pensée (mots, temps de lecture, extrait)
+sont recalculés depuis ses paragraphes actifs après chaque modification.
+
+Les sérialiseurs lisent ces colonnes : aucun HTML n'est analysé par requête.
+Quand les règles ci-dessous changent, incrémenter RENDER_VERSION puis lancer
+``manage.py render_paragraphs`` pour mettre à jour les paragraphes existants.
+"""
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.text import Truncator
+
+import InspiraApp.models as inspira_models
+
+RENDER_VERSION = 1
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "em", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img",
+    "li", "ol", "p", "s", "strong", "sub", "sup", "u", "ul",
+}
+ALLOWED_ATTRIBUTES = {"a": ("href", "title"), "img": ("src", "alt")}
+URL_ATTRIBUTES = {"href", "src"}
+URL_SCHEMES = {"", "http", "https", "mailto"}
+# Balises supprimées avec leur contenu ; les autres balises non autorisées sont retirées en gardant leur texte
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript", "title", "head"}
+VOID_TAGS = {"br", "hr", "img"}
+IMPLIED_END_TAGS = {"li", "p"}
+# Fin de ligne dans le texte brut
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "br", "div", "dd", "dl", "dt", "figcaption", "figure", "footer",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "ol", "p", "pre", "section", "table", "td",
+    "th", "tr", "ul",
+}
+
+WORD_RE = re.compile(r"\w+(?:['’-]\w+)*")
+
+
+class _Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropped = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropped += 1
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in ALLOWED_TAGS:
+            return
+        if tag in IMPLIED_END_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            # <li>un<li>deux : le second élément ferme le premier
+            self.html.append(f"</{self.open_tags.pop()}>")
+
+        rendered = []
+        for name, value in attrs:
+            if name not in ALLOWED_ATTRIBUTES.get(tag, ()) or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not self.safe_url(value):
+                continue
+            rendered.append(f' {name}="{escape(value)}"')
+        if tag == "a":
+            rendered.append(' rel="nofollow noopener"')
+        self.html.append(f"<{tag}{''.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropped = max(self.dropped - 1, 0)
+            return
+        if self.dropped:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag in self.open_tags:
+            # Ferme aussi les balises restées ouvertes à l'intérieur
+            while self.open_tags:
+                open_tag = self.open_tags.pop()
+                self.html.append(f"</{open_tag}>")
+                if open_tag == tag:
+                    break
+
+    def handle_data(self, data):
+        if self.dropped:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f"</{self.open_tags.pop()}>")
+
+    @staticmethod
+    def safe_url(value):
+        try:
+            scheme = urlsplit(value.strip()).scheme.lower()
+        except ValueError:
+            return False
+        return scheme in URL_SCHEMES
+
+
+def render_html(content):
+    """
+    Renvoie (html assaini, texte brut) pour un contenu HTML.
+    """
+    renderer = _Renderer()
+    renderer.feed(content or "")
+    renderer.close()
+    lines = (" ".join(line.split()) for line in "".join(renderer.text).split("\n"))
+    return "".join(renderer.html).strip(), "\n".join(line for line in lines if line)
+
+
+def count_words(text):
+    return len(WORD_RE.findall(text))
+
+
+def reading_time(word_count):
+    """
+    Temps de lecture estimé, en secondes.
+    """
+    words_per_minute = getattr(settings, "READING_WORDS_PER_MINUTE", 200)
+    return math.ceil(word_count * 60 / words_per_minute)
+
+
+def render_paragraph(paragraph):
+    """
+    Calcule les champs de rendu d'un paragraphe (sans l'enregistrer).
+    """
+    paragraph.content_html, paragraph.content_text = render_html(paragraph.content)
+    paragraph.word_count = count_words(paragraph.content_text)
+    paragraph.reading_time = reading_time(paragraph.word_count)
+    paragraph.render_version = RENDER_VERSION
+    return paragraph
+
+
+def update_thoughts(thought_ids):
+    """
+    Recalcule mots, temps de lecture et extrait des pensées données depuis leurs paragraphes actifs.
+    """
+    texts, words = {}, {}
+    paragraphs = (
+        inspira_models.Paragraph.objects.filter(thought__in=thought_ids, active=True)
+        .order_by("created_at", "pk").values_list("thought_id", "content_text", "word_count")
+    )
+    for thought_id, text, word_count in paragraphs.iterator():
+        texts.setdefault(thought_id, []).append(text)
+        words[thought_id] = words.get(thought_id, 0) + word_count
+
+    excerpt_words = getattr(settings, "THOUGHT_EXCERPT_WORDS", 40)
+    for thought_id in thought_ids:
+        word_count = words.get(thought_id, 0)
+        inspira_models.Thought.objects.filter(pk=thought_id).update(
+            word_count=word_count,
+            reading_time=reading_time(word_count),
+            excerpt=Truncator(" ".join(texts.get(thought_id, ()))).words(excerpt_words),
+        )
+
+
+def paragraph_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    render_paragraph(instance)
+    # Pensée avant modification, pour mettre aussi à jour l'ancienne pensée
+    instance._previous_thought_id = None
+    if instance.pk:
+        instance._previous_thought_id = (
+            sender.objects.filter(pk=instance.pk).values_list("thought_id", flat=True).first()
+        )
+
+
+def paragraph_changed(sender, instance, **kwargs):
+    thought_ids = {instance.thought_id, getattr(instance, "_previous_thought_id", None)} - {None}
+    transaction.on_commit(lambda: update_thoughts(thought_ids))
+
+
+def render_paragraphs(everything=False, batch_size=500):
+    """
+    Recalcule le rendu des paragraphes d'une version antérieure (tous si everything), puis les totaux
+    des pensées concernées. Renvoie (paragraphes, pensées).
+    """
+    queryset = inspira_models.Paragraph.objects.order_by("pk").only("pk", "thought_id", "content")
+    if not everything:
+        queryset = queryset.exclude(render_version=RENDER_VERSION)
+
+    fields = ["content_html", "content_text", "word_count", "reading_time", "render_version"]
+    paragraph_count, thought_ids, batch = 0, set(), []
+    for paragraph in queryset.iterator(chunk_size=batch_size):
+        batch.append(render_paragraph(paragraph))
+        thought_ids.add(paragraph.thought_id)
+        if len(batch) >= batch_size:
+            inspira_models.Paragraph.objects.bulk_update(batch, fields)
+            paragraph_count += len(batch)
+            batch = []
+    if batch:
+        inspira_models.Paragraph.objects.bulk_update(batch, fields)
+        paragraph_count += len(batch)
+
+    thought_ids = sorted(thought_ids)
+    for start in range(0, len(thought_ids), batch_size):
+        update_thoughts(thought_ids[start:start + batch_size])
+    return paragraph_count, len(thought_ids)
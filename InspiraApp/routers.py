@@ -0,0 +1,92 @@
+"""
+Routage primaire / réplicas.
+
+Les lectures d'une requête HTTP sûre (GET, HEAD, OPTIONS) partent vers un
+réplica ; tout le reste (écritures, commandes, tâches de fond) reste sur la base
+primaire. Après une écriture réussie, l'utilisateur est épinglé sur la primaire
+pendant DATABASE_REPLICA_PIN_SECONDS pour qu'il relise ses propres écritures
+(like, favori...) malgré le retard de réplication.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+PIN_CACHE_KEY = "db-pin:{}"
+PIN_COOKIE = "db_pin"
+
+_routing_state = ContextVar("inspira_routing_state", default=None)
+
+
+class RoutingState:
+    def __init__(self, request, replica_allowed):
+        self.request = request
+        self.replica_allowed = replica_allowed
+        self.wrote = False
+        self._pinned = {}
+
+    def is_pinned(self):
+        if self.request.COOKIES.get(PIN_COOKIE):
+            return True
+        user = authenticated_user(self.request)
+        if user is None:
+            return False
+        if user.pk not in self._pinned:
+            self._pinned[user.pk] = bool(cache.get(PIN_CACHE_KEY.format(user.pk)))
+        return self._pinned[user.pk]
+
+
+def authenticated_user(request):
+    """
+    Utilisateur déjà authentifié de la requête (DRF y recopie l'utilisateur JWT),
+    sans évaluer un utilisateur paresseux : cela déclencherait une lecture en base.
+    """
+    user = request.__dict__.get("user")
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def begin_request(request, replica_allowed):
+    return _routing_state.set(RoutingState(request, replica_allowed))
+
+
+def end_request(token):
+    _routing_state.reset(token)
+
+
+def pin_user(user):
+    cache.set(PIN_CACHE_KEY.format(user.pk), True, getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 5))
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        replicas = replica_aliases()
+        if state is None or not replicas or not state.replica_allowed or state.wrote:
+            return "default"
+        if state.is_pinned():
+            return "default"
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None:
+            # Les lectures suivantes de la requête doivent voir cette écriture
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Tous les alias pointent vers les mêmes données
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -0,0 +1,143 @@
+"""
+Citation du jour et citation au hasard, sans ORDER BY RANDOM().
+
+Chaque processus garde en mémoire les identifiants des citations actives, dans
+des tableaux compacts (un par catégorie, plus un pour toutes les catégories).
+Une modification de citation change la version publiée dans le cache partagé ;
+les processus rechargent leurs tableaux (une requête) au premier appel qui
+constate le changement. Un tirage au hasard est alors un simple accès par index.
+
+La citation du jour est tirée une fois par jour et par catégorie puis conservée
+dans DailyQuote (``manage.py select_daily_quotes`` la précalcule à minuit). Le
+tirage dépend seulement de la date et de la catégorie : deux workers qui la
+calculent en même temps choisissent la même citation.
+
+Pour un utilisateur connecté, les RANDOM_QUOTE_HISTORY dernières citations
+tirées au hasard sont mémorisées en cache et ne sont pas reproposées.
+"""
+import hashlib
+import random
+import threading
+import uuid
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils.timezone import localdate
+
+import InspiraApp.models as inspira_models
+
+VERSION_KEY = "citation-ids-version"
+DAILY_KEY = "daily-quote:{}:{}:{}"
+DAILY_TIMEOUT = 60 * 60 * 24
+HISTORY_KEY = "quote-history:{}"
+HISTORY_TIMEOUT = 60 * 60 * 24
+
+_lock = threading.Lock()
+_loaded_version = None
+_ids = {}
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def active_citation_ids(category_id=None):
+    """
+    Identifiants des citations actives d'une catégorie (None : toutes), rechargés si la version a changé.
+    """
+    global _loaded_version, _ids
+
+    version = _current_version()
+    if version != _loaded_version:
+        with _lock:
+            if version != _loaded_version:
+                ids = {None: array("q")}
+                rows = inspira_models.Citation.objects.filter(active=True).order_by("pk").values_list("pk", "category_id")
+                for pk, category in rows.iterator():
+                    ids[None].append(pk)
+                    if category is not None:
+                        ids.setdefault(category, array("q")).append(pk)
+                _ids, _loaded_version = ids, version
+    return _ids.get(category_id, ())
+
+
+def citations_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def daily_citation_id(category_id=None, today=None):
+    """
+    Identifiant de la citation du jour de la catégorie (None : toutes catégories), tirée au premier appel.
+    """
+    today = today or localdate()
+    # La clé inclut la version : une citation désactivée n'est plus servie depuis le cache
+    key = DAILY_KEY.format(_current_version(), today.isoformat(), category_id)
+    citation_id = cache.get(key)
+    if citation_id is not None:
+        return citation_id
+
+    citation_id = (
+        inspira_models.DailyQuote.objects.filter(date=today, category_id=category_id, citation__active=True)
+        .values_list("citation_id", flat=True).first()
+    )
+    if citation_id is not None:
+        cache.set(key, citation_id, DAILY_TIMEOUT)
+        return citation_id
+
+    ids = active_citation_ids(category_id)
+    if not ids:
+        return None
+
+    digest = hashlib.sha256(f"{today.isoformat()}:{category_id}".encode()).digest()
+    citation_id = ids[int.from_bytes(digest[:8], "big") % len(ids)]
+    try:
+        with transaction.atomic():
+            # Remplace aussi une citation du jour désactivée entre-temps
+            inspira_models.DailyQuote.objects.update_or_create(
+                date=today, category_id=category_id, defaults={"citation_id": citation_id}
+            )
+    except IntegrityError:
+        # Un autre worker l'a enregistrée au même moment (avec le même tirage)
+        pass
+    cache.set(key, citation_id, DAILY_TIMEOUT)
+    return citation_id
+
+
+def random_citation_id(category_id=None, user=None):
+    """
+    Identifiant d'une citation active au hasard, hors des dernières tirées pour cet utilisateur.
+    """
+    ids = active_citation_ids(category_id)
+    if not ids:
+        return None
+
+    history_size = getattr(settings, "RANDOM_QUOTE_HISTORY", 20)
+    key = HISTORY_KEY.format(user.pk) if user is not None and user.is_authenticated else None
+    recent = cache.get(key, []) if key else []
+    # Ne jamais exclure toutes les citations d'une petite catégorie
+    excluded = set(recent[-min(len(recent), len(ids) - 1):]) if len(ids) > 1 and recent else set()
+
+    start = random.randrange(len(ids))
+    citation_id = ids[start]
+    if citation_id in excluded:
+        # Quelques tirages, puis parcours depuis le dernier : au plus len(excluded) + 1 éléments lus
+        for _ in range(3):
+            start = random.randrange(len(ids))
+            citation_id = ids[start]
+            if citation_id not in excluded:
+                break
+        else:
+            for offset in range(1, len(excluded) + 1):
+                citation_id = ids[(start + offset) % len(ids)]
+                if citation_id not in excluded:
+                    break
+
+    if key:
+        cache.set(key, (recent + [citation_id])[-history_size:], HISTORY_TIMEOUT)
+    return citation_id
@@ -1,9 +1,165 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
 import InspiraApp.models as inspira_models 
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 
+def parse_field_tree(value):
+    """
+    Transforme "id,title,citations.title" en {"id": {}, "title": {}, "citations": {"title": {}}}.
+    """
+    tree = {}
+    for item in (value or "").split(","):
+        node = tree
+        for part in item.strip().split("."):
+            if part:
+                node = node.setdefault(part, {})
+    return tree
+
+
+class SparseFieldsMixin:
+    """
+    Ajoute le support de ?fields= et ?expand= à un ModelSerializer.
+
+    - ``?fields=id,title`` limite les champs renvoyés ; la notation pointée
+      s'applique aux sérialiseurs imbriqués (``?fields=id,citations.title``).
+    - ``?expand=category`` remplace les champs de Meta.expandable_fields par
+      leur représentation imbriquée.
+    - Les champs de Meta.deferred_fields (compteurs...) ne sont calculés que
+      s'ils sont demandés dans ``fields`` ou ``expand``.
+    - Meta.field_dependencies liste les colonnes lues indirectement par un champ.
+
+    ``optimize_queryset`` applique ensuite la sélection au queryset (.only(),
+    select_related, prefetch, annotations) pour ne lire que les colonnes utiles.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._fields_param = kwargs.pop("fields", None)
+        self._expand_param = kwargs.pop("expand", None)
+        super().__init__(*args, **kwargs)
+
+    def _field_path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                path.append(node.field_name)
+            node = node.parent
+        return list(reversed(path))
+
+    def _requested_trees(self):
+        root = self.root
+        fields_param = getattr(root, "_fields_param", None)
+        expand_param = getattr(root, "_expand_param", None)
+        request = self.context.get("request")
+        if request is not None:
+            # Request DRF ou HttpRequest Django (vues asynchrones)
+            params = getattr(request, "query_params", request.GET)
+            if fields_param is None:
+                fields_param = params.get("fields")
+            if expand_param is None:
+                expand_param = params.get("expand")
+
+        fields_tree, expand_tree = parse_field_tree(fields_param), parse_field_tree(expand_param)
+        for part in self._field_path():
+            fields_tree = fields_tree.get(part, {})
+            expand_tree = expand_tree.get(part, {})
+        return fields_tree, expand_tree
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self._requested_trees()
+        meta = getattr(self, "Meta", None)
+
+        for name, serializer_name in getattr(meta, "expandable_fields", {}).items():
+            if name in expand and name in fields:
+                fields[name] = globals()[serializer_name](read_only=True)
+
+        for name in getattr(meta, "deferred_fields", ()):
+            if name not in requested and name not in expand:
+                fields.pop(name, None)
+
+        if requested:
+            # Un champ déplié est renvoyé même s'il n'est pas cité dans ?fields=
+            fields = {name: field for name, field in fields.items() if name in requested or name in expand}
+        return fields
+
+    def optimize_queryset(self, queryset, extra_only=()):
+        """
+        Restreint le queryset aux colonnes nécessaires aux champs sélectionnés.
+        """
+        only, select_related, prefetches = self._queryset_plan(queryset.model)
+        for name in self.fields:
+            annotate = getattr(self, f"annotate_{name}", None)
+            if annotate is not None:
+                queryset = annotate(queryset)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset.only(*only, *extra_only)
+
+    def _queryset_plan(self, model, prefix=""):
+        only = {prefix + model._meta.pk.name}
+        select_related, prefetches = [], []
+        dependencies = getattr(getattr(self, "Meta", None), "field_dependencies", {})
+        for name, field in self.fields.items():
+            # Colonnes lues indirectement par un champ (ex. __str__ d'un objet lié)
+            only.update(prefix + column for column in dependencies.get(name, ()))
+            source = field.source
+            if source == "*" or "." in source:
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+
+            if model_field.one_to_many or model_field.many_to_many:
+                if prefix:
+                    continue
+                # Relation inverse : préchargée avec la clé étrangère nécessaire au regroupement
+                related_queryset = model_field.related_model.objects.all()
+                child = getattr(field, "child", None)
+                if isinstance(child, SparseFieldsMixin):
+                    related_queryset = child.optimize_queryset(related_queryset, extra_only=(model_field.field.name,))
+                prefetches.append(Prefetch(source, queryset=related_queryset))
+            elif (model_field.many_to_one or model_field.one_to_one) and isinstance(field, SparseFieldsMixin):
+                # Clé étrangère ou relation 1-1 dépliée : jointure plutôt qu'une requête par ligne
+                nested_only, nested_select, _ = field._queryset_plan(model_field.related_model, prefix=f"{prefix}{source}__")
+                only.add(prefix + source)
+                only.update(nested_only)
+                select_related.append(prefix + source)
+                select_related.extend(nested_select)
+            elif model_field.concrete:
+                only.add(prefix + model_field.name)
+        return only, select_related, prefetches
+
+
+class RelationCountMixin:
+    """
+    Compteurs de likes et de favoris : lus depuis les annotations posées par
+    ``optimize_queryset`` quand elles existent, sinon calculés par objet.
+    """
+
+    def annotate_like_count(self, queryset):
+        return queryset.annotate(_like_count=inspira_models.relation_count(inspira_models.Like, queryset.model))
+
+    def annotate_favorite_count(self, queryset):
+        return queryset.annotate(_favorite_count=inspira_models.relation_count(inspira_models.Favorite, queryset.model))
+
+    def get_like_count(self, obj):
+        if hasattr(obj, "_like_count"):
+            return obj._like_count
+        return obj.like_count()
+
+    def get_favorite_count(self, obj):
+        if hasattr(obj, "_favorite_count"):
+            return obj._favorite_count
+        return obj.favorite_count()
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
@@ -48,56 +204,89 @@ class ProfileSerializer(serializers.ModelSerializer):
         model = inspira_models.Profile
         fields = "__all__"
 
+    def update(self, instance, validated_data):
+        # N'écrit que les colonnes modifiées ; sans modification, ni écriture ni nouvel updated_at
+        changed = [name for name, value in validated_data.items() if getattr(instance, name) != value]
+        for name in changed:
+            setattr(instance, name, validated_data[name])
+        if changed:
+            instance.save(update_fields=[*changed, "updated_at"])
+        return instance
+
 class PasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
-class CitationListSerializer(serializers.ModelSerializer):
+class CitationListSerializer(SparseFieldsMixin, RelationCountMixin, serializers.ModelSerializer):
+    like_count = serializers.SerializerMethodField()
+    favorite_count = serializers.SerializerMethodField()
+
     class Meta:
         model = inspira_models.Citation
-        fields = ('id', 'title', 'slug', 'author', 'description', 'image', 'active', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'slug', 'author', 'description', 'image', 'active', 'category', 'like_count', 'favorite_count', 'created_at', 'updated_at')
+        deferred_fields = ('category', 'like_count', 'favorite_count')
+        expandable_fields = {'category': 'CategoryListSerializer'}
 
-class CitationDetailSerializer(serializers.ModelSerializer):
+class CitationDetailSerializer(SparseFieldsMixin, RelationCountMixin, serializers.ModelSerializer):
     like_count = serializers.SerializerMethodField()
     favorite_count = serializers.SerializerMethodField()
 
     class Meta:
         model = inspira_models.Citation
-        fields = ('id', 'title', 'slug', 'author', 'description', 'image', 'active', 'like_count', 'favorite_count', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'slug', 'author', 'description', 'image', 'active', 'category', 'like_count', 'favorite_count', 'created_at', 'updated_at')
+        deferred_fields = ('category',)
+        expandable_fields = {'category': 'CategoryListSerializer'}
 
-    def get_like_count(self, obj):
-        return obj.like_count()
+class ParagraphSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Rendu précalculé à l'enregistrement (InspiraApp/rendering.py)
+    html = serializers.CharField(source='content_html', read_only=True)
+    text = serializers.CharField(source='content_text', read_only=True)
+
+    class Meta:
+        model = inspira_models.Paragraph
+        fields = ('id', 'html', 'text', 'word_count', 'reading_time')
+
+    def optimize_queryset(self, queryset, extra_only=()):
+        # Paragraphes publiés, dans l'ordre de lecture
+        return super().optimize_queryset(queryset.filter(active=True).order_by('created_at', 'pk'), extra_only)
 
-    def get_favorite_count(self, obj):
-        return obj.favorite_count()
 
-class ThoughtListSerializer(serializers.ModelSerializer):
+class ThoughtListSerializer(SparseFieldsMixin, RelationCountMixin, serializers.ModelSerializer):
+    like_count = serializers.SerializerMethodField()
+    favorite_count = serializers.SerializerMethodField()
+
     class Meta:
         model = inspira_models.Thought
-        fields = ('id', 'title', 'slug', 'author', 'description', 'image', 'active', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'slug', 'author', 'description', 'excerpt', 'word_count', 'reading_time', 'image', 'active', 'category', 'like_count', 'favorite_count', 'created_at', 'updated_at')
+        deferred_fields = ('category', 'like_count', 'favorite_count')
+        expandable_fields = {'category': 'CategoryListSerializer'}
 
 
-class ThoughtDetailSerializer(serializers.ModelSerializer):
+class ThoughtDetailSerializer(SparseFieldsMixin, RelationCountMixin, serializers.ModelSerializer):
     like_count = serializers.SerializerMethodField()
     favorite_count = serializers.SerializerMethodField()
-    paragraphs = serializers.StringRelatedField(many=True)  
+    paragraphs = ParagraphSerializer(many=True, read_only=True)
 
     class Meta:
         model = inspira_models.Thought
-        fields = ('id', 'title', 'slug', 'author', 'description', 'image', 'active', 'like_count', 'favorite_count', 'paragraphs', 'created_at', 'updated_at')
+        fields = ('id', 'title', 'slug', 'author', 'description', 'excerpt', 'word_count', 'reading_time', 'image', 'active', 'category', 'like_count', 'favorite_count', 'paragraphs', 'created_at', 'updated_at')
+        deferred_fields = ('category',)
+        expandable_fields = {'category': 'CategoryListSerializer'}
 
-    def get_like_count(self, obj):
-        return obj.like_count()
 
-    def get_favorite_count(self, obj):
-        return obj.favorite_count()
+class CategoryStatisticsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = inspira_models.CategoryStatistics
+        fields = ('citation_count', 'thought_count', 'like_count', 'favorite_count')
+
 
+class CategoryListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    statistics = CategoryStatisticsSerializer(read_only=True)  # Lu par jointure, sans requête supplémentaire
 
-class CategoryListSerializer(serializers.ModelSerializer):
     class Meta:
         model = inspira_models.Category
-        fields = ('id', 'name', 'slug', 'description', 'created_at', 'updated_at')
+        fields = ('id', 'name', 'slug', 'description', 'statistics', 'created_at', 'updated_at')
 
-class CategoryDetailSerializer(serializers.ModelSerializer):
+class CategoryDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     citations = CitationListSerializer(many=True, read_only=True)  # Relation inversée pour Citation
     thoughts = ThoughtListSerializer(many=True, read_only=True)    # Relation inversée pour Thought
 
@@ -118,6 +307,36 @@ class CombinedCitationsAndThoughtsSerializer(serializers.Serializer):
     thoughts = ThoughtListSerializer(many=True, read_only=True)
 
 
+class ActivitySerializer(serializers.ModelSerializer):
+    """
+    Ligne du fil d'activité ; l'objet visé est lu dans context["targets"] (voir InspiraApp/activity.py).
+    """
+    verb = serializers.CharField(source='get_verb_display', read_only=True)
+    target_type = serializers.CharField(source='get_target_type_display', read_only=True)
+    target = serializers.SerializerMethodField()
+
+    class Meta:
+        model = inspira_models.Activity
+        fields = ('id', 'verb', 'target_type', 'object_id', 'target', 'created_at')
+
+    def get_target(self, activity):
+        return self.context.get('targets', {}).get((activity.target_type, activity.object_id))
+
+class CitationBundleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = inspira_models.Citation
+        fields = ('id', 'category', 'title', 'slug', 'author', 'description', 'image', 'created_at', 'updated_at')
+
+
+class ThoughtBundleSerializer(serializers.ModelSerializer):
+    # Les paragraphes doivent être préchargés (actifs uniquement) par l'appelant
+    paragraphs = serializers.SlugRelatedField(slug_field='content_html', many=True, read_only=True)
+
+    class Meta:
+        model = inspira_models.Thought
+        fields = ('id', 'category', 'title', 'slug', 'author', 'description', 'image', 'paragraphs', 'created_at', 'updated_at')
+
+
 class AboutSerializer(serializers.ModelSerializer):
     class Meta:
         model = inspira_models.About
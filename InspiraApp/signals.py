@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+import InspiraApp.models as inspira_models
+from InspiraApp import activity, bundles, counters, hotcache, push, rendering, selection, statistics, storage
+
+# Reconstruction incrémentale du bundle hors-ligne
+for model in bundles.MODEL_SECTIONS:
+    post_save.connect(bundles.content_changed, sender=model, dispatch_uid=f"bundle_save_{model.__name__}")
+    post_delete.connect(bundles.content_changed, sender=model, dispatch_uid=f"bundle_delete_{model.__name__}")
+
+# Statistiques par catégorie
+post_save.connect(statistics.category_created, sender=inspira_models.Category, dispatch_uid="statistics_category")
+for model in statistics.CONTENT_MODELS:
+    pre_save.connect(statistics.content_pre_save, sender=model, dispatch_uid=f"statistics_pre_save_{model.__name__}")
+    post_save.connect(statistics.content_changed, sender=model, dispatch_uid=f"statistics_save_{model.__name__}")
+    post_delete.connect(statistics.content_changed, sender=model, dispatch_uid=f"statistics_delete_{model.__name__}")
+for model in statistics.COUNTER_FIELDS:
+    post_save.connect(statistics.relation_saved, sender=model, dispatch_uid=f"statistics_save_{model.__name__}")
+    post_delete.connect(statistics.relation_deleted, sender=model, dispatch_uid=f"statistics_delete_{model.__name__}")
+
+# Diffusion temps réel des compteurs
+for model in statistics.COUNTER_FIELDS:
+    post_save.connect(push.relation_changed, sender=model, dispatch_uid=f"push_save_{model.__name__}")
+    post_delete.connect(push.relation_changed, sender=model, dispatch_uid=f"push_delete_{model.__name__}")
+
+# Références des images stockées par contenu
+for model in (inspira_models.Category, inspira_models.Citation, inspira_models.Thought):
+    post_save.connect(storage.update_references, sender=model, dispatch_uid=f"blob_save_{model.__name__}")
+    post_delete.connect(storage.drop_references, sender=model, dispatch_uid=f"blob_delete_{model.__name__}")
+
+# Identifiants des citations actives (citation du jour, citation au hasard)
+post_save.connect(selection.citations_changed, sender=inspira_models.Citation, dispatch_uid="selection_save_citation")
+post_delete.connect(selection.citations_changed, sender=inspira_models.Citation, dispatch_uid="selection_delete_citation")
+
+# Rendu des paragraphes (HTML assaini, texte, temps de lecture)
+pre_save.connect(rendering.paragraph_pre_save, sender=inspira_models.Paragraph, dispatch_uid="rendering_pre_save_paragraph")
+post_save.connect(rendering.paragraph_changed, sender=inspira_models.Paragraph, dispatch_uid="rendering_save_paragraph")
+post_delete.connect(rendering.paragraph_changed, sender=inspira_models.Paragraph, dispatch_uid="rendering_delete_paragraph")
+
+# Fil d'activité des utilisateurs
+for model in activity.VERBS:
+    post_save.connect(activity.relation_saved, sender=model, dispatch_uid=f"activity_save_{model.__name__}")
+    post_delete.connect(activity.relation_deleted, sender=model, dispatch_uid=f"activity_delete_{model.__name__}")
+
+# Compteurs par objet dans le cache partagé
+for model in counters.FIELDS:
+    post_save.connect(counters.relation_saved, sender=model, dispatch_uid=f"counters_save_{model.__name__}")
+    post_delete.connect(counters.relation_deleted, sender=model, dispatch_uid=f"counters_delete_{model.__name__}")
+
+# Invalidation du cache de détails par processus (après le rendu des paragraphes)
+for model in (inspira_models.Citation, inspira_models.Thought, inspira_models.Paragraph):
+    post_save.connect(hotcache.content_changed, sender=model, dispatch_uid=f"hotcache_save_{model.__name__}")
+    post_delete.connect(hotcache.content_changed, sender=model, dispatch_uid=f"hotcache_delete_{model.__name__}")
@@ -0,0 +1,115 @@
+"""
+Statistiques matérialisées par catégorie (CategoryStatistics).
+
+Les likes et favoris, très fréquents, sont répercutés par incrément atomique.
+Les modifications de citations et de pensées, rares, recalculent les
+catégories concernées. ``rebuild_category_statistics()`` sans argument
+reconstruit toute la table.
+
+Les mises à jour passent par update() et bulk_create(), sans signal : la
+section "categories" du bundle hors-ligne, qui contient ces statistiques, est
+remise en file ici.
+"""
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+
+import InspiraApp.models as inspira_models
+from InspiraApp import bundles
+
+CONTENT_MODELS = (inspira_models.Citation, inspira_models.Thought)
+COUNTER_FIELDS = {
+    inspira_models.Like: "like_count",
+    inspira_models.Favorite: "favorite_count",
+}
+
+
+def _grouped(queryset, **aggregate):
+    return {
+        row["category"]: row["value"]
+        for row in queryset.exclude(category=None).values("category").annotate(**aggregate).order_by()
+    }
+
+
+def rebuild_category_statistics(category_ids=None):
+    """
+    Recalcule les statistiques des catégories données (toutes si None)
+    avec un nombre fixe de requêtes groupées.
+    """
+    categories = inspira_models.Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    category_ids = list(categories.values_list("pk", flat=True))
+
+    totals = {pk: {"citation_count": 0, "thought_count": 0, "like_count": 0, "favorite_count": 0} for pk in category_ids}
+    for model in CONTENT_MODELS:
+        items = model.objects.filter(active=True, category__in=category_ids)
+        counter = "citation_count" if model is inspira_models.Citation else "thought_count"
+        for pk, value in _grouped(items, value=Count("pk")).items():
+            totals[pk][counter] = value
+        for relation_model, field in COUNTER_FIELDS.items():
+            annotated = items.annotate(relation_total=inspira_models.relation_count(relation_model, model))
+            for pk, value in _grouped(annotated, value=Sum("relation_total")).items():
+                totals[pk][field] += value or 0
+
+    inspira_models.CategoryStatistics.objects.bulk_create(
+        [inspira_models.CategoryStatistics(category_id=pk, **values) for pk, values in totals.items()],
+        update_conflicts=True,
+        unique_fields=["category"],
+        update_fields=["citation_count", "thought_count", "like_count", "favorite_count", "updated_at"],
+    )
+    bundles.schedule_rebuild("categories")
+    return len(totals)
+
+
+def _target_category(target_type, object_id):
+    """
+    Catégorie de l'objet ciblé par un like/favori, s'il est actif.
+    """
+    model = inspira_models.RELATION_TARGET_MODELS.get(target_type)
+    if model not in CONTENT_MODELS:
+        return None
+    return model.objects.filter(pk=object_id, active=True).values_list("category_id", flat=True).first()
+
+
+def _apply_delta(relation_model, instance, delta):
+    category_id = _target_category(instance.target_type, instance.object_id)
+    if category_id is None:
+        return
+    field = COUNTER_FIELDS[relation_model]
+    updated = inspira_models.CategoryStatistics.objects.filter(category_id=category_id).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+    if updated:
+        bundles.schedule_rebuild("categories")
+    else:
+        rebuild_category_statistics([category_id])
+
+
+def relation_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: _apply_delta(sender, instance, 1))
+
+
+def relation_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: _apply_delta(sender, instance, -1))
+
+
+def content_pre_save(sender, instance, **kwargs):
+    # Catégorie avant modification, pour recalculer aussi l'ancienne catégorie
+    instance._previous_category_id = None
+    if instance.pk:
+        instance._previous_category_id = (
+            sender.objects.filter(pk=instance.pk).values_list("category_id", flat=True).first()
+        )
+
+
+def content_changed(sender, instance, **kwargs):
+    category_ids = {instance.category_id, getattr(instance, "_previous_category_id", None)} - {None}
+    if category_ids:
+        transaction.on_commit(lambda: rebuild_category_statistics(category_ids))
+
+
+def category_created(sender, instance, created, **kwargs):
+    if created:
+        inspira_models.CategoryStatistics.objects.get_or_create(category=instance)
@@ -0,0 +1,119 @@
+"""
+Stockage adressé par contenu des images (citations, pensées, catégories).
+
+Chaque fichier envoyé est haché (SHA-256) au fil de l'écriture et rangé sous
+``blobs/<aa>/<bb>/<hash><ext>`` : une même image n'est stockée qu'une fois,
+quel que soit le nombre d'objets qui l'utilisent. Les références (objet,
+champ) -> blob sont tenues dans BlobReference par des signaux, et
+``manage.py gc_image_blobs`` supprime les blobs qui ne sont plus référencés.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import ImageField
+from django.utils.deconstruct import deconstructible
+from django.utils.timezone import now
+
+BLOB_PREFIX = "blobs/"
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # Le nom définitif dépend du contenu : pas de suffixe anti-collision
+        return name
+
+    def _save(self, name, content):
+        import InspiraApp.models as inspira_models
+
+        extension = os.path.splitext(name)[1].lower()
+        tmp_dir = os.path.join(self.location, BLOB_PREFIX, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+            if hasattr(content, "seek"):
+                content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+                size += len(chunk)
+                tmp.write(chunk)
+
+        hexdigest = digest.hexdigest()
+        blob_name = f"{BLOB_PREFIX}{hexdigest[:2]}/{hexdigest[2:4]}/{hexdigest}{extension}"
+        blob_path = self.path(blob_name)
+        with transaction.atomic():
+            # Ligne verrouillée avant de regarder le disque : si gc_image_blobs supprime ce
+            # blob, on attend son commit et le fichier est réécrit
+            blob, created = inspira_models.StoredBlob.objects.select_for_update().get_or_create(name=blob_name, defaults={"size": size})
+            if not created:
+                # Blob orphelin réutilisé : la référence n'est posée qu'au post_save, le GC doit l'épargner d'ici là
+                inspira_models.StoredBlob.objects.filter(pk=blob.pk).update(last_used_at=now())
+            if os.path.exists(blob_path):
+                os.unlink(tmp.name)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(tmp.name, blob_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(blob_path, self.file_permissions_mode)
+        return blob_name
+
+    def delete(self, name):
+        # Un blob peut être partagé : seul gc_image_blobs le supprime
+        if name and name.startswith(BLOB_PREFIX):
+            return
+        super().delete(name)
+
+    def delete_blob(self, name):
+        super().delete(name)
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    if getattr(settings, "CONTENT_ADDRESSED_MEDIA", True):
+        return content_addressed_storage
+    return default_storage
+
+
+def _blob_fields(instance):
+    return [
+        field for field in instance._meta.concrete_fields
+        if isinstance(field, ImageField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def update_references(sender, instance, **kwargs):
+    """
+    Met à jour les références (objet, champ) -> blob après un enregistrement.
+    """
+    import InspiraApp.models as inspira_models
+
+    content_type = ContentType.objects.get_for_model(sender)
+    for field in _blob_fields(instance):
+        name = getattr(instance, field.attname).name or ""
+        lookup = {"content_type": content_type, "object_id": str(instance.pk), "field_name": field.name}
+        if name.startswith(BLOB_PREFIX):
+            blob = inspira_models.StoredBlob.objects.filter(name=name).first()
+            if blob is None:
+                # Blob présent sur disque mais inconnu (import, restauration...)
+                blob = inspira_models.StoredBlob.objects.create(name=name, size=field.storage.size(name))
+            inspira_models.BlobReference.objects.update_or_create(defaults={"blob": blob}, **lookup)
+        else:
+            inspira_models.BlobReference.objects.filter(**lookup).delete()
+
+
+def drop_references(sender, instance, **kwargs):
+    import InspiraApp.models as inspira_models
+
+    inspira_models.BlobReference.objects.filter(
+        content_type=ContentType.objects.get_for_model(sender), object_id=str(instance.pk)
+    ).delete()
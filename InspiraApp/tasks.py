@@ -0,0 +1,64 @@
+"""
+Tâches exécutées par ``manage.py runworker`` (voir InspiraApp/jobs.py).
+
+Les paramètres sont enregistrés en JSON dans la table des tâches : on y passe
+des identifiants, jamais de secrets (OTP, tokens), émis au moment de l'exécution.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework_simplejwt.tokens import RefreshToken
+
+import InspiraApp.models as inspira_models
+from InspiraApp import bundles, credentials, rendering, statistics
+from InspiraApp.jobs import task
+
+
+@task("send_password_reset_email")
+def send_password_reset_email(user_id):
+    user = inspira_models.User.objects.filter(pk=user_id).only("pk", "email", "username").first()
+    if user is None:
+        return
+
+    otp = credentials.issue(user.pk, credentials.PASSWORD_RESET)
+    uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_token = str(RefreshToken.for_user(user).access_token)
+    reset_link = f"http://localhost:5173/create-new-password?uidb64={uidb64}&otp={otp}&token={reset_token}"
+
+    merge_data = {
+        "link": reset_link,
+        "username": user.username,
+        "otp": otp,
+    }
+    text_body = render_to_string("email/password_reset.txt", merge_data)
+    html_body = render_to_string("email/password_reset.html", merge_data)
+
+    msg = EmailMultiAlternatives(
+        subject="Password Reset Request", from_email=settings.EMAIL_HOST_USER,
+        to=[user.email], body=text_body
+    )
+    msg.attach_alternative(html_body, "text/html")
+    msg.send()
+
+
+@task("rebuild_category_statistics")
+def rebuild_category_statistics(category_ids=None):
+    # Réconciliation des compteurs incrémentaux avec les données
+    statistics.rebuild_category_statistics(category_ids)
+
+
+@task(bundles.REBUILD_JOB)
+def rebuild_content_bundle(section):
+    bundles.rebuild_bundle([section])
+
+
+@task("purge_expired_codes")
+def purge_expired_codes():
+    credentials.purge_expired()
+
+
+@task("render_paragraphs", max_attempts=1)
+def render_paragraphs(everything=False):
+    rendering.render_paragraphs(everything=everything)
@@ -1,3 +1,1792 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from importlib.util import find_spec
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, include, path, resolve
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+import InspiraApp.admin as admin_module
+import InspiraApp.async_views as async_views
+import InspiraApp.models as inspira_models
+import InspiraApp.serializers as serializers
+import InspiraApp.views as inspira_views
+from InspiraApp import bundles, compression, credentials, exports, hotcache, jobs, middleware, partitioning, push, rendering, routers, selection, statistics, storage, tasks, throttling
+
+# URLconf de QueryPlanSnapshotTests : les vues d'InspiraApp/views.py, quels que soient ASYNC_VIEWS et PROCESS_ROLE
+urlpatterns = [path("api/v1/", include("InspiraApp.urls"))]
+
+QUERY_PLAN_SNAPSHOTS = Path(__file__).resolve().parent / "query_plans"
+DATA_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+
+def _postgresql_shape(node, depth=0):
+    label = node["Node Type"]
+    if "Relation Name" in node:
+        label += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        label += f" using {node['Index Name']}"
+    lines = ["  " * depth + label]
+    for child in node.get("Plans", ()):
+        lines.extend(_postgresql_shape(child, depth + 1))
+    return lines
+
+
+class QueryPlanMixin:
+    """
+    EXPLAIN des requêtes capturées, sur SQLite comme sur PostgreSQL.
+    """
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Sans tri possible, le planificateur ne garde un nœud Sort que faute d'index
+                cursor.execute("SET LOCAL enable_sort = off")
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                return json.dumps(cursor.fetchone()[0])
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def sorts_in_memory(self, plan):
+        if connection.vendor == "postgresql":
+            return '"Node Type": "Sort"' in plan or '"Node Type": "Incremental Sort"' in plan
+        return "TEMP B-TREE FOR ORDER BY" in plan
+
+    def plan_shape(self, sql):
+        """
+        Forme du plan d'une requête (opérations, tables et index, sans coûts), une ligne par nœud.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Plan déterminé par les index disponibles plutôt que par la taille des tables de test
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                return _postgresql_shape(cursor.fetchone()[0][0]["Plan"])
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            rows = cursor.fetchall()
+        # Lignes (id, parent, -, détail) ; "SCAN TABLE x" avant SQLite 3.36, "SCAN x" ensuite
+        depths, lines = {}, []
+        for node_id, parent_id, _, detail in rows:
+            depths[node_id] = depths.get(parent_id, -1) + 1
+            lines.append("  " * depths[node_id] + re.sub(r"^(SCAN|SEARCH) TABLE ", r"\1 ", detail))
+        return lines
+
+
+class QueryPlanAuditTests(QueryPlanMixin, TestCase):
+    """
+    Passe chaque requête exécutée par les vues dans EXPLAIN et vérifie
+    qu'aucun ORDER BY n'est trié en mémoire : l'ordre doit venir d'un index.
+    """
+
+    # Colonnes uniques : une requête qui les restreint à une liste (favoris,
+    # endpoint groupé) trie un ensemble borné, le tri en mémoire est accepté
+    BOUNDED_COLUMNS = ("id", "slug")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="audit", email="audit@example.com", password="audit-password")
+        cls.category = inspira_models.Category.objects.create(name="Audit", active=True)
+        cls.citation = inspira_models.Citation.objects.create(
+            user=cls.user, category=cls.category, title="Audit citation", author="A", active=True
+        )
+        cls.thought = inspira_models.Thought.objects.create(
+            user=cls.user, category=cls.category, title="Audit thought", author="A", active=True
+        )
+        inspira_models.Paragraph.objects.create(thought=cls.thought, content="<p>Audit</p>", active=True)
+        inspira_models.About.objects.create(title="Audit")
+        for relation_model in (inspira_models.Like, inspira_models.Favorite):
+            for target in (cls.citation, cls.thought):
+                relation_model.objects.create(
+                    user=cls.user, target_type=inspira_models.relation_target(type(target)), object_id=target.pk
+                )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Les détails servis depuis le cache de processus n'exécuteraient aucune requête
+        for hot_cache in hotcache.caches.values():
+            hot_cache.clear()
+
+    def is_bounded(self, sql):
+        table = sql.split(" FROM ", 1)[1].split()[0]
+        where = sql.split(" ORDER BY ")[0]
+        return any(f'{table}."{column}" IN (' in where for column in self.BOUNDED_COLUMNS)
+
+    def assertIndexedOrdering(self, path, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path, **extra)
+        self.assertLess(response.status_code, 400, path)
+        for query in queries.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or " ORDER BY " not in sql:
+                continue
+            if self.is_bounded(sql):
+                continue
+            plan = self.explain(sql)
+            self.assertFalse(self.sorts_in_memory(plan), f"{path}: sort without index\n{sql}\n{plan}")
+
+    def test_inspiration_views(self):
+        thought_slug, citation_slug, category_slug = self.thought.slug, self.citation.slug, self.category.slug
+        paths = [
+            "/api/v1/inspiration/categories/",
+            f"/api/v1/inspiration/categories/{category_slug}/",
+            "/api/v1/inspiration/citations/",
+            "/api/v1/inspiration/citations/?expand=category,like_count,favorite_count",
+            f"/api/v1/inspiration/citations/{citation_slug}/",
+            "/api/v1/inspiration/citations/daily/",
+            "/api/v1/inspiration/citations/random/",
+            "/api/v1/inspiration/thoughts/",
+            f"/api/v1/inspiration/thoughts/{thought_slug}/",
+            f"/api/v1/inspiration/batch/?citations={citation_slug}&thoughts={thought_slug}",
+            "/api/v1/inspiration/favorites/citations/",
+            "/api/v1/inspiration/favorites/thoughts/",
+            f"/api/v1/inspiration/favorites/category/{category_slug}/",
+            "/api/v1/inspiration/activity/",
+            "/api/v1/inspiration/activity/?verb=like&expand=category",
+            "/api/v1/inspiration/about/",
+            "/api/v1/auth/profile/",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertIndexedOrdering(path)
+
+    @skipUnless(settings.SERVE_ADMIN, "Admin is not installed for this PROCESS_ROLE.")
+    def test_admin_changelists(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save(update_fields=["is_staff", "is_superuser"])
+        self.client.force_login(self.user)
+        paths = [f"/admin/InspiraApp/{model}/" for model in ("category", "citation", "thought", "paragraph", "like", "favorite", "activity", "storedblob")]
+        paths += [f"/admin/InspiraApp/{model}/?active__exact=1" for model in ("citation", "thought", "paragraph")]
+        for path in paths:
+            with self.subTest(path=path):
+                self.assertIndexedOrdering(path)
+
+    def test_bundle_sections(self):
+        from InspiraApp import bundles
+
+        for section in bundles.SECTIONS:
+            with self.subTest(section=section), CaptureQueriesContext(connection) as queries:
+                bundles.serialize_section(section)
+            for query in queries.captured_queries:
+                if " ORDER BY " in query["sql"]:
+                    self.assertFalse(self.sorts_in_memory(self.explain(query["sql"])), query["sql"])
+
+
+@override_settings(
+    ROOT_URLCONF=__name__,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class QueryPlanSnapshotTests(QueryPlanMixin, TestCase):
+    """
+    Rejoue chaque vue d'InspiraApp/views.py sur un jeu de données réaliste et
+    compare le nombre de requêtes et la forme de leur plan (EXPLAIN) à
+    l'instantané du moteur courant, query_plans/<sqlite|postgresql>.json.
+    Une requête en plus ou un index perdu font échouer le test.
+
+    Après un changement voulu, régénérer l'instantané avec
+    UPDATE_QUERY_PLANS=1 python manage.py test InspiraApp.tests.QueryPlanSnapshotTests
+    (avec DATABASE_URL pour PostgreSQL) et relire le diff.
+    """
+
+    # Diff complet des plans en cas d'échec
+    maxDiff = None
+
+    CATEGORIES = 4
+    CITATIONS_PER_CATEGORY = 15
+    THOUGHTS_PER_CATEGORY = 8
+    PARAGRAPHS_PER_THOUGHT = 3
+    READERS = 5
+    PASSWORD = "plan-password"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.readers = [
+            inspira_models.User.objects.create_user(username=f"reader{index}", email=f"reader{index}@example.com", password=cls.PASSWORD)
+            for index in range(cls.READERS)
+        ]
+        cls.user = cls.readers[0]
+        cls.categories = [inspira_models.Category.objects.create(name=f"Category {index}", active=True) for index in range(cls.CATEGORIES)]
+
+        # Écritures groupées, puis calcul des données dérivées (rendu, statistiques) en une passe
+        citations, thoughts = [], []
+        for category in cls.categories:
+            for index in range(cls.CITATIONS_PER_CATEGORY):
+                title = f"{category.name} citation {index}"
+                citations.append(inspira_models.Citation(
+                    user=cls.user, category=category, title=title, slug=slugify(title), author=f"Author {index % 7}",
+                    description="Une citation " * 10, active=index % 5 != 0,
+                ))
+            for index in range(cls.THOUGHTS_PER_CATEGORY):
+                title = f"{category.name} thought {index}"
+                thoughts.append(inspira_models.Thought(
+                    user=cls.user, category=category, title=title, slug=slugify(title), author=f"Author {index % 7}",
+                    active=index % 4 != 0,
+                ))
+        citations = inspira_models.Citation.objects.bulk_create(citations)
+        thoughts = inspira_models.Thought.objects.bulk_create(thoughts)
+        inspira_models.Paragraph.objects.bulk_create([
+            inspira_models.Paragraph(thought=thought, content=f"<p>Paragraphe {index} <strong>de</strong> {thought.title}.</p>", active=True)
+            for thought in thoughts for index in range(cls.PARAGRAPHS_PER_THOUGHT)
+        ])
+        rendering.render_paragraphs(everything=True)
+
+        relations, activities = [], []
+        for reader_index, reader in enumerate(cls.readers):
+            for targets in (citations, thoughts):
+                target_type = inspira_models.relation_target(type(targets[0]))
+                for index, target in enumerate(targets):
+                    for relation_model, verb, period in (
+                        (inspira_models.Like, inspira_models.ActivityVerb.LIKE, 3),
+                        (inspira_models.Favorite, inspira_models.ActivityVerb.FAVORITE, 4),
+                    ):
+                        if (index + reader_index) % period == 0:
+                            relations.append(relation_model(user=reader, target_type=target_type, object_id=target.pk))
+                            activities.append(inspira_models.Activity(user=reader, verb=verb, target_type=target_type, object_id=target.pk))
+        for relation_model in (inspira_models.Like, inspira_models.Favorite):
+            relation_model.objects.bulk_create([relation for relation in relations if type(relation) is relation_model])
+        inspira_models.Activity.objects.bulk_create(activities)
+        statistics.rebuild_category_statistics()
+        inspira_models.About.objects.create(title="À propos", description="<p>Inspira</p>")
+
+        cls.citation, cls.thought, cls.category = citations[1], thoughts[1], cls.categories[0]
+        # Objets qu'aucun lecteur n'a encore likés ni mis en favori
+        cls.fresh_citation = inspira_models.Citation.objects.create(user=cls.user, category=cls.category, title="Fresh citation", author="A", active=True)
+        cls.fresh_thought = inspira_models.Thought.objects.create(user=cls.user, category=cls.category, title="Fresh thought", author="A", active=True)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Caches partagés et de processus vides : le nombre de requêtes ne dépend pas des tests précédents
+        cache.clear()
+        for hot_cache in hotcache.caches.values():
+            hot_cache.clear()
+
+    def password_change_data(self):
+        return {
+            "uidb64": urlsafe_base64_encode(force_bytes(self.user.pk)),
+            "otp": credentials.issue(self.user.pk, credentials.PASSWORD_RESET),
+            "password": "new-plan-password",
+        }
+
+    def cases(self):
+        """
+        (nom, méthode, chemin, données, statut attendu), rejoués dans cet ordre.
+        """
+        citation, thought, category = self.citation, self.thought, self.category
+        fresh_citation, fresh_thought = self.fresh_citation, self.fresh_thought
+        return [
+            ("token", "post", "/api/v1/auth/token/", {"email": self.user.email, "password": self.PASSWORD}, 200),
+            ("register", "post", "/api/v1/auth/register/", {"username": "newreader", "email": "newreader@example.com", "password": "Plan-password-1", "password2": "Plan-password-1"}, 201),
+            ("profile", "get", "/api/v1/auth/profile/", None, 200),
+            ("profile-patch", "patch", "/api/v1/auth/profile/", {"bio": "Lecteur assidu"}, 200),
+            ("password-reset", "post", "/api/v1/auth/password-reset/", {"email": self.user.email}, 200),
+            ("password-change", "post", "/api/v1/auth/password-change/", self.password_change_data, 200),
+            ("category-list", "get", "/api/v1/inspiration/categories/", None, 200),
+            ("category-detail", "get", f"/api/v1/inspiration/categories/{category.slug}/", None, 200),
+            ("citation-list", "get", "/api/v1/inspiration/citations/", None, 200),
+            ("citation-list-expanded", "get", "/api/v1/inspiration/citations/?expand=category,like_count,favorite_count", None, 200),
+            ("citation-detail", "get", f"/api/v1/inspiration/citations/{citation.slug}/", None, 200),
+            ("citation-daily", "get", "/api/v1/inspiration/citations/daily/", None, 200),
+            ("citation-random", "get", "/api/v1/inspiration/citations/random/", None, 200),
+            ("thought-list", "get", "/api/v1/inspiration/thoughts/", None, 200),
+            ("thought-detail", "get", f"/api/v1/inspiration/thoughts/{thought.slug}/", None, 200),
+            ("batch-detail", "get", f"/api/v1/inspiration/batch/?citations={citation.slug},{citation.pk + 1}&thoughts={thought.slug}", None, 200),
+            ("activity", "get", "/api/v1/inspiration/activity/", None, 200),
+            ("favorite-citations", "get", "/api/v1/inspiration/favorites/citations/", None, 200),
+            ("favorite-thoughts", "get", "/api/v1/inspiration/favorites/thoughts/", None, 200),
+            ("favorites-category", "get", f"/api/v1/inspiration/favorites/category/{category.slug}/", None, 200),
+            ("about", "get", "/api/v1/inspiration/about/", None, 200),
+            ("bundle", "get", "/api/v1/inspiration/bundle/", None, 200),
+            ("like-citation", "post", f"/api/v1/inspiration/citation/{fresh_citation.pk}/likes/", None, 201),
+            ("favorite-citation", "post", f"/api/v1/inspiration/citation/{fresh_citation.pk}/favorites/", None, 201),
+            ("like-thought", "post", f"/api/v1/inspiration/thoughts/{fresh_thought.pk}/likes/", None, 201),
+            ("favorite-thought", "post", f"/api/v1/inspiration/thoughts/{fresh_thought.pk}/favorites/", None, 201),
+            ("unlike-citation", "delete", f"/api/v1/inspiration/citation/{fresh_citation.pk}/likes/", None, 200),
+            ("unfavorite-citation", "delete", f"/api/v1/inspiration/citation/{fresh_citation.pk}/favorites/", None, 200),
+            ("unlike-thought", "delete", f"/api/v1/inspiration/thoughts/{fresh_thought.pk}/likes/", None, 200),
+            ("unfavorite-thought", "delete", f"/api/v1/inspiration/thoughts/{fresh_thought.pk}/favorites/", None, 200),
+            ("unlike-missing", "delete", f"/api/v1/inspiration/citation/{fresh_citation.pk}/likes/", None, 404),
+            ("relink-citation", "post", f"/api/v1/inspiration/citation/{fresh_citation.pk}/likes/", None, 201),
+            ("relink-thought", "post", f"/api/v1/inspiration/thoughts/{fresh_thought.pk}/favorites/", None, 201),
+            ("batch-relations", "post", "/api/v1/inspiration/batch/relations/", {"operations": [
+                {"action": "unlike", "type": "citation", "id": fresh_citation.pk},
+                {"action": "like", "type": "citation", "id": citation.pk},
+                {"action": "unfavorite", "type": "thought", "id": fresh_thought.pk},
+                {"action": "favorite", "type": "thought", "id": thought.pk},
+            ]}, 200),
+        ]
+
+    def capture(self, method, path, data, expected_status):
+        if callable(data):
+            data = data()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, format="json")
+        self.assertEqual(response.status_code, expected_status, f"{path}: {getattr(response, 'data', '')}")
+        statements = [query["sql"] for query in queries.captured_queries if query["sql"].startswith(DATA_STATEMENTS)]
+        return statements, [{"statement": self.describe(sql), "plan": self.plan_shape(sql)} for sql in statements]
+
+    @staticmethod
+    def describe(sql):
+        """
+        Instruction et table principale ("SELECT InspiraApp_citation"), sous-requêtes ignorées.
+        """
+        verb, outer = sql.split(None, 1)[0], sql
+        while True:
+            stripped = re.sub(r"\([^()]*\)", "", outer)
+            if stripped == outer:
+                break
+            outer = stripped
+        match = re.search(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)"?', outer)
+        return f"{verb} {match.group(1)}" if match else verb
+
+    def test_query_plans(self):
+        snapshot_path = QUERY_PLAN_SNAPSHOTS / f"{connection.vendor}.json"
+        update = os.getenv("UPDATE_QUERY_PLANS") == "1"
+        if not update and not snapshot_path.exists():
+            self.skipTest(f"No query plan snapshot for {connection.vendor}, run the tests with UPDATE_QUERY_PLANS=1.")
+        expected = {} if update else json.loads(snapshot_path.read_text())
+
+        captured = {}
+        with tempfile.TemporaryDirectory() as bundle_root, override_settings(CONTENT_BUNDLE_ROOT=bundle_root):
+            for name, method, path, data, expected_status in self.cases():
+                with self.subTest(case=name):
+                    statements, captured[name] = self.capture(method, path, data, expected_status)
+                    if update:
+                        continue
+                    self.assertIn(name, expected, f"{name}: no snapshot, run the tests with UPDATE_QUERY_PLANS=1.")
+                    self.assertSnapshot(name, statements, captured[name], expected[name])
+
+        if update:
+            QUERY_PLAN_SNAPSHOTS.mkdir(exist_ok=True)
+            snapshot_path.write_text(json.dumps(captured, indent=2, ensure_ascii=False) + "\n")
+
+    def assertSnapshot(self, name, statements, queries, expected):
+        if len(queries) != len(expected):
+            self.fail(
+                f"{name}: {len(queries)} queries instead of {len(expected)}\n"
+                + "\n".join(f"{index + 1}. {sql}" for index, sql in enumerate(statements))
+            )
+        for index, (sql, query, expected_query) in enumerate(zip(statements, queries, expected)):
+            self.assertEqual(query, expected_query, f"{name}: plan of query {index + 1} changed\n{sql}")
+
+    def test_every_view_has_a_case(self):
+        routed = set()
+
+        def collect(patterns):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    collect(pattern.url_patterns)
+                    continue
+                view_class = getattr(pattern.callback, "view_class", None)
+                if view_class is not None and view_class.__module__ == inspira_views.__name__:
+                    routed.add(view_class.__name__)
+
+        collect(get_resolver(__name__).url_patterns)
+        covered = {resolve(path.split("?")[0], urlconf=__name__).func.view_class.__name__ for _, _, path, _, _ in self.cases()}
+        self.assertEqual(routed - covered, set(), "Views without a query plan case in QueryPlanSnapshotTests.cases()")
+
+
+class RenderHtmlTests(SimpleTestCase):
+    """
+    Assainissement du HTML des paragraphes (rendering.render_html) : vecteurs XSS connus.
+    """
+
+    # (contenu, html attendu, texte attendu)
+    CASES = [
+        ('<a href="javascript:alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<a href=" JaVaScRiPt:alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<a href="java\tscript:alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<a href="java&#x0A;script:alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<a href="\x01javascript:alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<a href="&#106;avascript:alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<a href="javascript&colon;alert(1)">x</a>', '<a rel="nofollow noopener">x</a>', "x"),
+        ('<img src="data:text/html;base64,PHNjcmlwdD4=">', "<img>", ""),
+        ("<img src=x onerror=alert(1)>", '<img src="x">', ""),
+        ('<p onclick="alert(1)" style="color:red">a</p>', "<p>a</p>", "a"),
+        ("<script>alert(1)</script>ok", "ok", "ok"),
+        ("<style>p{color:red}</style>ok", "ok", "ok"),
+        ("<svg><script>alert(1)</script></svg>ok", "ok", "ok"),
+        ("<iframe src=x></iframe>ok", "ok", "ok"),
+        ("<script>alert(1)", "", ""),
+        ("<scr<script>ipt>alert(1)</script>", "ipt&gt;alert(1)", "ipt>alert(1)"),
+        ("<a title='\"><script>alert(1)</script>'>x</a>",
+         '<a title="&quot;&gt;&lt;script&gt;alert(1)&lt;/script&gt;" rel="nofollow noopener">x</a>', "x"),
+        ("<b>gras<i>italique", "<b>gras<i>italique</i></b>", "grasitalique"),
+        ("<ul><li>un<li>deux</ul>", "<ul><li>un</li><li>deux</li></ul>", "un\ndeux"),
+        ("1 < 2 & 3 > 2", "1 &lt; 2 &amp; 3 &gt; 2", "1 < 2 & 3 > 2"),
+        ('<a href="https://example.com/?a=1&b=2">l</a>',
+         '<a href="https://example.com/?a=1&amp;b=2" rel="nofollow noopener">l</a>', "l"),
+        ('<a href="mailto:a@example.com">m</a>', '<a href="mailto:a@example.com" rel="nofollow noopener">m</a>', "m"),
+    ]
+
+    def test_render_html(self):
+        for content, html, text in self.CASES:
+            with self.subTest(content=content):
+                self.assertEqual(rendering.render_html(content), (html, text))
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3)
+class OneTimeCodeTests(TestCase):
+    """
+    Codes à usage unique (credentials) : usage unique, essais limités, expiration, remplacement.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="otp", email="otp@example.com", password="otp-password")
+
+    def verify(self, code):
+        return credentials.verify(self.user.pk, credentials.PASSWORD_RESET, code)
+
+    def wrong(self, code):
+        return "0" * len(code) if code != "0" * len(code) else "1" * len(code)
+
+    def test_single_use(self):
+        code = credentials.issue(self.user.pk, credentials.PASSWORD_RESET)
+        self.assertTrue(self.verify(code))
+        self.assertFalse(self.verify(code))
+
+    def test_attempt_limit(self):
+        # (essais manqués avant le bon code, résultat attendu)
+        for misses, expected in ((0, True), (1, True), (2, True), (3, False), (4, False)):
+            with self.subTest(misses=misses):
+                code = credentials.issue(self.user.pk, credentials.PASSWORD_RESET)
+                for _ in range(misses):
+                    self.assertFalse(self.verify(self.wrong(code)))
+                self.assertEqual(self.verify(code), expected)
+
+    def test_expired(self):
+        code = credentials.issue(self.user.pk, credentials.PASSWORD_RESET, ttl=60)
+        inspira_models.OneTimeCode.objects.filter(user=self.user).update(expires_at=now() - timedelta(seconds=1))
+        self.assertFalse(self.verify(code))
+        self.assertEqual(credentials.purge_expired(), 1)
+
+    def test_new_code_replaces_previous(self):
+        previous = credentials.issue(self.user.pk, credentials.PASSWORD_RESET)
+        code = credentials.issue(self.user.pk, credentials.PASSWORD_RESET)
+        if previous != code:
+            self.assertFalse(self.verify(previous))
+        self.assertTrue(self.verify(code))
+
+    def test_bound_to_user_and_purpose(self):
+        other = inspira_models.User.objects.create_user(username="other", email="other@example.com", password="other-password")
+        code = credentials.issue(self.user.pk, credentials.PASSWORD_RESET)
+        self.assertFalse(credentials.verify(other.pk, credentials.PASSWORD_RESET, code))
+        self.assertFalse(credentials.verify(self.user.pk, "email_change", code))
+        self.assertTrue(self.verify(code))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class TokenBucketThrottleTests(TestCase):
+    """
+    Seaux à jetons des endpoints d'authentification : rejet, remplissage, identité du client.
+    """
+
+    class LoginView:
+        throttle_scope = "login"
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_reject_and_refill(self):
+        throttle, view, request = throttling.IPTokenBucketThrottle(), self.LoginView(), RequestFactory().post("/")
+        capacity, period = throttling.parse_rate(settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["login.ip"])
+        with mock.patch("InspiraApp.throttling.time.time", return_value=1000.0) as clock:
+            for _ in range(capacity):
+                self.assertTrue(throttle.allow_request(request, view))
+            self.assertFalse(throttle.allow_request(request, view))
+            self.assertAlmostEqual(throttle.wait(), period / capacity)
+            # Un jeton revient après period / capacity secondes, pas davantage
+            clock.return_value += period / capacity
+            self.assertTrue(throttle.allow_request(request, view))
+            self.assertFalse(throttle.allow_request(request, view))
+
+    def test_forwarded_for_is_not_trusted(self):
+        throttle, view = throttling.IPTokenBucketThrottle(), self.LoginView()
+        capacity, _ = throttling.parse_rate(settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["login.ip"])
+        allowed = [
+            throttle.allow_request(RequestFactory().post("/", HTTP_X_FORWARDED_FOR=f"203.0.113.{index}"), view)
+            for index in range(capacity + 1)
+        ]
+        self.assertEqual(allowed, [True] * capacity + [False])
+
+    def test_login_returns_429(self):
+        client = APIClient()
+        capacity, _ = throttling.parse_rate(settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["login.email"])
+        data = {"email": "nobody@example.com", "password": "wrong-password"}
+        for _ in range(capacity):
+            self.assertEqual(client.post("/api/v1/auth/token/", data, format="json").status_code, 401)
+        response = client.post("/api/v1/auth/token/", {**data, "email": " NOBODY@example.com"}, format="json")
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response["Retry-After"]), 0)
+
+
+@override_settings(ROOT_URLCONF="InspiraApp.async_urls")
+class AsyncViewTests(TestCase):
+    """
+    Vues asynchrones (InspiraApp/async_views.py) derrière la chaîne de middlewares en mode ASGI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="async", email="async@example.com", password="async-password")
+        category = inspira_models.Category.objects.create(name="Async", active=True)
+        cls.citations = [
+            inspira_models.Citation.objects.create(
+                user=cls.user, category=category, title=f"Async citation {index}", author="A", description="Une citation " * 10, active=True
+            )
+            for index in range(10)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def test_middleware_chain_is_async_capable(self):
+        # Un seul middleware synchrone suffit à faire tourner toutes les vues dans un thread
+        for middleware in settings.MIDDLEWARE:
+            with self.subTest(middleware=middleware):
+                self.assertTrue(getattr(import_string(middleware), "async_capable", False))
+
+    async def test_list_is_compressed(self):
+        response = await self.client.get("/inspiration/citations/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), len(self.citations))
+
+    @skipUnless(find_spec("msgpack"), "msgpack is not installed.")
+    async def test_msgpack_negotiation(self):
+        import msgpack
+
+        response = await self.client.get(f"/inspiration/citations/{self.citations[0].slug}/", headers={"Accept": "application/msgpack"})
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content)["slug"], self.citations[0].slug)
+
+    async def test_not_acceptable(self):
+        response = await self.client.get("/inspiration/citations/", headers={"Accept": "text/csv"})
+        self.assertEqual(response.status_code, 406)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+    async def test_like_toggle(self):
+        path = f"/inspiration/citation/{self.citations[0].pk}/likes/"
+        self.assertEqual((await self.client.post(path)).status_code, 401)
+        self.assertEqual((await self.client.post(path, headers=self.auth)).status_code, 201)
+        self.assertEqual((await self.client.post(path, headers=self.auth)).status_code, 400)
+        self.assertEqual((await self.client.delete(path, headers=self.auth)).status_code, 200)
+        self.assertEqual((await self.client.delete(path, headers=self.auth)).status_code, 404)
+        self.assertEqual((await self.client.post("/inspiration/citation/0/likes/", headers=self.auth)).status_code, 404)
+
+    async def test_favorite_list(self):
+        await inspira_models.Favorite.objects.acreate(
+            user=self.user, target_type=inspira_models.relation_target(inspira_models.Citation), object_id=self.citations[3].pk
+        )
+        response = await self.client.get("/inspiration/favorites/citations/", headers=self.auth)
+        self.assertEqual([item["id"] for item in json.loads(response.content)], [self.citations[3].pk])
+
+
+class BatchRelationTests(TestCase):
+    """
+    Rejeu groupé des likes et favoris (InspiraApp/relations.py) : résultats par opération, activité, conflits.
+    """
+    path = "/api/v1/inspiration/batch/relations/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="batch", email="batch@example.com", password="batch-password")
+        category = inspira_models.Category.objects.create(name="Batch", active=True)
+        cls.citation = inspira_models.Citation.objects.create(user=cls.user, category=category, title="Batch citation", author="A", active=True)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=category, title="Batch thought", author="A", active=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, *operations):
+        return self.client.post(self.path, {"operations": list(operations)}, format="json")
+
+    def verbs(self):
+        return list(inspira_models.Activity.objects.filter(user=self.user).order_by("pk").values_list("verb", flat=True))
+
+    def test_results(self):
+        response = self.post(
+            {"action": "like", "type": "citation", "id": self.citation.pk},
+            {"action": "favorite", "type": "thought", "id": self.thought.pk},
+            {"action": "like", "type": "thought", "id": self.thought.pk + 1000},
+            {"action": "share", "type": "citation", "id": self.citation.pk},
+            {"action": "like", "type": "citation", "id": 2 ** 63},
+            {"action": "like", "type": "citation", "id": True},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["status"] for result in response.data["results"]], [200, 200, 404, 400, 400, 400])
+        self.assertEqual(response.data["counts"]["citation"][self.citation.pk]["like_count"], 1)
+        self.assertEqual(response.data["counts"]["thought"][self.thought.pk]["favorite_count"], 1)
+        self.assertEqual(self.verbs(), [inspira_models.ActivityVerb.LIKE, inspira_models.ActivityVerb.FAVORITE])
+
+    def test_last_operation_wins(self):
+        like = {"action": "like", "type": "citation", "id": self.citation.pk}
+        unlike = {**like, "action": "unlike"}
+        self.assertEqual(self.post(like, unlike, like).data["results"][-1], {"status": 200, "active": True})
+        self.assertEqual(self.post(unlike, like, unlike).data["results"][-1], {"status": 200, "active": False})
+        self.assertFalse(inspira_models.Like.objects.filter(user=self.user, object_id=self.citation.pk).exists())
+        # Un "unlike" sans like existant n'écrit rien
+        self.post(unlike)
+        self.assertEqual(self.verbs(), [inspira_models.ActivityVerb.LIKE, inspira_models.ActivityVerb.UNLIKE])
+
+    def test_invalid_batch(self):
+        self.assertEqual(self.client.post(self.path, {"operations": []}, format="json").status_code, 400)
+        operation = {"action": "like", "type": "citation", "id": self.citation.pk}
+        with override_settings(BATCH_RELATION_MAX_OPERATIONS=2):
+            self.assertEqual(self.post(operation, operation, operation).status_code, 400)
+
+    def test_concurrent_delete_is_a_conflict(self):
+        like = {"action": "like", "type": "citation", "id": self.citation.pk}
+        self.post(like)
+        # Le like a déjà été supprimé par un autre lot : la suppression ne touche aucune ligne
+        with mock.patch.object(QuerySet, "_raw_delete", return_value=0):
+            response = self.post({**like, "action": "unlike"})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.verbs(), [inspira_models.ActivityVerb.LIKE])
+        self.assertTrue(inspira_models.Like.objects.filter(user=self.user, object_id=self.citation.pk).exists())
+
+
+class ContentBundleTests(TestCase):
+    """
+    Bundle hors-ligne (InspiraApp/bundles.py) : manifeste versionné, requête conditionnelle, reconstruction en tâche de fond.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="bundle", email="bundle@example.com", password="bundle-password")
+        cls.category = inspira_models.Category.objects.create(name="Bundle", active=True)
+        cls.citation = inspira_models.Citation.objects.create(
+            user=cls.user, category=cls.category, title="Bundle citation", author="A", description="Une citation " * 100, active=True
+        )
+        statistics.rebuild_category_statistics()
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        settings_override = override_settings(CONTENT_BUNDLE_ROOT=root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.root = Path(root.name)
+
+    def queued_sections(self):
+        return sorted(
+            inspira_models.Job.objects.filter(name=bundles.REBUILD_JOB, status=inspira_models.JobStatus.QUEUED)
+            .values_list("payload__section", flat=True)
+        )
+
+    def test_manifest(self):
+        manifest = bundles.rebuild_bundle()
+        self.assertIn("gzip", manifest["files"])
+        body = json.loads((self.root / manifest["files"]["identity"]).read_bytes())
+        self.assertEqual(body["version"], manifest["version"])
+        self.assertEqual([citation["slug"] for citation in body["citations"]], [self.citation.slug])
+        self.assertEqual(body["categories"][0]["statistics"]["citation_count"], 1)
+        # Même contenu, même version
+        self.assertEqual(bundles.rebuild_bundle(["citations"])["version"], manifest["version"])
+
+        inspira_models.Citation.objects.filter(pk=self.citation.pk).update(title="Renamed")
+        self.assertNotEqual(bundles.rebuild_bundle(["citations"])["version"], manifest["version"])
+
+    def test_conditional_download(self):
+        response = self.client.get("/api/v1/inspiration/bundle/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = json.loads(gzip.decompress(b"".join(response.streaming_content)))
+        self.assertEqual(response["ETag"], f'"{body["version"]}"')
+
+        response = self.client.get("/api/v1/inspiration/bundle/", headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_section(self):
+        with self.assertRaises(ValueError):
+            bundles.serialize_section("users")
+
+    def test_changes_enqueue_one_rebuild_per_section(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.citation.description = "Modifiée"
+            self.citation.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.citation.save()
+        # Les statistiques de la catégorie (like_count) sont aussi dans le bundle
+        with self.captureOnCommitCallbacks(execute=True):
+            inspira_models.Like.objects.create(user=self.user, target_type=inspira_models.relation_target(inspira_models.Citation), object_id=self.citation.pk)
+        self.assertEqual(self.queued_sections(), ["categories", "citations"])
+
+        with override_settings(CONTENT_BUNDLE_AUTO_REBUILD=False), self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertEqual(self.queued_sections(), ["categories", "citations"])
+
+    def test_rebuild_job(self):
+        manifest = bundles.rebuild_bundle()
+        inspira_models.CategoryStatistics.objects.filter(category=self.category).update(like_count=7)
+        tasks.rebuild_content_bundle("categories")
+        body = json.loads((self.root / bundles.load_manifest()["files"]["identity"]).read_bytes())
+        self.assertNotEqual(body["version"], manifest["version"])
+        self.assertEqual(body["categories"][0]["statistics"]["like_count"], 7)
+
+
+class AnalyticsExportTests(QueryPlanMixin, TestCase):
+    """
+    Export analytique (InspiraApp/exports.py, manage.py export_analytics) : fichiers, filigrane, index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="export", email="export@example.com", password="export-password")
+        category = inspira_models.Category.objects.create(name="Export", active=True)
+        cls.citations = [
+            inspira_models.Citation.objects.create(user=cls.user, category=category, title=f"Export citation {index}", author="A", active=True)
+            for index in range(3)
+        ]
+        for citation in cls.citations:
+            inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=citation.pk)
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+
+    def read_csv(self, files):
+        return [line.split(",") for path in files for line in gzip.decompress(path.read_bytes()).decode().splitlines()[1:]]
+
+    def export(self, *args):
+        call_command("export_analytics", "--dataset", "likes", "--output", str(self.root), "--lag", "0", *args, stdout=io.StringIO())
+        return sorted((self.root / "likes").glob("*/*.csv.gz"))
+
+    def test_files(self):
+        total, files = exports.export_dataset("citations", root=self.root, rows_per_file=2, chunk_size=1)
+        self.assertEqual((total, len(files)), (3, 2))
+        self.assertEqual([int(row[0]) for row in self.read_csv(files)], [citation.pk for citation in self.citations])
+
+    def test_incremental(self):
+        files = self.export("--incremental")
+        self.assertEqual(len(self.read_csv(files)), 3)
+        self.assertIn("likes", exports.load_watermarks(self.root))
+        for path in files:
+            path.unlink()
+
+        # Rien de modifié depuis le filigrane
+        self.assertEqual(self.export("--incremental"), [])
+        like = inspira_models.Like.objects.first()
+        inspira_models.Like.objects.filter(pk=like.pk).update(updated_at=now() + timedelta(seconds=1))
+        with mock.patch("InspiraApp.management.commands.export_analytics.now", return_value=now() + timedelta(seconds=2)):
+            files = self.export("--incremental")
+        self.assertEqual([int(row[0]) for row in self.read_csv(files)], [like.pk])
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.export("--since", "yesterday")
+        with self.assertRaises(CommandError):
+            self.export("--since", "2026-01-01T00:00:00Z", "--incremental")
+
+    def test_watermark_query_uses_index(self):
+        for name in exports.DATASETS:
+            with self.subTest(dataset=name), CaptureQueriesContext(connection) as queries:
+                exports.export_dataset(name, root=self.root, since=now() - timedelta(days=1), until=now())
+            sql = next(query["sql"] for query in queries.captured_queries if " ORDER BY " in query["sql"])
+            self.assertFalse(self.sorts_in_memory(self.explain(sql)), sql)
+
+
+class PartitioningTests(TestCase):
+    """
+    Partitionnement des likes et favoris (InspiraApp/partitioning.py) et suppression unitaire des relations.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="partition", email="partition@example.com", password="partition-password")
+        category = inspira_models.Category.objects.create(name="Partition", active=True)
+        cls.likes = [
+            inspira_models.Like.objects.create(
+                user=cls.user, target_type=inspira_models.RelationTarget.CITATION,
+                object_id=inspira_models.Citation.objects.create(user=cls.user, category=category, title=f"Partition {index}", author="A", active=True).pk,
+            )
+            for index in range(3)
+        ]
+
+    @skipUnless(connection.vendor == "postgresql", "Table partitioning requires PostgreSQL.")
+    def test_swap_replays_changes_made_during_copy(self):
+        model = inspira_models.Like
+        with connection.cursor() as cursor:
+            for sql in partitioning.create_statements(model, 2):
+                cursor.execute(sql)
+        partitioning.copy_batch(model, 0, partitioning.max_id(model))
+
+        # Écritures pendant la copie : modification, suppression, insertion
+        updated, removed, _ = self.likes
+        model.objects.filter(pk=updated.pk).update(updated_at=now() + timedelta(days=1))
+        removed.delete()
+        created = model.objects.create(user=self.user, target_type=inspira_models.RelationTarget.THOUGHT, object_id=1)
+        expected = set(model.objects.values_list("pk", "object_id", "updated_at"))
+
+        self.assertEqual(partitioning.replay(model), (2, 2))
+        model.objects.filter(pk=created.pk).update(object_id=2)
+        self.assertEqual(partitioning.swap(model), (1, 1))
+        self.assertTrue(partitioning.is_partitioned(model))
+        expected = {row if row[0] != created.pk else (created.pk, 2, row[2]) for row in expected}
+        self.assertEqual(set(model.objects.values_list("pk", "object_id", "updated_at")), expected)
+
+    @skipUnless(connection.vendor != "postgresql", "Checks the error on other databases.")
+    def test_requires_postgresql(self):
+        with self.assertRaises(CommandError):
+            call_command("partition_relations", stdout=io.StringIO())
+
+    def test_concurrent_unlike_is_counted_once(self):
+        like = self.likes[0]
+        stale = inspira_models.Like.objects.get(pk=like.pk)
+        self.assertEqual(like.delete()[0], 1)
+        # Deuxième requête qui avait lu le même like avant sa suppression
+        self.assertEqual(stale.delete()[0], 0)
+        self.assertEqual(
+            inspira_models.Activity.objects.filter(user=self.user, verb=inspira_models.ActivityVerb.UNLIKE).count(), 1
+        )
+
+
+@override_settings(ALLOWED_HOSTS=["a.example", "b.example"])
+class HotObjectCacheTests(TestCase):
+    """
+    Cache de détails par processus (InspiraApp/hotcache.py) : invalidation locale et partagée, courses avec les écritures.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="hot", email="hot@example.com", password="hot-password")
+        category = inspira_models.Category.objects.create(name="Hot", active=True)
+        cls.citation = inspira_models.Citation.objects.create(user=cls.user, category=category, title="Hot citation", author="A", active=True)
+        inspira_models.Citation.objects.filter(pk=cls.citation.pk).update(image="citation/hot.jpg")
+        cls.path = f"/api/v1/inspiration/citations/{cls.citation.slug}/"
+
+    def setUp(self):
+        cache.clear()
+        for hot_cache in hotcache.caches.values():
+            hot_cache.clear()
+        self.client = APIClient()
+
+    def test_image_url_follows_request_host(self):
+        first = self.client.get(self.path, HTTP_HOST="a.example")
+        self.assertEqual(first.data["image"], "http://a.example/media/citation/hot.jpg")
+        self.assertIsNotNone(hotcache.caches["citation"].get(self.citation.slug))
+        with self.assertNumQueries(0):
+            second = self.client.get(self.path, HTTP_HOST="b.example")
+        self.assertEqual(second.data["image"], "http://b.example/media/citation/hot.jpg")
+
+    def test_change_invalidates_entry(self):
+        self.client.get(self.path, HTTP_HOST="a.example")
+        with self.captureOnCommitCallbacks(execute=True):
+            citation = inspira_models.Citation.objects.get(pk=self.citation.pk)
+            citation.author = "B"
+            citation.save()
+        self.assertEqual(self.client.get(self.path, HTTP_HOST="a.example").data["author"], "B")
+
+    def test_version_bumped_by_another_process(self):
+        self.client.get(self.path, HTTP_HOST="a.example")
+        # Changement publié par un autre processus : seul le cache partagé le voit
+        cache.set(hotcache.VERSION_KEY.format("citation", self.citation.pk), "other")
+        self.assertIsNone(hotcache.get_payload("citation", self.citation.slug, RequestFactory().get("/")))
+
+    def test_change_during_load_is_not_cached(self):
+        token = hotcache.load_token("citation")
+        data = self.client.get(self.path, HTTP_HOST="a.example").data
+        hotcache.caches["citation"].clear()
+        # L'objet change entre le chargement et la mise en cache
+        hotcache.bus.publish("citation", self.citation.pk)
+        hotcache.store_payload("citation", self.citation.slug, self.citation, data, token)
+        self.assertIsNone(hotcache.caches["citation"].get(self.citation.slug))
+
+
+class ContentAddressedStorageTests(TestCase):
+    """
+    Déduplication des images (InspiraApp/storage.py) et ramasse-miettes gc_image_blobs.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="blob", email="blob@example.com", password="blob-password")
+        cls.category = inspira_models.Category.objects.create(name="Blob", active=True)
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.storage = storage.content_addressed_storage
+
+    def gc(self):
+        output = io.StringIO()
+        call_command("gc_image_blobs", stdout=output)
+        return output.getvalue()
+
+    def age(self, name, hours=48):
+        inspira_models.StoredBlob.objects.filter(name=name).update(
+            created_at=now() - timedelta(hours=hours), last_used_at=now() - timedelta(hours=hours)
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save("citation/a.jpg", ContentFile(b"same image"))
+        second = self.storage.save("citation/b.JPG", ContentFile(b"same image"))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith(storage.BLOB_PREFIX))
+        self.assertEqual(inspira_models.StoredBlob.objects.get().size, len(b"same image"))
+
+    def test_gc_deletes_old_orphans_only(self):
+        orphan = self.storage.save("citation/orphan.jpg", ContentFile(b"orphan"))
+        used = self.storage.save("citation/used.jpg", ContentFile(b"used"))
+        recent = self.storage.save("citation/recent.jpg", ContentFile(b"recent"))
+        inspira_models.Citation.objects.create(user=self.user, category=self.category, title="Blob", author="A", image=used)
+        self.age(orphan)
+        self.age(used)
+
+        self.assertIn("Deleted 1 blobs", self.gc())
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertEqual(set(inspira_models.StoredBlob.objects.values_list("name", flat=True)), {used, recent})
+
+    def test_reused_orphan_survives_gc_before_reference(self):
+        name = self.storage.save("citation/a.jpg", ContentFile(b"reused"))
+        self.age(name)
+        # Même contenu renvoyé : le GC passe avant le post_save qui pose la référence
+        self.assertEqual(self.storage.save("citation/b.jpg", ContentFile(b"reused")), name)
+        self.assertIn("Deleted 0 blobs", self.gc())
+        citation = inspira_models.Citation.objects.create(user=self.user, category=self.category, title="Reused", author="A", image=name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(inspira_models.BlobReference.objects.filter(object_id=str(citation.pk), blob__name=name).exists())
+
+    def test_gc_rechecks_under_lock(self):
+        from InspiraApp.management.commands.gc_image_blobs import Command
+
+        name = self.storage.save("citation/a.jpg", ContentFile(b"raced"))
+        blob = inspira_models.StoredBlob.objects.get(name=name)
+        # Blob sélectionné comme orphelin, renvoyé avant que le GC ne le verrouille
+        self.assertFalse(Command().delete_orphan(blob, now() - timedelta(hours=1)))
+        self.assertTrue(self.storage.exists(name))
+
+
+class OpenAPISchemaTests(SimpleTestCase):
+    """
+    Schéma OpenAPI généré sur disque et servi avec un ETag (EspritMobile/schema.py).
+    """
+
+    def test_concurrent_builds_do_not_share_a_temporary_file(self):
+        from EspritMobile import schema
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "openapi.json"
+            names = []
+            replace = os.replace
+
+            def record(source, target):
+                names.append(source)
+                replace(source, target)
+
+            with mock.patch.object(schema.os, "replace", record):
+                first, second = schema.build_schema(path), schema.build_schema(path)
+            self.assertEqual(len(set(names)), 2)
+            self.assertEqual(path.read_bytes(), second)
+            self.assertEqual(os.listdir(directory), ["openapi.json"])
+            self.assertEqual(json.loads(first)["info"]["title"], "EspritMobile backend APIs")
+
+
+class LargeTableAdminTests(TestCase):
+    """
+    Admin des grandes tables (InspiraApp/admin.py) : comptage estimé, tri par clé primaire, recherche par préfixe.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = inspira_models.User.objects.create_superuser(username="admin", email="admin@example.com", password="admin-password")
+        for name in ("alice", "bob", "malice"):
+            inspira_models.User.objects.create_user(username=name, email=f"{name}@example.com", password="user-password")
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def test_users_are_ordered_by_pk(self):
+        response = self.client.get("/admin/InspiraApp/user/")
+        self.assertEqual(response.status_code, 200)
+        users = list(response.context["cl"].result_list)
+        self.assertEqual([user.pk for user in users], sorted((user.pk for user in users), reverse=True))
+
+    def test_search_matches_prefix(self):
+        response = self.client.get("/admin/InspiraApp/user/", {"q": "alice"})
+        self.assertEqual([user.username for user in response.context["cl"].result_list], ["alice"])
+
+    def test_filtered_count_is_exact(self):
+        paginator = admin_module.EstimatedCountPaginator(inspira_models.User.objects.filter(is_staff=False).order_by("pk"), 2)
+        self.assertEqual(paginator.count, 3)
+
+    @skipUnless(connection.vendor == "postgresql", "Planner estimates require PostgreSQL.")
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=0)
+    def test_unfiltered_count_is_estimated(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {inspira_models.User._meta.db_table}")
+        paginator = admin_module.EstimatedCountPaginator(inspira_models.User.objects.order_by("pk"), 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 4)
+
+
+class CitationSelectionTests(TestCase):
+    """
+    Citation du jour et citation au hasard (InspiraApp/selection.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="select", email="select@example.com", password="select-password")
+        cls.category = inspira_models.Category.objects.create(name="Selection", active=True)
+        cls.citations = [
+            inspira_models.Citation.objects.create(user=cls.user, category=cls.category, title=f"Selection {index}", author="A", active=True)
+            for index in range(5)
+        ]
+        # Identifiant au-delà de 32 bits
+        cls.citations.append(inspira_models.Citation.objects.create(
+            pk=2 ** 40, user=cls.user, category=cls.category, title="Selection big", author="A", active=True
+        ))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_ids_beyond_32_bits(self):
+        self.assertIn(2 ** 40, selection.active_citation_ids(self.category.pk))
+
+    def test_daily_citation_is_deterministic(self):
+        today = now().date()
+        citation_id = selection.daily_citation_id(self.category.pk, today)
+        self.assertEqual(inspira_models.DailyQuote.objects.get(date=today, category=self.category).citation_id, citation_id)
+        # Autre worker, même tirage : sans DailyQuote ni cache, la même citation est choisie
+        inspira_models.DailyQuote.objects.all().delete()
+        cache.clear()
+        self.assertEqual(selection.daily_citation_id(self.category.pk, today), citation_id)
+        response = self.client.get("/api/v1/inspiration/citations/daily/", {"category": self.category.slug})
+        self.assertEqual(response.data["id"], citation_id)
+
+    def test_deactivated_daily_citation_is_replaced(self):
+        today = now().date()
+        citation_id = selection.daily_citation_id(self.category.pk, today)
+        with self.captureOnCommitCallbacks(execute=True):
+            citation = inspira_models.Citation.objects.get(pk=citation_id)
+            citation.active = False
+            citation.save()
+        self.assertNotEqual(selection.daily_citation_id(self.category.pk, today), citation_id)
+
+    def test_random_skips_recent_citations(self):
+        self.client.force_authenticate(self.user)
+        seen = [self.client.get("/api/v1/inspiration/citations/random/").data["id"] for _ in range(len(self.citations) - 1)]
+        self.assertEqual(len(set(seen)), len(seen))
+
+    def test_unknown_category(self):
+        self.assertEqual(self.client.get("/api/v1/inspiration/citations/random/", {"category": "missing"}).status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/inspiration/citations/daily/", {"category": "missing"}).status_code, 404)
+
+
+class ResponseEncodingTests(TestCase):
+    """
+    Compression négociée (InspiraApp/middleware.py) et format MessagePack (InspiraApp/renderers.py) des vues synchrones.
+    """
+    path = "/api/v1/inspiration/citations/"
+
+    @classmethod
+    def setUpTestData(cls):
+        user = inspira_models.User.objects.create_user(username="encoding", email="encoding@example.com", password="encoding-password")
+        category = inspira_models.Category.objects.create(name="Encoding", active=True)
+        for index in range(10):
+            inspira_models.Citation.objects.create(
+                user=user, category=category, title=f"Encoding {index}", author="A", description="Une citation " * 10, active=True
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_negotiate(self):
+        self.assertEqual(compression.negotiate("gzip;q=0.5, br", ("gzip", "br")), "br")
+        self.assertEqual(compression.negotiate("gzip, br", ("gzip",)), "gzip")
+        self.assertEqual(compression.negotiate("*;q=0.1", ("gzip",)), "gzip")
+        self.assertIsNone(compression.negotiate("gzip;q=0, identity", ("gzip",)))
+        self.assertIsNone(compression.negotiate("", ("gzip",)))
+
+    def test_gzip(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 10)
+
+    def test_refused_encoding(self):
+        response = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(len(response.json()), 10)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.client.get(f"{self.path}?fields=id", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertLess(len(response.content), 512)
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @skipUnless(find_spec("msgpack"), "msgpack is not installed.")
+    def test_msgpack(self):
+        import msgpack
+
+        response = self.client.get(self.path, HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(len(msgpack.unpackb(response.content)), 10)
+
+        body = msgpack.packb({"email": "encoding@example.com", "password": "encoding-password"})
+        response = self.client.post("/api/v1/auth/token/", body, content_type="application/msgpack")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.json())
+        response = self.client.post("/api/v1/auth/token/", b"\xc1", content_type="application/msgpack")
+        self.assertEqual(response.status_code, 400)
+
+
+class SparseFieldsTests(TestCase):
+    """
+    Sélection des champs par ?fields= et ?expand= (SparseFieldsMixin, InspiraApp/serializers.py).
+    """
+    path = "/api/v1/inspiration/citations/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="sparse", email="sparse@example.com", password="sparse-password")
+        cls.category = inspira_models.Category.objects.create(name="Sparse", active=True)
+        cls.citations = [
+            inspira_models.Citation.objects.create(user=cls.user, category=cls.category, title=f"Sparse {index}", author="A", active=True)
+            for index in range(3)
+        ]
+        inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=cls.citations[0].pk)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=cls.category, title="Sparse thought", author="A", active=True)
+        inspira_models.Paragraph.objects.create(thought=cls.thought, content="<p>Premier</p>", active=True)
+        statistics.rebuild_category_statistics()
+
+    def setUp(self):
+        cache.clear()
+        for hot_cache in hotcache.caches.values():
+            hot_cache.clear()
+        self.client = APIClient()
+
+    def test_parse_field_tree(self):
+        self.assertEqual(
+            serializers.parse_field_tree("id, title,citations.title,,citations.id"),
+            {"id": {}, "title": {}, "citations": {"title": {}, "id": {}}},
+        )
+        self.assertEqual(serializers.parse_field_tree(None), {})
+
+    def test_deferred_fields_are_omitted_by_default(self):
+        item = self.client.get(self.path).json()[0]
+        self.assertNotIn("category", item)
+        self.assertNotIn("like_count", item)
+        self.assertIn("title", item)
+
+    def test_fields(self):
+        self.assertEqual(self.client.get(self.path, {"fields": "id,title"}).json()[0].keys(), {"id", "title"})
+        # Noms inconnus ignorés
+        self.assertEqual(self.client.get(self.path, {"fields": "id,password"}).json()[0].keys(), {"id"})
+
+    def test_expand(self):
+        items = {item["id"]: item for item in self.client.get(self.path, {"fields": "id", "expand": "category,like_count"}).json()}
+        citation = items[self.citations[0].pk]
+        self.assertEqual(citation["like_count"], 1)
+        self.assertEqual(citation["category"]["slug"], self.category.slug)
+        self.assertEqual(citation["category"]["statistics"]["citation_count"], 3)
+
+    def test_expand_has_no_per_row_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.path, {"expand": "category,like_count,favorite_count"})
+        inspira_models.Citation.objects.create(user=self.user, category=self.category, title="Sparse extra", author="A", active=True)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.path, {"expand": "category,like_count,favorite_count"})
+
+    def test_nested_fields(self):
+        response = self.client.get(f"/api/v1/inspiration/thoughts/{self.thought.slug}/", {"fields": "id,paragraphs.text"})
+        self.assertEqual(response.json(), {"id": self.thought.pk, "paragraphs": [{"text": "Premier"}]})
+
+
+class CategoryStatisticsTests(TestCase):
+    """
+    Statistiques matérialisées par catégorie (InspiraApp/statistics.py) : incréments et reconstruction.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="stats", email="stats@example.com", password="stats-password")
+        cls.first, cls.second = (inspira_models.Category.objects.create(name=name, active=True) for name in ("Stats 1", "Stats 2"))
+        cls.citation = inspira_models.Citation.objects.create(user=cls.user, category=cls.first, title="Stats citation", author="A", active=True)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=cls.first, title="Stats thought", author="A", active=True)
+        statistics.rebuild_category_statistics()
+
+    def stats(self, category):
+        return inspira_models.CategoryStatistics.objects.values(
+            "citation_count", "thought_count", "like_count", "favorite_count"
+        ).get(category=category)
+
+    def relate(self, model, target):
+        with self.captureOnCommitCallbacks(execute=True):
+            return model.objects.create(user=self.user, target_type=inspira_models.relation_target(type(target)), object_id=target.pk)
+
+    def test_rebuild(self):
+        self.assertEqual(self.stats(self.first), {"citation_count": 1, "thought_count": 1, "like_count": 0, "favorite_count": 0})
+        self.assertEqual(self.stats(self.second)["citation_count"], 0)
+        output = io.StringIO()
+        call_command("rebuild_category_statistics", "--category", str(self.second.pk), stdout=output)
+        self.assertIn("1 category statistics rebuilt", output.getvalue())
+
+    def test_relation_deltas(self):
+        like = self.relate(inspira_models.Like, self.citation)
+        self.relate(inspira_models.Favorite, self.thought)
+        self.assertEqual(self.stats(self.first)["like_count"], 1)
+        self.assertEqual(self.stats(self.first)["favorite_count"], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            like.delete()
+        self.assertEqual(self.stats(self.first)["like_count"], 0)
+
+    def test_delta_never_goes_negative(self):
+        like = self.relate(inspira_models.Like, self.citation)
+        inspira_models.CategoryStatistics.objects.filter(category=self.first).update(like_count=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            like.delete()
+        self.assertEqual(self.stats(self.first)["like_count"], 0)
+
+    def test_missing_row_is_rebuilt(self):
+        inspira_models.CategoryStatistics.objects.filter(category=self.first).delete()
+        self.relate(inspira_models.Like, self.citation)
+        self.assertEqual(self.stats(self.first), {"citation_count": 1, "thought_count": 1, "like_count": 1, "favorite_count": 0})
+
+    def test_content_moves_between_categories(self):
+        self.relate(inspira_models.Like, self.citation)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.citation.category = self.second
+            self.citation.save()
+        self.assertEqual(self.stats(self.first)["citation_count"], 0)
+        self.assertEqual(self.stats(self.first)["like_count"], 0)
+        self.assertEqual(self.stats(self.second)["citation_count"], 1)
+        self.assertEqual(self.stats(self.second)["like_count"], 1)
+
+    def test_inactive_content_is_not_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.thought.active = False
+            self.thought.save()
+        self.relate(inspira_models.Like, self.thought)
+        self.assertEqual(self.stats(self.first)["thought_count"], 0)
+        self.assertEqual(self.stats(self.first)["like_count"], 0)
+
+
+@override_settings(ROOT_URLCONF="InspiraApp.async_urls")
+class CountStreamTests(TestCase):
+    """
+    Flux SSE des compteurs (CountStreamView, InspiraApp/push.py).
+    """
+    path = "/inspiration/stream/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="stream", email="stream@example.com", password="stream-password")
+        category = inspira_models.Category.objects.create(name="Stream", active=True)
+        cls.citation = inspira_models.Citation.objects.create(user=cls.user, category=category, title="Stream citation", author="A", active=True)
+        inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=cls.citation.pk)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=category, title="Stream thought", author="A", active=True)
+
+    @override_settings(ROOT_URLCONF="EspritMobile.urls")
+    def test_not_mounted_without_async_views(self):
+        self.assertEqual(self.client.get(f"/api/v1{self.path}", {"citations": self.citation.pk}).status_code, 404)
+
+    def test_not_served_by_wsgi(self):
+        self.assertEqual(self.client.get(self.path, {"citations": self.citation.pk}).status_code, 501)
+
+    @override_settings(PUSH_MAX_SUBSCRIPTION_KEYS=2)
+    async def test_invalid_ids(self):
+        client = AsyncClient()
+        for query in ({}, {"citations": "abc"}, {"citations": str(2 ** 63)}, {"citations": "1,2", "thoughts": "3"}):
+            with self.subTest(query=query):
+                self.assertEqual((await client.get(self.path, query)).status_code, 400)
+
+    async def test_initial_counts(self):
+        response = await AsyncClient().get(self.path, {"citations": f"{self.citation.pk},abc"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        events = aiter(response.streaming_content)
+        try:
+            first = (await anext(events)).decode()
+        finally:
+            await events.aclose()
+        self.assertTrue(first.startswith("event: counts\n"))
+        self.assertEqual(json.loads(first.split("data: ", 1)[1]), {"type": "citation", "id": self.citation.pk, "like_count": 1, "favorite_count": 0})
+
+    async def test_updates_until_disconnect(self):
+        key = push.push_key("thought", self.thought.pk)
+        events = async_views.CountStreamView().events({"thought": {self.thought.pk}})
+        try:
+            await anext(events)
+            await inspira_models.Favorite.objects.acreate(
+                user=self.user, target_type=inspira_models.RelationTarget.THOUGHT, object_id=self.thought.pk
+            )
+            coalescer = push.CountCoalescer(interval=0)
+            # Seuls les objets suivis par un client sont recomptés et publiés
+            coalescer._dirty["thought"].update({self.thought.pk, self.thought.pk + 1})
+            await sync_to_async(coalescer.flush)()
+            update = await asyncio.wait_for(anext(events), 1)
+            self.assertEqual(
+                json.loads(update.split("data: ", 1)[1]),
+                {"type": "thought", "id": self.thought.pk, "like_count": 0, "favorite_count": 1},
+            )
+            self.assertTrue(push.get_broker().has_subscribers(key))
+        finally:
+            await events.aclose()
+        self.assertFalse(push.get_broker().has_subscribers(key))
+
+
+@override_settings(DATABASE_REPLICAS=["replica_0"])
+class ReplicaRoutingTests(TestCase):
+    """
+    Routage des lectures vers les réplicas (InspiraApp/routers.py, ReplicaRoutingMiddleware).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="replica", email="replica@example.com", password="replica-password")
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = routers.PrimaryReplicaRouter()
+
+    def route(self, request, status=200):
+        """
+        Passe la requête dans le middleware ; renvoie la réponse et la base choisie pour une lecture dans la vue.
+        """
+        aliases = []
+
+        def view(request):
+            aliases.append(self.router.db_for_read(inspira_models.Citation))
+            return HttpResponse(status=status)
+
+        return middleware.ReplicaRoutingMiddleware(view)(request), aliases[0]
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(inspira_models.Citation), "default")
+
+    def test_safe_request_reads_from_replica(self):
+        self.assertEqual(self.route(self.factory.get("/"))[1], "replica_0")
+
+    def test_unsafe_request_reads_from_primary(self):
+        self.assertEqual(self.route(self.factory.post("/"))[1], "default")
+
+    def test_read_after_write_uses_primary(self):
+        token = routers.begin_request(self.factory.get("/"), True)
+        try:
+            self.assertEqual(self.router.db_for_write(inspira_models.Like), "default")
+            self.assertEqual(self.router.db_for_read(inspira_models.Like), "default")
+        finally:
+            routers.end_request(token)
+
+    def test_successful_write_pins_user(self):
+        request = self.factory.post("/")
+        request.user = self.user
+        response, _ = self.route(request, status=201)
+        self.assertEqual(response.cookies[routers.PIN_COOKIE]["max-age"], settings.DATABASE_REPLICA_PIN_SECONDS)
+        self.assertTrue(cache.get(routers.PIN_CACHE_KEY.format(self.user.pk)))
+
+        # Requête suivante, depuis un autre appareil sans le cookie
+        request = self.factory.get("/")
+        request.user = self.user
+        self.assertEqual(self.route(request)[1], "default")
+        self.factory.cookies[routers.PIN_COOKIE] = "1"
+        self.assertEqual(self.route(self.factory.get("/"))[1], "default")
+
+    def test_failed_write_does_not_pin(self):
+        request = self.factory.post("/")
+        request.user = self.user
+        response, _ = self.route(request, status=400)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        self.assertIsNone(cache.get(routers.PIN_CACHE_KEY.format(self.user.pk)))
+
+    async def test_async_chain(self):
+        aliases = []
+
+        async def view(request):
+            aliases.append(self.router.db_for_read(inspira_models.Citation))
+            return HttpResponse(status=201)
+
+        handler = middleware.ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(handler))
+        await handler(self.factory.get("/"))
+        request = self.factory.post("/")
+        request.user = self.user
+        response = await handler(request)
+        self.assertEqual(aliases, ["replica_0", "default"])
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.assertTrue(await cache.aget(routers.PIN_CACHE_KEY.format(self.user.pk)))
+
+
+class RelationTargetTests(TestCase):
+    """
+    Cible des likes et favoris stockée dans target_type (RelationTarget) plutôt qu'en ContentType.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="target", email="target@example.com", password="target-password")
+        category = inspira_models.Category.objects.create(name="Target", active=True)
+        cls.citation = inspira_models.Citation.objects.create(user=cls.user, category=category, title="Target citation", author="A", active=True)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=category, title="Target thought", author="A", active=True)
+        for target in (cls.citation, cls.thought):
+            inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.relation_target(type(target)), object_id=target.pk)
+        # Objet supprimé depuis
+        inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=cls.citation.pk + 1000)
+
+    def test_relation_target(self):
+        self.assertEqual(inspira_models.relation_target(inspira_models.Thought), inspira_models.RelationTarget.THOUGHT)
+        with self.assertRaises(KeyError):
+            inspira_models.relation_target(inspira_models.Category)
+
+    def test_prefetch_targets(self):
+        with self.assertNumQueries(3):
+            likes = inspira_models.prefetch_targets(inspira_models.Like.objects.order_by("pk"))
+        with self.assertNumQueries(0):
+            self.assertEqual([like.content_object for like in likes], [self.citation, self.thought, None])
+
+    def test_content_object_is_loaded_lazily(self):
+        like = inspira_models.Like.objects.order_by("pk").first()
+        with self.assertNumQueries(1):
+            self.assertEqual(like.content_object, self.citation)
+            self.assertEqual(like.content_object, self.citation)
+
+
+class RelationTargetMigrationTests(TransactionTestCase):
+    """
+    Migration 0005 : conversion des ContentType en target_type, dans les deux sens.
+    """
+    before = [("InspiraApp", "0004_content_addressed_images")]
+    after = [("InspiraApp", "0005_relation_target_type")]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate(self.before)
+        self.addCleanup(self.migrate_to_latest)
+
+    def migrate_to_latest(self):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self, targets):
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+        return self.executor.loader.project_state(targets).apps
+
+    def test_content_types_are_converted(self):
+        apps = self.executor.loader.project_state(self.before).apps
+        ContentType = apps.get_model("contenttypes", "ContentType")
+        user = apps.get_model("InspiraApp", "User").objects.create(username="migrated", email="migrated@example.com")
+        citation_type, _ = ContentType.objects.get_or_create(app_label="InspiraApp", model="citation")
+        thought_type, _ = ContentType.objects.get_or_create(app_label="InspiraApp", model="thought")
+        other_type, _ = ContentType.objects.get_or_create(app_label="InspiraApp", model="category")
+        Like = apps.get_model("InspiraApp", "Like")
+        for content_type, object_id in ((citation_type, 1), (thought_type, 2), (other_type, 3)):
+            Like.objects.create(user=user, content_type=content_type, object_id=object_id)
+
+        apps = self.migrate(self.after)
+        rows = apps.get_model("InspiraApp", "Like").objects.order_by("object_id").values_list("target_type", "object_id")
+        # Les relations vers un autre type de contenu sont supprimées
+        self.assertEqual(list(rows), [(1, 1), (2, 2)])
+
+        apps = self.migrate(self.before)
+        rows = apps.get_model("InspiraApp", "Like").objects.order_by("object_id").values_list("content_type__model", "object_id")
+        self.assertEqual(list(rows), [("citation", 1), ("thought", 2)])
+
+
+class BatchDetailTests(TestCase):
+    """
+    Détails groupés de citations et de pensées (BatchDetailView).
+    """
+    path = "/api/v1/inspiration/batch/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="details", email="details@example.com", password="details-password")
+        category = inspira_models.Category.objects.create(name="Details", active=True)
+        cls.citations = [
+            inspira_models.Citation.objects.create(user=cls.user, category=category, title=title, author="A", active=True)
+            for title in ("Batch one", "Batch two", "987654")
+        ]
+        cls.inactive = inspira_models.Citation.objects.create(user=cls.user, category=category, title="Batch hidden", author="A", active=False)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=category, title="Batch thought", author="A", active=True)
+        inspira_models.Paragraph.objects.create(thought=cls.thought, content="<p>Texte</p>", active=True)
+        inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=cls.citations[0].pk)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_mixed_request(self):
+        first, second, numeric = self.citations
+        keys = [first.slug, str(second.pk), numeric.slug, self.inactive.slug, "missing"]
+        with self.assertNumQueries(3):
+            response = self.client.get(self.path, {"citations": ",".join(keys), "thoughts": self.thought.slug})
+        self.assertEqual(response.status_code, 200)
+        citations = response.data["citations"]
+        self.assertEqual(list(citations), keys)
+        self.assertEqual(citations[first.slug]["data"]["like_count"], 1)
+        self.assertEqual(citations[str(second.pk)]["data"]["slug"], second.slug)
+        # Clé numérique sans identifiant correspondant : lue comme un slug
+        self.assertEqual(citations[numeric.slug]["data"]["id"], numeric.pk)
+        self.assertEqual(citations[self.inactive.slug]["status"], 404)
+        self.assertEqual(citations["missing"], {"status": 404, "detail": "Citation not found."})
+        self.assertEqual(response.data["thoughts"][self.thought.slug]["data"]["paragraphs"][0]["text"], "Texte")
+
+    def test_sparse_fields(self):
+        response = self.client.get(self.path, {"citations": self.citations[0].slug, "fields": "id,title"})
+        self.assertEqual(response.data["citations"][self.citations[0].slug]["data"].keys(), {"id", "title"})
+        self.assertEqual(response.data["thoughts"], {})
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(self.path).status_code, 400)
+        self.assertEqual(self.client.get(self.path, {"citations": " , "}).status_code, 400)
+        with override_settings(BATCH_DETAIL_MAX_ITEMS=2):
+            response = self.client.get(self.path, {"citations": "a,b", "thoughts": "c"})
+        self.assertEqual(response.status_code, 400)
+
+
+class JobQueueTests(TestCase):
+    """
+    File de tâches en base (InspiraApp/jobs.py) : prise, reprise, abandon, tâches périodiques.
+    """
+
+    def setUp(self):
+        self.calls = []
+
+        def record(value, fail=False):
+            if fail:
+                raise RuntimeError("boom")
+            self.calls.append(value)
+
+        record.max_attempts = 2
+        registry = mock.patch.dict(jobs._registry, {"test_record": record})
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def run_job(self, job):
+        claimed = jobs.claim("test-worker", 10, pks=[job.pk])
+        for claimed_job in claimed:
+            jobs.execute(claimed_job)
+        job.refresh_from_db()
+        return claimed
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue("missing")
+
+    def test_claim_and_execute(self):
+        ready = jobs.enqueue("test_record", {"value": 1})
+        later = jobs.enqueue("test_record", {"value": 2}, delay=60)
+        claimed = jobs.claim("test-worker", 10)
+        self.assertEqual([job.pk for job in claimed], [ready.pk])
+        self.assertEqual((claimed[0].status, claimed[0].attempts, claimed[0].locked_by), ("running", 1, "test-worker"))
+        # Déjà prise : un autre worker ne la reprend pas
+        self.assertEqual(jobs.claim("other-worker", 10), [])
+        jobs.execute(claimed[0])
+        ready.refresh_from_db()
+        self.assertEqual(ready.status, inspira_models.JobStatus.DONE)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(inspira_models.Job.objects.get(pk=later.pk).status, inspira_models.JobStatus.QUEUED)
+
+    def test_retry_then_dead_letter(self):
+        job = jobs.enqueue("test_record", {"value": 1, "fail": True})
+        self.assertEqual(job.max_attempts, 2)
+        self.run_job(job)
+        self.assertEqual(job.status, inspira_models.JobStatus.QUEUED)
+        self.assertIn("RuntimeError: boom", job.last_error)
+        self.assertGreater(job.run_at, now() + timedelta(seconds=settings.JOB_RETRY_DELAY - 5))
+
+        inspira_models.Job.objects.filter(pk=job.pk).update(run_at=now())
+        self.run_job(job)
+        self.assertEqual((job.status, job.attempts), (inspira_models.JobStatus.DEAD, 2))
+        self.assertEqual(self.run_job(job), [])
+
+    def test_retry_delay(self):
+        self.assertEqual([jobs.retry_delay(attempts) for attempts in (1, 2, 3)], [30, 60, 120])
+        self.assertEqual(jobs.retry_delay(20), settings.JOB_RETRY_MAX_DELAY)
+
+    def test_requeue_stale(self):
+        stale = jobs.enqueue("test_record", {"value": 1})
+        exhausted = jobs.enqueue("test_record", {"value": 2}, max_attempts=1)
+        jobs.claim("lost-worker", 10)
+        inspira_models.Job.objects.update(locked_at=now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT + 1))
+        self.assertEqual(jobs.requeue_stale(), (1, 1))
+        self.assertEqual(inspira_models.Job.objects.get(pk=stale.pk).status, inspira_models.JobStatus.QUEUED)
+        self.assertEqual(inspira_models.Job.objects.get(pk=exhausted.pk).status, inspira_models.JobStatus.DEAD)
+
+    @override_settings(JOB_PERIODIC={"test_record": 60})
+    def test_periodic_jobs_are_scheduled_once(self):
+        jobs.schedule_periodic()
+        jobs.schedule_periodic()
+        self.assertEqual(inspira_models.Job.objects.filter(name="test_record").count(), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            jobs.enqueue("test_record", unique_key="test_record")
+
+        job = inspira_models.Job.objects.get()
+        inspira_models.Job.objects.filter(pk=job.pk).update(status=inspira_models.JobStatus.DONE)
+        jobs.schedule_periodic()
+        # Prochaine exécution un intervalle après la précédente
+        following = inspira_models.Job.objects.filter(status=inspira_models.JobStatus.QUEUED).get()
+        self.assertGreater(following.run_at, now() + timedelta(seconds=50))
+
+    def test_purge_finished(self):
+        job = jobs.enqueue("test_record", {"value": 1})
+        inspira_models.Job.objects.filter(pk=job.pk).update(
+            status=inspira_models.JobStatus.DONE, updated_at=now() - timedelta(days=settings.JOB_RETENTION_DAYS + 1)
+        )
+        self.assertEqual(jobs.purge_finished(), 1)
+
+    @override_settings(JOB_PERIODIC={})
+    def test_maintenance_keeps_own_jobs(self):
+        own = jobs.enqueue("test_record", {"value": 1})
+        lost = jobs.enqueue("test_record", {"value": 2})
+        worker = jobs.Worker(name="live-worker")
+        jobs.claim(worker.name, 1, pks=[own.pk])
+        jobs.claim("lost-worker", 1, pks=[lost.pk])
+        inspira_models.Job.objects.update(locked_at=now() - timedelta(seconds=settings.JOB_LOCK_TIMEOUT + 1))
+        worker.maintenance()
+        self.assertEqual(inspira_models.Job.objects.get(pk=own.pk).status, inspira_models.JobStatus.RUNNING)
+        self.assertEqual(inspira_models.Job.objects.get(pk=lost.pk).status, inspira_models.JobStatus.QUEUED)
+
+
+class ActivityFeedTests(TestCase):
+    """
+    Fil d'activité par curseur (InspiraApp/activity.py, ActivityListView).
+    """
+    path = "/api/v1/inspiration/activity/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="feed", email="feed@example.com", password="feed-password")
+        category = inspira_models.Category.objects.create(name="Feed", active=True)
+        cls.citation = inspira_models.Citation.objects.create(user=cls.user, category=category, title="Feed citation", author="A", active=True)
+        cls.thought = inspira_models.Thought.objects.create(user=cls.user, category=category, title="Feed thought", author="A", active=True)
+        like = inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=cls.citation.pk)
+        inspira_models.Favorite.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.THOUGHT, object_id=cls.thought.pk)
+        like.delete()
+        inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.THOUGHT, object_id=cls.thought.pk)
+        inspira_models.Like.objects.create(user=cls.user, target_type=inspira_models.RelationTarget.CITATION, object_id=cls.citation.pk)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get(self.path).status_code, 401)
+
+    def test_cursor_pages(self):
+        items, url = [], f"{self.path}?page_size=2"
+        while url:
+            # Une requête pour la page, puis une par type de contenu visé, quelle que soit la profondeur
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertLessEqual(len(queries), 3)
+            items.extend(response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(
+            [(item["verb"], item["target_type"]) for item in items],
+            [("like", "citation"), ("like", "thought"), ("unlike", "citation"), ("favorite", "thought"), ("like", "citation")],
+        )
+        self.assertEqual(items[1]["target"]["slug"], self.thought.slug)
+
+    def test_verb_filter(self):
+        response = self.client.get(self.path, {"verb": "favorite,unlike,unknown"})
+        self.assertEqual([item["verb"] for item in response.data["results"]], ["unlike", "favorite"])
+
+    def test_inactive_target_is_null(self):
+        inspira_models.Citation.objects.filter(pk=self.citation.pk).update(active=False)
+        results = self.client.get(self.path).data["results"]
+        self.assertIsNone(results[0]["target"])
+        self.assertIsNotNone(results[1]["target"])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.path, {"cursor": "invalid"}).status_code, 404)
+
+    def test_deleted_user_takes_history(self):
+        self.user.delete()
+        self.assertFalse(inspira_models.Activity.objects.exists())
+
+
+class ProfileConditionalTests(TestCase):
+    """
+    Profil : validateurs HTTP (ETag, Last-Modified), If-None-Match / If-Match et PATCH partiel.
+    """
+    path = "/api/v1/auth/profile/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = inspira_models.User.objects.create_user(username="profile", email="profile@example.com", password="profile-password")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_requires_authentication(self):
+        self.assertEqual(APIClient().get(self.path).status_code, 401)
+
+    def test_not_modified(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        self.assertEqual(self.client.get(self.path, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304)
+        self.assertEqual(self.client.get(self.path, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_patch_with_if_match(self):
+        etag = self.client.get(self.path)["ETag"]
+        response = self.client.patch(self.path, {"location": "Kinshasa"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["location"], "Kinshasa")
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Deuxième client qui avait lu l'ancienne version
+        response = self.client.patch(self.path, {"bio": "Perdu"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        profile = inspira_models.Profile.objects.get(user=self.user)
+        self.assertEqual((profile.location, profile.bio), ("Kinshasa", ""))
+
+    def test_unchanged_patch_writes_nothing(self):
+        profile = inspira_models.Profile.objects.get(user=self.user)
+        response = self.client.patch(self.path, {"location": profile.location}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(inspira_models.Profile.objects.get(pk=profile.pk).updated_at, profile.updated_at)
+
+    def test_invalid_patch(self):
+        response = self.client.patch(self.path, {"website": "not a url"}, format="json", HTTP_IF_MATCH="*")
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,155 @@
+"""
+Limitation de débit par seau à jetons (token bucket) pour les endpoints d'authentification.
+
+Chaque seau contient au plus N jetons et se remplit de N jetons par période
+(taux "N/période" de REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']). Une requête
+consomme un jeton ; sans jeton, DRF répond 429 avec un en-tête Retry-After.
+L'état d'un seau (jetons, date de mise à jour) tient dans une entrée du cache
+partagé : avec Redis, un script Lua le lit et le réécrit en une seule commande
+atomique, la limite est donc globale quel que soit le nombre de workers, sans
+écriture en base. L'entrée expire quand le seau est de nouveau plein.
+Avec un autre cache (LocMem en développement), la mise à jour n'est atomique
+qu'au sein d'un processus.
+
+Le taux d'un seau est cherché sous "<throttle_scope de la vue>.<kind>",
+par exemple "password_reset.email".
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils.http import urlsafe_base64_decode
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# KEYS[1] : seau ; ARGV : capacité, période (s), heure courante (s).
+# Renvoie {1 si la requête passe, jetons restants} ; les jetons sont renvoyés
+# en texte, Redis tronquerait un nombre Lua en entier.
+TAKE_TOKEN_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local current = tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "stamp")
+local tokens = capacity
+if state[1] then
+    tokens = math.min(capacity, tonumber(state[1]) + math.max(0, current - tonumber(state[2])) * capacity / period)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "stamp", ARGV[3])
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) * period * 1000 / capacity))
+return {allowed, tostring(tokens)}
+"""
+
+_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """
+    "5/min" -> (5, 60)
+    """
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+def take_token(key, capacity, period):
+    """
+    Prend un jeton du seau ; renvoie (requête acceptée, jetons restants).
+    """
+    cache = caches["default"]
+    current = time.time()
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(key)
+        client = cache._cache.get_client(key, write=True)
+        allowed, tokens = client.register_script(TAKE_TOKEN_SCRIPT)(keys=[key], args=[capacity, period, current])
+        return bool(allowed), float(tokens)
+
+    with _lock:
+        tokens, stamp = cache.get(key, (capacity, current))
+        tokens = min(capacity, tokens + max(0, current - stamp) * capacity / period)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        cache.set(key, (tokens, current), math.ceil((capacity - tokens) * period / capacity))
+    return allowed, tokens
+
+
+class TokenBucketThrottle(BaseThrottle):
+    kind = None
+
+    def get_bucket_ident(self, request, view):
+        raise NotImplementedError(".get_bucket_ident() must be overridden")
+
+    def get_rate(self, view):
+        scope = getattr(view, "throttle_scope", None)
+        if scope is None:
+            return None
+        return api_settings.DEFAULT_THROTTLE_RATES.get(f"{scope}.{self.kind}")
+
+    def allow_request(self, request, view):
+        self._wait = None
+        rate = self.get_rate(view)
+        ident = self.get_bucket_ident(request, view) if rate else None
+        if not ident:
+            return True
+
+        capacity, period = parse_rate(rate)
+        digest = hashlib.sha256(str(ident).encode()).hexdigest()[:32]
+        allowed, tokens = take_token(f"throttle:{view.throttle_scope}:{self.kind}:{digest}", capacity, period)
+        if not allowed:
+            self._wait = (1 - tokens) * period / capacity
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Seau par adresse IP. X-Forwarded-For n'est lu qu'au travers des
+    REST_FRAMEWORK['NUM_PROXIES'] proxys de confiance : un client ne peut pas
+    changer de seau en modifiant l'en-tête.
+    """
+    kind = "ip"
+
+    def get_bucket_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Seau par adresse email soumise, qu'elle corresponde ou non à un compte.
+    """
+    kind = "email"
+
+    def get_bucket_ident(self, request, view):
+        email = request.data.get("email") if hasattr(request.data, "get") else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Seau par utilisateur : l'utilisateur connecté, ou celui visé par uidb64 (vérification d'OTP).
+    """
+    kind = "user"
+
+    def get_bucket_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        uidb64 = request.data.get("uidb64") if hasattr(request.data, "get") else None
+        if not isinstance(uidb64, str):
+            return None
+        try:
+            return urlsafe_base64_decode(uidb64).decode()
+        except (ValueError, UnicodeDecodeError):
+            return None
@@ -15,9 +15,13 @@ urlpatterns = [
     path('inspiration/categories/', inspira_views.CategoryListView.as_view(), name='category-list'),
     path('inspiration/categories/<slug:slug>/', inspira_views.CategoryDetailView.as_view(), name='category-detail'),
     path('inspiration/citations/', inspira_views.CitationListView.as_view(), name='citation-list'),
+    path('inspiration/citations/daily/', inspira_views.DailyCitationView.as_view(), name='citation-daily'),
+    path('inspiration/citations/random/', inspira_views.RandomCitationView.as_view(), name='citation-random'),
     path('inspiration/citations/<slug:slug>/', inspira_views.CitationDetailView.as_view(), name='citation-detail'),
     path('inspiration/thoughts/', inspira_views.ThoughtListView.as_view(), name='thought-list'),
     path('inspiration/thoughts/<slug:slug>/', inspira_views.ThoughtDetailView.as_view(), name='thought-detail'),
+    path('inspiration/batch/', inspira_views.BatchDetailView.as_view(), name='batch-detail'),
+    path('inspiration/batch/relations/', inspira_views.BatchRelationView.as_view(), name='batch-relations'),
 
     path('inspiration/citation/<int:object_id>/likes/', inspira_views.LikeCitationView.as_view(), name='like-citation'),
     path('inspiration/citation/<int:object_id>/favorites/', inspira_views.FavoriteCitationView.as_view(), name='favorite-citation'),
@@ -26,5 +30,7 @@ urlpatterns = [
     path('inspiration/favorites/thoughts/', inspira_views.FavoriteThoughtListView.as_view(), name='favorite-thoughts-list'),
     path('inspiration/favorites/citations/', inspira_views.FavoriteCitationListView.as_view(), name='favorite-citations-list'),
     path('inspiration/favorites/category/<slug:category_slug>/', inspira_views.FavoriteCitationsAndThoughtsByCategoryView.as_view(), name='favorites-category'),
+    path('inspiration/activity/', inspira_views.ActivityListView.as_view(), name='activity-list'),
     path('inspiration/about/', inspira_views.AboutView.as_view(), name='about'),
+    path('inspiration/bundle/', inspira_views.ContentBundleView.as_view(), name='content-bundle'),
 ]
\ No newline at end of file
@@ -1,31 +1,30 @@
-from django.contrib.contenttypes.models import ContentType
 from django.shortcuts import render
-from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_decode
-from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.http import Http404, FileResponse, HttpResponseNotModified
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
 # Restframework
 from rest_framework import status
 from rest_framework.decorators import api_view, APIView
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework import generics
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from datetime import datetime
-import random
+import hashlib
 
 import InspiraApp.models as inspira_models
 import InspiraApp.serializers as inspira_serializers
 import InspiraApp.permissions as inspira_permissions
+import InspiraApp.throttling as inspira_throttling
+from InspiraApp import activity, bundles, credentials, hotcache, jobs, relations, selection
 
 # Authentication
 
@@ -35,6 +34,8 @@ class MyTokenObtainPairView(TokenObtainPairView):
     """
     serializer_class = inspira_serializers.MyTokenObtainPairSerializer
     permission_classes = (AllowAny,)
+    throttle_scope = "login"
+    throttle_classes = (inspira_throttling.IPTokenBucketThrottle, inspira_throttling.EmailTokenBucketThrottle)
 
     @swagger_auto_schema(
         operation_summary="Obtenir un token d'authentification",
@@ -48,6 +49,9 @@ class MyTokenObtainPairView(TokenObtainPairView):
             400: openapi.Response(
                 description="Identifiants invalides."
             ),
+            429: openapi.Response(
+                description="Trop de tentatives, réessayer après le délai indiqué par Retry-After."
+            ),
         }
     )
     def post(self, request, *args, **kwargs):
@@ -64,6 +68,8 @@ class RegisterView(generics.CreateAPIView):
     queryset = inspira_models.User.objects.all()
     serializer_class = inspira_serializers.RegisterSerializer
     permission_classes = (AllowAny,)
+    throttle_scope = "register"
+    throttle_classes = (inspira_throttling.IPTokenBucketThrottle,)
 
     @swagger_auto_schema(
         operation_summary="Enregistrement d'un utilisateur",
@@ -77,6 +83,9 @@ class RegisterView(generics.CreateAPIView):
             400: openapi.Response(
                 description="Requête invalide."
             ),
+            429: openapi.Response(
+                description="Trop de tentatives, réessayer après le délai indiqué par Retry-After."
+            ),
         }
     )
     def post(self, request, *args, **kwargs):
@@ -94,7 +103,66 @@ class ProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = (IsAuthenticated, inspira_permissions.IsOwnerOrReadOnly)
 
     def get_object(self):
-        return inspira_models.Profile.objects.get(user=self.request.user)
+        queryset = inspira_models.Profile.objects.select_related("user")
+        if self.request.method not in SAFE_METHODS:
+            # La vérification de If-Match et l'écriture ne doivent pas être séparées par une autre écriture
+            queryset = queryset.select_for_update(of=("self",))
+        profile = get_object_or_404(queryset, user=self.request.user)
+        self.check_object_permissions(self.request, profile)
+        return profile
+
+    def get_etag(self, profile):
+        # Le nom et l'email de l'utilisateur font aussi partie de la réponse
+        version = f"{profile.pk}:{profile.updated_at.isoformat()}:{profile.user.username}:{profile.user.email}"
+        return '"%s"' % hashlib.sha1(version.encode()).hexdigest()
+
+    def precondition_failed(self, request, profile):
+        """
+        Réponse 304 ou 412 si les en-têtes conditionnels de la requête l'imposent, sinon None.
+        Comparaison faible : CompressionMiddleware rend faible l'ETag des réponses compressées.
+        """
+        etag = self.get_etag(profile)
+        if_match = request.headers.get("If-Match")
+        if if_match and if_match.strip() != "*" and etag not in [tag.removeprefix("W/") for tag in parse_etags(if_match)]:
+            return Response(
+                {"detail": "The profile has been modified since it was loaded."},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
+        if request.method not in SAFE_METHODS:
+            return None
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            not_modified = if_none_match.strip() == "*" or etag in [tag.removeprefix("W/") for tag in parse_etags(if_none_match)]
+        else:
+            if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+            not_modified = if_modified_since is not None and int(profile.updated_at.timestamp()) <= if_modified_since
+        return self.add_validators(HttpResponseNotModified(), profile) if not_modified else None
+
+    def add_validators(self, response, profile):
+        response["ETag"] = self.get_etag(profile)
+        response["Last-Modified"] = http_date(profile.updated_at.timestamp())
+        # Réponse propre à l'utilisateur : revalidée à chaque affichage, jamais partagée
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        profile = self.get_object()
+        response = self.precondition_failed(request, profile)
+        if response is None:
+            response = self.add_validators(Response(self.get_serializer(profile).data), profile)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            profile = self.get_object()
+            response = self.precondition_failed(request, profile)
+            if response is not None:
+                return response
+            serializer = self.get_serializer(profile, data=request.data, partial=kwargs.pop("partial", False))
+            serializer.is_valid(raise_exception=True)
+            profile = serializer.save()
+        return self.add_validators(Response(serializer.data), profile)
 
     @swagger_auto_schema(
         operation_summary="Afficher le profil utilisateur",
@@ -156,13 +224,41 @@ class ProfileView(generics.RetrieveUpdateAPIView):
         """
         return super().put(request, *args, **kwargs)
 
-    
-def generate_numeric_otp(length=7):
-    return ''.join([str(random.randint(0, 9)) for _ in range(length)])
+    @swagger_auto_schema(
+        operation_summary="Mettre à jour une partie du profil utilisateur",
+        operation_description=(
+            "Met à jour les seuls champs envoyés ; seules les colonnes modifiées sont écrites. "
+            "Avec l'en-tête If-Match (ETag reçu), la mise à jour est refusée si le profil a changé entre-temps."
+        ),
+        request_body=inspira_serializers.ProfileSerializer,
+        responses={
+            200: openapi.Response(
+                description="Profil utilisateur mis à jour avec succès.",
+                schema=inspira_serializers.ProfileSerializer
+            ),
+            400: openapi.Response(
+                description="Requête invalide."
+            ),
+            401: openapi.Response(
+                description="Authentification requise."
+            ),
+            412: openapi.Response(
+                description="Le profil a été modifié depuis sa lecture (If-Match)."
+            ),
+        },
+    )
+    def patch(self, request, *args, **kwargs):
+        """
+        Met à jour partiellement le profil utilisateur.
+        """
+        return super().patch(request, *args, **kwargs)
+
 
 
 class PasswordEmailVerify(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "password_reset"
+    throttle_classes = [inspira_throttling.IPTokenBucketThrottle, inspira_throttling.EmailTokenBucketThrottle]
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -183,6 +279,9 @@ class PasswordEmailVerify(APIView):
             404: openapi.Response(
                 description="Utilisateur non trouvé."
             ),
+            429: openapi.Response(
+                description="Trop de tentatives, réessayer après le délai indiqué par Retry-After."
+            ),
         }
     )
     def post(self, request, *args, **kwargs):
@@ -195,38 +294,16 @@ class PasswordEmailVerify(APIView):
         except inspira_models.User.DoesNotExist:
             return Response({"message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        otp = generate_numeric_otp()
-        user.otp = otp
-        user.save()
-
-        uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
-        refresh = RefreshToken.for_user(user)
-        reset_token = str(refresh.access_token)
-
-        reset_link = f"http://localhost:5173/create-new-password?uidb64={uidb64}&otp={otp}&token={reset_token}"
-
-        # Envoi de l'email
-        subject = "Password Reset Request"
-        merge_data = {
-            "link": reset_link,
-            "username": user.username,
-            "otp": otp,
-        }
-        text_body = render_to_string("email/password_reset.txt", merge_data)
-        html_body = render_to_string("email/password_reset.html", merge_data)
-
-        msg = EmailMultiAlternatives(
-            subject=subject, from_email=settings.EMAIL_HOST_USER,
-            to=[email], body=text_body
-        )
-        msg.attach_alternative(html_body, "text/html")
-        msg.send()
+        # Code émis et envoyé par le worker (InspiraApp/tasks.py), sans écriture sur la ligne User
+        jobs.enqueue("send_password_reset_email", {"user_id": user.pk})
 
         return Response({"message": "Password reset email sent."}, status=status.HTTP_200_OK)
 
     
 class PasswordChangeView(APIView):
     permission_classes = [AllowAny]
+    throttle_scope = "password_change"
+    throttle_classes = [inspira_throttling.IPTokenBucketThrottle, inspira_throttling.UserTokenBucketThrottle]
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -246,6 +323,9 @@ class PasswordChangeView(APIView):
             400: openapi.Response(
                 description="OTP ou utilisateur invalide."
             ),
+            429: openapi.Response(
+                description="Trop de tentatives, réessayer après le délai indiqué par Retry-After."
+            ),
         }
     )
     def post(self, request, *args, **kwargs):
@@ -258,19 +338,69 @@ class PasswordChangeView(APIView):
 
         try:
             user_id = urlsafe_base64_decode(uidb64).decode()
-            user = inspira_models.User.objects.get(pk=user_id, otp=otp)
-        except (inspira_models.User.DoesNotExist, ValueError, TypeError):
+        except (ValueError, TypeError):
+            return Response({"message": "Invalid OTP or user."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Le code est consommé par la vérification : il ne peut servir qu'une fois
+        user = inspira_models.User.objects.filter(pk=user_id).first()
+        if user is None or not credentials.verify(user.pk, credentials.PASSWORD_RESET, otp):
             return Response({"message": "Invalid OTP or user."}, status=status.HTTP_400_BAD_REQUEST)
 
         user.set_password(new_password)
-        user.otp = None  # Invalider l'OTP après utilisation
-        user.save()
+        user.save(update_fields=["password"])
 
         return Response({"message": "Password changed successfully."}, status=status.HTTP_200_OK)
 
 # Inspirations
 
-class CategoryListView(generics.ListAPIView):
+sparse_fieldset_parameters = [
+    openapi.Parameter(
+        'fields',
+        openapi.IN_QUERY,
+        description="Champs à renvoyer, séparés par des virgules (notation pointée pour les objets imbriqués, ex. id,title,citations.title).",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        'expand',
+        openapi.IN_QUERY,
+        description="Champs à déplier ou compteurs à calculer (ex. category,like_count,favorite_count).",
+        type=openapi.TYPE_STRING,
+    ),
+]
+
+
+class SparseFieldsetMixin:
+    """
+    Applique la sélection ?fields= / ?expand= du sérialiseur au queryset,
+    afin que seules les colonnes utiles soient lues en base.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        return self.get_serializer().optimize_queryset(queryset)
+
+
+class HotObjectDetailMixin:
+    """
+    Sert la représentation par défaut (sans ?fields= ni ?expand=) depuis le
+    cache de détails du processus (InspiraApp/hotcache.py).
+    """
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'fields' in request.query_params or 'expand' in request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        kind = self.queryset.model._meta.model_name
+        slug = kwargs[self.lookup_field]
+        data = hotcache.get_payload(kind, slug, request)
+        if data is None:
+            token = hotcache.load_token(kind)
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+            hotcache.store_payload(kind, slug, instance, data, token)
+        return Response(data)
+
+
+class CategoryListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Vue pour lister toutes les catégories.
     """
@@ -286,7 +416,8 @@ class CategoryListView(generics.ListAPIView):
                 description="Liste des catégories récupérée avec succès",
                 schema=inspira_serializers.CategoryListSerializer
             ),
-        }
+        },
+        manual_parameters=sparse_fieldset_parameters
     )
     def get(self, request, *args, **kwargs):
         """
@@ -294,7 +425,7 @@ class CategoryListView(generics.ListAPIView):
         """
         return super().get(request, *args, **kwargs)
 
-class CategoryDetailView(generics.RetrieveAPIView):
+class CategoryDetailView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Vue pour afficher les détails d'une catégorie.
     """
@@ -312,7 +443,8 @@ class CategoryDetailView(generics.RetrieveAPIView):
                 schema=inspira_serializers.CategoryDetailSerializer
             ),
             404: openapi.Response(description="Catégorie non trouvée.")
-        }
+        },
+        manual_parameters=sparse_fieldset_parameters
     )
     def get(self, request, *args, **kwargs):
         """
@@ -320,7 +452,7 @@ class CategoryDetailView(generics.RetrieveAPIView):
         """
         return super().get(request, *args, **kwargs)
 
-class CitationListView(generics.ListAPIView):
+class CitationListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Vue pour lister toutes les citations.
     """
@@ -336,7 +468,8 @@ class CitationListView(generics.ListAPIView):
                 description="Liste des citations récupérée avec succès",
                 schema=inspira_serializers.CitationListSerializer
             ),
-        }
+        },
+        manual_parameters=sparse_fieldset_parameters
     )
     def get(self, request, *args, **kwargs):
         """
@@ -344,7 +477,7 @@ class CitationListView(generics.ListAPIView):
         """
         return super().get(request, *args, **kwargs)
 
-class CitationDetailView(generics.RetrieveAPIView):
+class CitationDetailView(HotObjectDetailMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Vue pour afficher les détails d'une citation.
     """
@@ -362,7 +495,8 @@ class CitationDetailView(generics.RetrieveAPIView):
                 schema=inspira_serializers.CitationDetailSerializer
             ),
             404: openapi.Response(description="Citation non trouvée.")
-        }
+        },
+        manual_parameters=sparse_fieldset_parameters
     )
     def get(self, request, *args, **kwargs):
         """
@@ -370,7 +504,82 @@ class CitationDetailView(generics.RetrieveAPIView):
         """
         return super().get(request, *args, **kwargs)
 
-class ThoughtListView(generics.ListAPIView):
+selection_category_parameter = openapi.Parameter(
+    'category',
+    openapi.IN_QUERY,
+    description="Slug d'une catégorie pour limiter le tirage à cette catégorie.",
+    type=openapi.TYPE_STRING,
+)
+
+
+class CitationSelectionView(generics.GenericAPIView):
+    """
+    Base des vues qui renvoient une citation tirée par InspiraApp/selection.py.
+    """
+    queryset = inspira_models.Citation.objects.filter(active=True)
+    serializer_class = inspira_serializers.CitationDetailSerializer
+    permission_classes = [AllowAny]
+
+    def get_category_id(self):
+        slug = self.request.query_params.get('category')
+        if not slug:
+            return None
+        category_id = inspira_models.Category.objects.filter(slug=slug).values_list('pk', flat=True).first()
+        if category_id is None:
+            raise Http404("Category not found.")
+        return category_id
+
+    def citation_response(self, citation_id):
+        queryset = self.get_serializer().optimize_queryset(self.get_queryset())
+        citation = queryset.filter(pk=citation_id).first() if citation_id is not None else None
+        if citation is None:
+            raise Http404("No active citation found.")
+        return Response(self.get_serializer(citation).data)
+
+class DailyCitationView(CitationSelectionView):
+    """
+    Vue pour afficher la citation du jour.
+    """
+
+    @swagger_auto_schema(
+        operation_summary="Citation du jour",
+        operation_description="Renvoie la citation du jour, la même pour tous les utilisateurs, globale ou par catégorie.",
+        responses={
+            200: openapi.Response(
+                description="Citation du jour récupérée avec succès",
+                schema=inspira_serializers.CitationDetailSerializer
+            ),
+            404: openapi.Response(description="Catégorie introuvable ou aucune citation active.")
+        },
+        manual_parameters=[selection_category_parameter] + sparse_fieldset_parameters
+    )
+    def get(self, request, *args, **kwargs):
+        return self.citation_response(selection.daily_citation_id(self.get_category_id()))
+
+class RandomCitationView(CitationSelectionView):
+    """
+    Vue pour tirer une citation au hasard.
+    """
+
+    @swagger_auto_schema(
+        operation_summary="Citation au hasard",
+        operation_description="Renvoie une citation active au hasard. Pour un utilisateur connecté, les dernières citations tirées ne sont pas reproposées.",
+        responses={
+            200: openapi.Response(
+                description="Citation tirée avec succès",
+                schema=inspira_serializers.CitationDetailSerializer
+            ),
+            404: openapi.Response(description="Catégorie introuvable ou aucune citation active.")
+        },
+        manual_parameters=[selection_category_parameter] + sparse_fieldset_parameters
+    )
+    def get(self, request, *args, **kwargs):
+        citation_id = selection.random_citation_id(self.get_category_id(), request.user)
+        response = self.citation_response(citation_id)
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+class ThoughtListView(SparseFieldsetMixin, generics.ListAPIView):
     """
     Vue pour lister toutes les pensées.
     """
@@ -386,7 +595,8 @@ class ThoughtListView(generics.ListAPIView):
                 description="Liste des pensées récupérée avec succès",
                 schema=inspira_serializers.ThoughtListSerializer
             ),
-        }
+        },
+        manual_parameters=sparse_fieldset_parameters
     )
     def get(self, request, *args, **kwargs):
         """
@@ -394,7 +604,7 @@ class ThoughtListView(generics.ListAPIView):
         """
         return super().get(request, *args, **kwargs)
 
-class ThoughtDetailView(generics.RetrieveAPIView):
+class ThoughtDetailView(HotObjectDetailMixin, SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     Vue pour afficher les détails d'une pensée.
     """
@@ -412,7 +622,8 @@ class ThoughtDetailView(generics.RetrieveAPIView):
                 schema=inspira_serializers.ThoughtDetailSerializer
             ),
             404: openapi.Response(description="Pensée non trouvée.")
-        }
+        },
+        manual_parameters=sparse_fieldset_parameters
     )
     def get(self, request, *args, **kwargs):
         """
@@ -420,6 +631,125 @@ class ThoughtDetailView(generics.RetrieveAPIView):
         """
         return super().get(request, *args, **kwargs)
 
+class BatchDetailView(APIView):
+    """
+    Vue pour récupérer en un appel les détails de plusieurs citations et pensées.
+
+    Les objets sont demandés par slug ou par identifiant (?citations=slug,12&thoughts=slug).
+    Chaque type est lu en une requête (compteurs annotés, paragraphes préchargés),
+    quel que soit le nombre d'objets demandés.
+    """
+    permission_classes = [AllowAny]
+    # Paramètre de requête : (modèle, sérialiseur, libellé des erreurs)
+    kinds = {
+        'citations': (inspira_models.Citation, inspira_serializers.CitationDetailSerializer, "Citation"),
+        'thoughts': (inspira_models.Thought, inspira_serializers.ThoughtDetailSerializer, "Thought"),
+    }
+
+    def parse_keys(self, request):
+        keys = {}
+        for kind in self.kinds:
+            values = [value.strip() for value in request.query_params.get(kind, "").split(",")]
+            keys[kind] = list(dict.fromkeys(value for value in values if value))
+        return keys
+
+    def resolve(self, kind, keys):
+        model, serializer_class, label = self.kinds[kind]
+        serializer = serializer_class(context={'request': self.request, 'view': self})
+        # Une clé qui n'est pas un identifiant valable pour la colonne ne peut être qu'un slug
+        ids = {key: inspira_models.parse_id(key, model) for key in keys}
+        queryset = serializer.optimize_queryset(model.objects.filter(active=True), extra_only=('slug',))
+        objects = list(queryset.filter(Q(slug__in=keys) | Q(pk__in=[pk for pk in ids.values() if pk is not None])))
+        data = dict(zip((obj.pk for obj in objects), serializer_class(objects, many=True, context=serializer.context).data))
+        by_slug = {obj.slug: obj.pk for obj in objects}
+
+        results = {}
+        for key in keys:
+            # Une clé numérique désigne d'abord un identifiant, puis un slug
+            pk = ids[key] if ids[key] in data else by_slug.get(key)
+            if pk is None:
+                results[key] = {"status": status.HTTP_404_NOT_FOUND, "detail": f"{label} not found."}
+            else:
+                results[key] = {"status": status.HTTP_200_OK, "data": data[pk]}
+        return results
+
+    @swagger_auto_schema(
+        operation_summary="Détails de plusieurs citations et pensées",
+        operation_description="Récupère en un seul appel les détails de citations et pensées actives par slug ou identifiant. Les résultats sont indexés par la valeur demandée ; un objet introuvable a le statut 404 sans faire échouer les autres.",
+        responses={
+            200: openapi.Response(description="Résultats par type puis par valeur demandée."),
+            400: openapi.Response(description="Aucun objet ou trop d'objets demandés."),
+        },
+        manual_parameters=[
+            openapi.Parameter('citations', openapi.IN_QUERY, description="Slugs ou identifiants de citations, séparés par des virgules.", type=openapi.TYPE_STRING),
+            openapi.Parameter('thoughts', openapi.IN_QUERY, description="Slugs ou identifiants de pensées, séparés par des virgules.", type=openapi.TYPE_STRING),
+        ] + sparse_fieldset_parameters
+    )
+    def get(self, request, *args, **kwargs):
+        keys = self.parse_keys(request)
+        total = sum(len(values) for values in keys.values())
+        max_items = getattr(settings, "BATCH_DETAIL_MAX_ITEMS", 50)
+        if not total or total > max_items:
+            return Response(
+                {"detail": "Provide between 1 and %d citation or thought slugs or ids." % max_items},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({kind: self.resolve(kind, values) if values else {} for kind, values in keys.items()})
+
+class BatchRelationView(APIView):
+    """
+    Vue pour rejouer en une requête les likes et favoris enregistrés hors-ligne.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Likes et favoris groupés",
+        operation_description=(
+            "Applique une liste ordonnée d'opérations {action: like|unlike|favorite|unfavorite, type: citation|thought, id} "
+            "dans une seule transaction. Pour un même objet, la dernière opération l'emporte. Renvoie un résultat par "
+            "opération, dans l'ordre (status 200 avec l'état final, 400 ou 404), et les compteurs finaux des objets."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                "operations": openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            "action": openapi.Schema(type=openapi.TYPE_STRING),
+                            "type": openapi.Schema(type=openapi.TYPE_STRING),
+                            "id": openapi.Schema(type=openapi.TYPE_INTEGER),
+                        },
+                    ),
+                ),
+            },
+        ),
+        responses={
+            200: openapi.Response(description="Résultats par opération et compteurs finaux."),
+            400: openapi.Response(description="Liste d'opérations absente ou trop longue."),
+            401: openapi.Response(description="Authentification requise."),
+            409: openapi.Response(description="Modification concurrente des mêmes likes ou favoris, réessayer."),
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        operations = request.data.get("operations")
+        max_operations = getattr(settings, "BATCH_RELATION_MAX_OPERATIONS", 100)
+        if not isinstance(operations, list) or not operations or len(operations) > max_operations:
+            return Response(
+                {"detail": "Provide between 1 and %d operations." % max_operations},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            results, counts = relations.apply_operations(request.user, operations)
+        except (IntegrityError, relations.ConcurrentUpdate):
+            # Une autre requête du même utilisateur a créé ou supprimé l'une des relations entre-temps
+            return Response(
+                {"detail": "Concurrent update of the same items, retry the batch."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response({"results": results, "counts": counts})
+
 class GenericLikeFavoriteView(APIView):
     """
     Vue générique pour gérer les likes et les favoris.
@@ -445,10 +775,10 @@ class GenericLikeFavoriteView(APIView):
         obj = get_object_or_404(self.model, id=obj_id)
 
         # Vérification si la relation existe déjà
-        content_type = ContentType.objects.get_for_model(obj)
+        target_type = inspira_models.relation_target(self.model)
         relation_exists = self.relation_model.objects.filter(
             user=request.user,
-            content_type=content_type,
+            target_type=target_type,
             object_id=obj_id,
         ).exists()
 
@@ -461,7 +791,7 @@ class GenericLikeFavoriteView(APIView):
         # Création de la relation
         self.relation_model.objects.create(
             user=request.user,
-            content_type=content_type,
+            target_type=target_type,
             object_id=obj_id,
         )
         return Response(
@@ -479,14 +809,13 @@ class GenericLikeFavoriteView(APIView):
     )
     def delete(self, request, *args, **kwargs):
         # Récupération de l'objet cible (exemple : Citation ou Thought)
-        obj_id = kwargs.get('id')
+        obj_id = kwargs.get('object_id')
         obj = get_object_or_404(self.model, id=obj_id)
 
         # Suppression de la relation si elle existe
-        content_type = ContentType.objects.get_for_model(obj)
         relation = self.relation_model.objects.filter(
             user=request.user,
-            content_type=content_type,
+            target_type=inspira_models.relation_target(self.model),
             object_id=obj_id,
         ).first()
 
@@ -633,13 +962,10 @@ class FavoriteCitationListView(generics.ListAPIView):
     )
 
     def get_queryset(self):
-        # Récupérer le type de contenu pour Citation
-        citation_content_type = ContentType.objects.get_for_model(inspira_models.Citation)
-
         # Obtenir les IDs des favoris correspondant aux citations
         favorite_citation_ids = inspira_models.Favorite.objects.filter(
             user=self.request.user,
-            content_type=citation_content_type
+            target_type=inspira_models.RelationTarget.CITATION
         ).values_list('object_id', flat=True)
 
         # Retourner les citations favorites
@@ -661,10 +987,10 @@ class FavoriteCitationListView(generics.ListAPIView):
         Récupère et renvoie les citations favorites de l'utilisateur.
         """
         # Obtenir les citations favorites
-        citations = self.get_queryset()
+        citations = self.get_serializer().optimize_queryset(self.get_queryset())
 
         # Sérialiser les données
-        serializer = inspira_serializers.CitationListSerializer(citations, many=True)
+        serializer = inspira_serializers.CitationListSerializer(citations, many=True, context=self.get_serializer_context())
 
         return Response(serializer.data)
 
@@ -679,13 +1005,10 @@ class FavoriteThoughtListView(generics.ListAPIView):
         """
         Récupère les pensées favorites de l'utilisateur connecté.
         """
-        # Récupérer le type de contenu pour Thought
-        thought_content_type = ContentType.objects.get_for_model(inspira_models.Thought)
-
         # Obtenir les IDs des favoris correspondant aux pensées
         favorite_thought_ids = inspira_models.Favorite.objects.filter(
             user=self.request.user,
-            content_type=thought_content_type
+            target_type=inspira_models.RelationTarget.THOUGHT
         ).values_list('object_id', flat=True)
 
         # Retourner les pensées favorites
@@ -696,10 +1019,10 @@ class FavoriteThoughtListView(generics.ListAPIView):
         Sérialiser et renvoyer les pensées favorites de l'utilisateur.
         """
         # Obtenir les pensées favorites
-        thoughts = self.get_queryset()
+        thoughts = self.get_serializer().optimize_queryset(self.get_queryset())
 
         # Sérialiser les données
-        serializer = inspira_serializers.ThoughtListSerializer(thoughts, many=True)
+        serializer = inspira_serializers.ThoughtListSerializer(thoughts, many=True, context=self.get_serializer_context())
 
         return Response(serializer.data)
 
@@ -733,19 +1056,15 @@ class FavoriteCitationsAndThoughtsByCategoryView(generics.ListAPIView):
         if not category:
             return []
 
-        # Récupérer les types de contenu
-        citation_content_type = ContentType.objects.get_for_model(inspira_models.Citation)
-        thought_content_type = ContentType.objects.get_for_model(inspira_models.Thought)
-
         # Obtenir les IDs des favoris pour cette catégorie
         favorite_citation_ids = inspira_models.Favorite.objects.filter(
             user=self.request.user,
-            content_type=citation_content_type
+            target_type=inspira_models.RelationTarget.CITATION
         ).values_list('object_id', flat=True)
 
         favorite_thought_ids = inspira_models.Favorite.objects.filter(
             user=self.request.user,
-            content_type=thought_content_type
+            target_type=inspira_models.RelationTarget.THOUGHT
         ).values_list('object_id', flat=True)
 
         # Filtrer les citations et pensées dans la catégorie
@@ -782,9 +1101,14 @@ class FavoriteCitationsAndThoughtsByCategoryView(generics.ListAPIView):
         citations = results['citations']
         thoughts = results['thoughts']
 
+        # Ne lire que les colonnes demandées
+        context = self.get_serializer_context()
+        citations = inspira_serializers.CitationListSerializer(context=context).optimize_queryset(citations)
+        thoughts = inspira_serializers.ThoughtListSerializer(context=context).optimize_queryset(thoughts)
+
         # Sérialiser les données
-        citation_serializer = inspira_serializers.CitationListSerializer(citations, many=True)
-        thought_serializer = inspira_serializers.ThoughtListSerializer(thoughts, many=True)
+        citation_serializer = inspira_serializers.CitationListSerializer(citations, many=True, context=context)
+        thought_serializer = inspira_serializers.ThoughtListSerializer(thoughts, many=True, context=context)
 
         # Fusionner les résultats dans un dictionnaire
         return Response({
@@ -792,6 +1116,47 @@ class FavoriteCitationsAndThoughtsByCategoryView(generics.ListAPIView):
             'thoughts': thought_serializer.data
         })
     
+class ActivityListView(generics.ListAPIView):
+    """
+    Fil d'activité de l'utilisateur connecté : likes et favoris, citations et pensées mêlées.
+    """
+    serializer_class = inspira_serializers.ActivitySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = activity.ActivityPagination
+
+    def get_queryset(self):
+        queryset = inspira_models.Activity.objects.filter(user=self.request.user)
+        verbs = [verb for verb in self.request.query_params.get("verb", "").split(",") if verb]
+        if verbs:
+            values = {label: value for value, label in inspira_models.ActivityVerb.choices}
+            queryset = queryset.filter(verb__in=[values[verb] for verb in verbs if verb in values])
+        return queryset
+
+    @swagger_auto_schema(
+        operation_summary="Fil d'activité",
+        operation_description=(
+            "Likes et favoris de l'utilisateur connecté, du plus récent au plus ancien, paginés par curseur "
+            "(suivre le lien `next`). `?verb=like,favorite` filtre les actions ; `?fields=` et `?expand=` "
+            "s'appliquent aux objets visés (`target`, null si l'objet a été supprimé ou désactivé)."
+        ),
+        manual_parameters=[
+            openapi.Parameter("verb", openapi.IN_QUERY, type=openapi.TYPE_STRING, description="like, unlike, favorite, unfavorite (séparés par des virgules)"),
+        ],
+        responses={
+            200: openapi.Response(description="Page du fil d'activité.", schema=inspira_serializers.ActivitySerializer(many=True)),
+            401: openapi.Response(description="Authentification requise."),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        context = self.get_serializer_context()
+        context["targets"] = activity.serialize_targets(page, context)
+        serializer = inspira_serializers.ActivitySerializer(page, many=True, context=context)
+        return self.get_paginated_response(serializer.data)
+
 class AboutView(APIView):
     """
     Vue pour afficher les informations sur l'application.
@@ -816,3 +1181,44 @@ class AboutView(APIView):
             raise Http404("About information not found.")
         serializer = inspira_serializers.AboutSerializer(about)
         return Response(serializer.data)
+
+
+class ContentBundleView(APIView):
+    """
+    Vue pour télécharger le bundle de contenu hors-ligne.
+    """
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_summary="Bundle de contenu hors-ligne",
+        operation_description="Renvoie en une seule requête conditionnelle les catégories, citations et pensées actives ainsi que la page À propos. Le fichier est servi précompressé depuis le disque avec un ETag fort.",
+        responses={
+            200: openapi.Response(description="Bundle de contenu récupéré avec succès."),
+            304: openapi.Response(description="Le bundle du client est à jour."),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        manifest = bundles.load_manifest() or bundles.rebuild_bundle()
+        etag = f'"{manifest["version"]}"'
+
+        if_none_match = request.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            response = HttpResponseNotModified()
+        else:
+            encoding = bundles.negotiate_encoding(request.headers.get("Accept-Encoding", ""), manifest["files"])
+            try:
+                bundle_file = open(bundles.bundle_root() / manifest["files"][encoding], "rb")
+            except FileNotFoundError:
+                # Le bundle a été remplacé entre la lecture du manifeste et l'ouverture du fichier
+                manifest = bundles.load_manifest() or bundles.rebuild_bundle()
+                etag = f'"{manifest["version"]}"'
+                encoding = bundles.negotiate_encoding(request.headers.get("Accept-Encoding", ""), manifest["files"])
+                bundle_file = open(bundles.bundle_root() / manifest["files"][encoding], "rb")
+            response = FileResponse(bundle_file, content_type="application/json")
+            if encoding != "identity":
+                response["Content-Encoding"] = encoding
+
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        response["Cache-Control"] = "public, no-cache"
+        return response
@@ -0,0 +1,41 @@
+"""
+Configuration gunicorn (chargée automatiquement depuis le répertoire courant).
+
+L'application est chargée une seule fois dans le processus maître
+(preload_app), URLconf, vues et sérialiseurs compris, puis les workers sont
+forkés : ils partagent ces pages mémoire en copie sur écriture et démarrent
+sans rien importer, ce qui supprime le pic de latence à chaque recyclage
+(--max-requests). gc.freeze() sort les objets du maître du suivi du ramasse-
+miettes, qui sinon les toucherait (et les copierait) dans chaque worker.
+
+    PROCESS_ROLE=api gunicorn EspritMobile.wsgi
+    PROCESS_ROLE=api gunicorn EspritMobile.asgi -k uvicorn.workers.UvicornWorker
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 500))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+
+
+def when_ready(server):
+    # Django ne charge l'URLconf (et donc les vues) qu'à la première requête : on le force dans le maître
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    # Aucune connexion ne doit être héritée par les workers
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()